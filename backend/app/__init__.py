@@ -1,17 +1,36 @@
 from flask import Flask
 from .config import Config
-from .extensions import db, migrate, jwt, ma
+from .extensions import db, engine_profile, replica_router, jwt, password_hasher, events, metrics, logs, recommendations, rate_limiter, compression
+from .json_provider import json_provider
 from flask_cors import CORS
+from werkzeug.middleware.proxy_fix import ProxyFix
 
 def create_app(config_class=Config):
     app = Flask(__name__)
     app.config.from_object(config_class)
+    app.json = json_provider(app)
+    if app.config.get('PROXY_FIX_X_FOR'):
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['PROXY_FIX_X_FOR'])
 
     # Initialize extensions
+    logs.init_app(app)
+    # Engine options and replica binds have to be in place before
+    # db.init_app creates the engines
+    engine_profile.init_app(app)
+    replica_router.init_app(app)
     db.init_app(app)
-    migrate.init_app(app, db)
+    with app.app_context():
+        for engine in db.engines.values():
+            engine_profile.instrument(app, engine)
     jwt.init_app(app)
-    ma.init_app(app)
+    password_hasher.init_app(app)
+    events.init_app(app)
+    recommendations.init_app(app)
+    metrics.init_app(app, db, jwt)
+    # After metrics, so the response size histogram sees the compressed body
+    compression.init_app(app)
+    # After logs and metrics, so a 429 still has a request id and is counted
+    rate_limiter.init_app(app)
     
     # Enable CORS
     # Allowing all origins for development as per README issues
@@ -23,11 +42,24 @@ def create_app(config_class=Config):
     from .routes.connection_routes import connection_bp
     from .routes.activity_routes import activity_bp
     from .routes.health_routes import health_bp
+    from .routes.event_routes import event_bp
+    from .routes.stats_routes import stats_bp
 
     app.register_blueprint(auth_bp, url_prefix='/api/auth')
     app.register_blueprint(user_bp, url_prefix='/api/users')
     app.register_blueprint(connection_bp, url_prefix='/api/connection')
     app.register_blueprint(activity_bp, url_prefix='/api/activities')
     app.register_blueprint(health_bp, url_prefix='/api/health')
+    app.register_blueprint(event_bp, url_prefix='/api/events')
+    app.register_blueprint(stats_bp, url_prefix='/api/stats')
+
+    # Flask-Migrate and the marshmallow schemas load on first use: see
+    # MigrateGroup in commands.py and app/schemas/__init__.py
+    from .commands import data_cli, db_cli, db_report_command, sessions_cli, stats_cli
+    app.cli.add_command(data_cli)
+    app.cli.add_command(db_cli)
+    app.cli.add_command(db_report_command)
+    app.cli.add_command(stats_cli)
+    app.cli.add_command(sessions_cli)
 
     return app
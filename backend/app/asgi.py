@@ -0,0 +1,365 @@
+"""ASGI deployment mode.
+
+create_asgi_app() builds the regular Flask app and serves it under an ASGI
+server (``uvicorn asgi:app``). The read-heavy list endpoints, which spend
+most of their time waiting on the database, are answered natively on the
+event loop with an async SQLAlchemy session (aiosqlite / asyncpg), so an
+in-flight query no longer pins a thread. Every other request (auth, all
+writes, health, events, NDJSON streaming, CORS preflight) is handed to the
+same Flask app through asgiref's WSGI adapter, so behaviour is unchanged.
+
+The native handlers reuse the blueprints' query builders, serializers,
+pagination, ETag and compression helpers, so both modes return identical
+responses. They also record the same Prometheus metrics, take or assign
+an X-Request-ID for their log lines, and read from a replica that has
+caught up with the caller's change versions, like the Flask views.
+"""
+import asyncio
+import time
+from contextlib import AsyncExitStack, asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from asgiref.wsgi import WsgiToAsgi, WsgiToAsgiInstance
+from flask import current_app
+from flask_jwt_extended import decode_token
+from jwt import ExpiredSignatureError, InvalidTokenError
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from werkzeug.datastructures import MIMEAccept
+from werkzeug.http import parse_accept_header, parse_etags
+
+from . import create_app
+from .compression import compress, negotiate
+from .config import Config
+from .extensions import db, engine_profile, metrics, replica_router
+from .logs import REQUEST_ID_HEADER, make_request_id, native_request_id
+from .metrics import JWT_DECODE, db_usage, record_request
+from .pagination import InvalidCursor, finish_page, keyset_query, parse_limit
+from .models import User
+from .routes.activity_routes import activities_query
+from .routes.connection_routes import connections_query
+from .routes.user_routes import directory_query, logger as user_logger
+from .schemas.connection_schema import connection_serializer
+from .schemas.user_schema import user_serializer
+from .versions import make_etag, role_key, user_key, versions_query
+
+ASYNC_DRIVERS = {
+    'sqlite': 'sqlite+aiosqlite',
+    'postgresql': 'postgresql+asyncpg',
+}
+
+
+def async_database_url(url):
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f'No async driver configured for {backend}')
+    return url.set(drivername=ASYNC_DRIVERS[backend])
+
+
+class HTTPError(Exception):
+
+    def __init__(self, status, body):
+        super().__init__(status)
+        self.status = status
+        self.body = body
+
+
+class AsyncRequest:
+
+    def __init__(self, scope):
+        self.path = scope['path']
+        self.query_string = scope.get('query_string', b'').decode('latin-1')
+        self.args = {key: values[0] for key, values in parse_qs(self.query_string).items()}
+        self.headers = {key.decode('latin-1').lower(): value.decode('latin-1')
+                        for key, value in scope['headers']}
+        # Same shape as werkzeug's request.full_path, which the ETag covers
+        self.full_path = f'{self.path}?{self.query_string}'
+        self.remote_addr = (scope.get('client') or (None,))[0]
+
+    def wants_ndjson(self):
+        # Same negotiation as pagination.wants_ndjson
+        if self.args.get('format') == 'ndjson':
+            return True
+        accept = parse_accept_header(self.headers.get('accept'), MIMEAccept)
+        return accept.best_match(['application/json', 'application/x-ndjson']) == 'application/x-ndjson'
+
+
+def authenticate(request):
+    # Mirrors flask_jwt_extended's responses for a missing, expired or
+    # malformed access token. Needs an app context.
+    auth = request.headers.get('authorization', '')
+    if not auth.startswith('Bearer '):
+        raise HTTPError(401, {'msg': 'Missing Authorization Header'})
+    started = time.perf_counter()
+    try:
+        claims = decode_token(auth[len('Bearer '):])
+        if 'metrics' in current_app.extensions:
+            JWT_DECODE.observe(time.perf_counter() - started)
+    except ExpiredSignatureError:
+        raise HTTPError(401, {'msg': 'Token has expired'})
+    except InvalidTokenError as e:
+        raise HTTPError(422, {'msg': str(e)})
+    if claims.get('type') != 'access':
+        raise HTTPError(422, {'msg': 'Only non-refresh tokens are allowed'})
+    return claims
+
+
+class ThreadedWsgiToAsgiInstance(WsgiToAsgiInstance):
+    """One request, run on ``executor`` rather than asgiref's shared thread."""
+
+    def __init__(self, wsgi_application, duplicate_header_limit, executor):
+        super().__init__(wsgi_application, duplicate_header_limit)
+        self.executor = executor
+        self.disconnected = False
+
+    async def __call__(self, scope, receive, send):
+        self.receive = receive
+        await super().__call__(scope, receive, send)
+
+    async def run_wsgi_app(self, body):
+        # Sends to a client that has gone are dropped without an error, so
+        # watch for the disconnect, or a change feed would stream forever
+        watcher = asyncio.create_task(self.wait_for_disconnect())
+        try:
+            await sync_to_async(self.run_wsgi, thread_sensitive=False, executor=self.executor)(body)
+        finally:
+            watcher.cancel()
+
+    async def wait_for_disconnect(self):
+        while (await self.receive())['type'] != 'http.disconnect':
+            pass
+        self.disconnected = True
+
+    def run_wsgi(self, body):
+        # What asgiref's run_wsgi_app does, which it only ships already bound
+        # to its own thread. start_response has to run in this thread too.
+        try:
+            environ = self.build_environ(self.scope, body)
+        except ValueError:
+            # Too many duplicate headers
+            self.sync_send({'type': 'http.response.start', 'status': 400,
+                            'headers': [(b'content-type', b'text/plain')]})
+            self.sync_send({'type': 'http.response.body', 'body': b'Bad Request: Too many duplicate headers'})
+            return
+        sent = 0
+        output = self.wsgi_application(environ, self.start_response)
+        try:
+            for chunk in output:
+                if not self.response_started:
+                    self.response_started = True
+                    self.sync_send(self.response_start)
+                if self.response_content_length is not None:
+                    chunk = chunk[:self.response_content_length - sent]
+                self.sync_send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+                sent += len(chunk)
+                if sent == self.response_content_length or self.disconnected:
+                    break
+        finally:
+            # WSGI servers must close the response (asgiref doesn't); for a
+            # change feed that is what unsubscribes it
+            if hasattr(output, 'close'):
+                output.close()
+        if not self.response_started:
+            self.response_started = True
+            self.sync_send(self.response_start)
+        self.sync_send({'type': 'http.response.body'})
+
+
+class ThreadedWsgiToAsgi(WsgiToAsgi):
+    """WsgiToAsgi running requests on a pool of ``threads`` threads.
+
+    asgiref runs every request on one shared thread by default, so a single
+    open change feed (GET /api/events) would stall all the others.
+    """
+
+    def __init__(self, wsgi_application, threads):
+        super().__init__(wsgi_application)
+        self.executor = ThreadPoolExecutor(threads, thread_name_prefix='wsgi')
+
+    async def __call__(self, scope, receive, send):
+        instance = ThreadedWsgiToAsgiInstance(self.wsgi_application, self.duplicate_header_limit, self.executor)
+        await instance(scope, receive, send)
+
+
+class AsyncListApp:
+
+    def __init__(self, flask_app):
+        self.flask_app = flask_app
+        self.wsgi = ThreadedWsgiToAsgi(flask_app, flask_app.config['ASGI_THREADS'])
+        # Same profile as the sync engines, minus their (sync-only) pool class
+        options = dict(flask_app.config['SQLALCHEMY_ENGINE_OPTIONS'])
+        options.pop('poolclass', None)
+        self.metrics = 'metrics' in flask_app.extensions
+        # None is the primary; the rest are replica_router's bind keys
+        self.engines = {}
+        with flask_app.app_context():
+            for key in (None,) + replica_router.bind_keys:
+                engine = create_async_engine(async_database_url(db.engines[key].url), **options)
+                engine_profile.instrument(flask_app, engine.sync_engine)
+                if self.metrics:
+                    metrics.instrument(engine.sync_engine)
+                self.engines[key] = engine
+        self.sessions = {key: async_sessionmaker(engine, expire_on_commit=False)
+                         for key, engine in self.engines.items()}
+        self.routes = {
+            '/api/users': ('users.list_users', self.list_users),
+            '/api/users/': ('users.list_users', self.list_users),
+            '/api/connection/list': ('connection.list_connections', self.list_connections),
+            '/api/activities/list': ('activity.list_activities', self.list_activities),
+        }
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self.lifespan(receive, send)
+        route = self.routes.get(scope['path']) if scope['type'] == 'http' else None
+        if route is None or scope['method'] != 'GET':
+            return await self.wsgi(scope, receive, send)
+
+        request = AsyncRequest(scope)
+        if request.wants_ndjson():
+            # Streaming stays on the sync server-side cursor path
+            return await self.wsgi(scope, receive, send)
+        endpoint, handler = route
+        started = time.perf_counter()
+        usage = [0, 0.0]
+        request_id = make_request_id(request.headers.get(REQUEST_ID_HEADER.lower()))
+        usage_token, request_id_token = db_usage.set(usage), native_request_id.set(request_id)
+        try:
+            try:
+                with self.flask_app.app_context():
+                    status, body, headers = await handler(request)
+            except HTTPError as e:
+                status, body, headers = e.status, e.body, {}
+            headers = dict(headers, **{REQUEST_ID_HEADER: request_id})
+            size = await self.respond(send, request, status, body, headers)
+        finally:
+            db_usage.reset(usage_token)
+            native_request_id.reset(request_id_token)
+        if self.metrics:
+            record_request((endpoint.split('.')[0], endpoint), 'GET', status, time.perf_counter() - started,
+                           int(request.headers.get('content-length') or 0), size, *usage)
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                for engine in self.engines.values():
+                    await engine.dispose()
+                self.wsgi.executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def respond(self, send, request, status, body, headers):
+        """Send the response and return its body size."""
+        headers = dict(headers)
+        vary = [headers.pop('Vary')] if 'Vary' in headers else []
+        if status == 304:
+            payload = b''
+        else:
+            # Same bytes as jsonify() in non-debug mode
+            payload = (self.flask_app.json.dumps(body, separators=(',', ':')) + '\n').encode('utf-8')
+            headers['Content-Type'] = 'application/json'
+            payload = self.compress(request, payload, headers, vary)
+        headers['Content-Length'] = str(len(payload))
+        # Mirrors the CORS setup in create_app: any origin, with credentials
+        origin = request.headers.get('origin')
+        if origin:
+            headers['Access-Control-Allow-Origin'] = origin
+            headers['Access-Control-Allow-Credentials'] = 'true'
+            vary.append('Origin')
+        if vary:
+            headers['Vary'] = ', '.join(vary)
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': [(key.lower().encode('latin-1'), value.encode('latin-1'))
+                        for key, value in headers.items()],
+        })
+        await send({'type': 'http.response.body', 'body': payload})
+        return len(payload)
+
+    def compress(self, request, payload, headers, vary):
+        # Same rules as the Compression hook for a JSON body
+        config = self.flask_app.config
+        if not config['COMPRESS_ENABLED'] or 'application/json' not in config['COMPRESS_MIMETYPES']:
+            return payload
+        vary.append('Accept-Encoding')
+        encoding = negotiate(request.headers.get('accept-encoding'))
+        if encoding is None or len(payload) < config['COMPRESS_MIN_SIZE']:
+            return payload
+        headers['Content-Encoding'] = encoding
+        if headers.get('ETag', '').startswith('"'):
+            headers['ETag'] = 'W/' + headers['ETag']
+        return compress(payload, encoding, config['COMPRESS_GZIP_LEVEL'], config['COMPRESS_BROTLI_QUALITY'])
+
+    @asynccontextmanager
+    async def versioned(self, request, keys):
+        """Yield (session, matched, headers) like the versioned() decorator.
+
+        The ETag comes from the primary's versions. Like current_versions(),
+        the session reads from a replica only if it has the same versions.
+        """
+        query = versions_query(keys).statement
+        async with AsyncExitStack() as stack:
+            session = await stack.enter_async_context(self.sessions[None]())
+            versions = dict((await session.execute(query)).all())
+            etag = make_etag(request.full_path, keys, versions)
+            headers = {
+                'ETag': f'"{etag}"',
+                'Cache-Control': 'private, no-cache',
+                'Vary': 'Authorization',
+            }
+            if_none_match = request.headers.get('if-none-match')
+            matched = bool(if_none_match) and parse_etags(if_none_match).contains_weak(etag)
+            if replica_router.bind_keys and not matched:
+                replica = await stack.enter_async_context(self.sessions[replica_router.next_bind_key()]())
+                if dict((await replica.execute(query)).all()) == versions:
+                    session = replica
+            yield session, matched, headers
+
+    async def list_users(self, request):
+        role = request.args.get('role')
+        user_logger.debug('list_users', extra={
+            'origin': request.headers.get('origin'), 'remote_addr': request.remote_addr, 'role': role})
+        async with self.versioned(request, [role_key(role)]) as (session, matched, headers):
+            if matched:
+                return 304, None, headers
+            # Like versioned(), error responses go out without cache headers
+            try:
+                limit = parse_limit(request.args.get('limit'))
+            except ValueError:
+                return 400, {'message': 'Invalid limit'}, {}
+            try:
+                query = keyset_query(directory_query(role), User.id, request.args.get('cursor'), limit)
+            except InvalidCursor:
+                return 400, {'message': 'Invalid cursor'}, {}
+            rows = (await session.execute(query.statement)).all()
+        users, next_cursor = finish_page(rows, limit)
+        return 200, {'users': user_serializer.dump_rows(users), 'next_cursor': next_cursor}, headers
+
+    async def list_connections(self, request):
+        user_id = authenticate(request)['sub']
+        async with self.versioned(request, [user_key(user_id)]) as (session, matched, headers):
+            if matched:
+                return 304, None, headers
+            result = await session.execute(connections_query(user_id).statement)
+            connections = result.unique().scalars().all()
+        return 200, connection_serializer.dump_many(connections), headers
+
+    async def list_activities(self, request):
+        claims = authenticate(request)
+        user_id = claims['sub']
+        query, serializer = activities_query(user_id, claims.get('role'))
+        async with self.versioned(request, [user_key(user_id)]) as (session, matched, headers):
+            if matched:
+                return 304, None, headers
+            result = await session.execute(query.statement)
+            rows = result.unique().scalars().all()
+        return 200, serializer.dump_many(rows), headers
+
+
+def create_asgi_app(config_class=Config):
+    return AsyncListApp(create_app(config_class))
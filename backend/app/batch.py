@@ -0,0 +1,35 @@
+# Helpers shared by the batch endpoints in connection_routes and activity_routes
+
+MAX_BATCH_ITEMS = 500
+
+
+class BatchError(ValueError):
+    pass
+
+
+def parse_batch_items(data, id_key):
+    """Validate ``{'items': [{id_key: ..., 'action': ...}, ...]}``.
+
+    Returns a list of (id, action) pairs in request order. Actions are not
+    checked here so each endpoint can report unknown ones per item.
+    """
+    items = (data or {}).get('items')
+    if not isinstance(items, list) or not items:
+        raise BatchError('items must be a non-empty list')
+    if len(items) > MAX_BATCH_ITEMS:
+        raise BatchError(f'At most {MAX_BATCH_ITEMS} items per request')
+
+    pairs = []
+    seen = set()
+    for item in items:
+        if not isinstance(item, dict):
+            raise BatchError(f'Each item must be an object with {id_key} and action')
+        try:
+            item_id = int(item.get(id_key))
+        except (TypeError, ValueError):
+            raise BatchError(f'Each item needs an integer {id_key}')
+        if item_id in seen:
+            raise BatchError(f'Duplicate {id_key} {item_id}')
+        seen.add(item_id)
+        pairs.append((item_id, item.get('action')))
+    return pairs
@@ -0,0 +1,664 @@
+"""``flask data`` commands: streamed bulk import and export. Also
+``flask db-report``, an aggregate summary of the database.
+
+    flask data export users users.ndjson
+    flask data export connections - --format csv > connections.csv
+    flask data import users clinic.csv --hash-workers 8
+    flask data import connections clinic-connections.csv
+
+Files are NDJSON (one object per line) or CSV with a header row, picked by
+extension or --format. Both directions work in chunks of --batch-size rows.
+Export streams from a server-side cursor; import validates and inserts one
+chunk at a time, with executemany (or COPY on Postgres). Memory stays flat
+however large the file is. The whole import is a single transaction, so a
+bad row (reported with its line number) leaves the database untouched.
+
+Imported users need either a ``password_hash`` (passed through, e.g. from
+an export with --with-password-hash) or a plaintext ``password``, which is
+hashed on a process pool. Connections, activities and invites can refer to
+users by id or by email (``client_email``, ``professional_email``,
+``created_by_email``). Importing connections, activities or invites
+rebuilds the dashboard counters in the same transaction.
+
+``flask db-report`` prints counts by role and status, invites per activity
+and acceptance rates, all computed with GROUP BY queries. With --details it
+streams one table's rows instead, filtered by --where and --limit:
+
+    flask db-report --format json
+    flask db-report --details invites --where status=pending --limit 100
+
+``flask stats rebuild`` recounts the per-professional dashboard counters
+from the data tables and ``flask stats check`` reports any that drifted.
+
+``flask sessions prune`` deletes revoked and expired refresh sessions.
+
+``flask db`` runs Flask-Migrate, which is only imported when a ``flask db``
+command runs.
+"""
+import csv
+import io
+import json
+import operator
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import click
+from flask import current_app
+from flask.cli import AppGroup, with_appcontext
+from sqlalchemy import case, func, insert, or_, select, text
+from werkzeug.security import generate_password_hash
+
+from .extensions import db
+from .models import User, Connection, GroupActivity, ActivityInvite
+from .sessions import prune_sessions
+from .stats import check_counters, rebuild_counters
+from .versions import bump, bump_users, role_key
+
+data_cli = AppGroup('data', help='Bulk import and export.')
+
+ROLES = ('professional', 'client')
+CONNECTION_STATUSES = ('pending', 'accepted', 'rejected')
+INVITE_STATUSES = ('pending', 'accepted', 'declined')
+
+EXPORT_COLUMNS = {
+    'users': (User, ['id', 'name', 'email', 'role', 'created_at']),
+    'connections': (Connection, ['id', 'professional_id', 'client_id', 'status', 'initiated_by', 'created_at']),
+    'activities': (GroupActivity, ['id', 'title', 'description', 'created_by', 'created_at']),
+    'invites': (ActivityInvite, ['id', 'activity_id', 'client_id', 'status']),
+}
+
+
+class RowError(ValueError):
+    pass
+
+
+def file_format(path, fmt):
+    if fmt:
+        return fmt
+    if path.endswith('.csv'):
+        return 'csv'
+    return 'ndjson'
+
+
+def to_int(row, key):
+    value = row.get(key)
+    if value is None or value == '':
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise RowError(f'{key} must be an integer')
+
+
+def to_datetime(row, key):
+    value = row.get(key)
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise RowError(f'{key} must be an ISO 8601 timestamp')
+
+
+def choice(row, key, choices, default=None):
+    value = row.get(key) or default
+    if value not in choices:
+        raise RowError(f'{key} must be one of {", ".join(choices)}')
+    return value
+
+
+def required(row, key):
+    value = row.get(key)
+    if value is None or value == '':
+        raise RowError(f'{key} is required')
+    return value
+
+
+def read_rows(stream, fmt):
+    """Yield (line number, dict) for each record in ``stream``."""
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+    else:
+        for line_no, line in enumerate(stream, 1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                raise click.ClickException(f'line {line_no}: not valid JSON')
+            if not isinstance(row, dict):
+                raise click.ClickException(f'line {line_no}: expected a JSON object')
+            yield line_no, row
+
+
+class UserLookup:
+    """Resolves the user ids and emails a chunk refers to, one query per chunk."""
+
+    def __init__(self, rows, id_keys, email_keys):
+        ids = set()
+        for row in rows:
+            for key in id_keys:
+                try:
+                    ids.add(int(row[key]))
+                except (KeyError, TypeError, ValueError):
+                    pass  # missing or malformed ids are reported per row
+        emails = {row[key] for row in rows for key in email_keys if row.get(key)}
+        self.by_id = {}
+        self.by_email = {}
+        if ids or emails:
+            users = db.session.execute(
+                select(User.id, User.email, User.role)
+                .where(or_(User.id.in_(ids), User.email.in_(emails)))
+            ).all()
+            for user_id, email, role in users:
+                self.by_id[user_id] = role
+                self.by_email[email] = (user_id, role)
+
+    def resolve(self, row, name, role):
+        user_id = to_int(row, f'{name}_id' if name != 'created_by' else name)
+        email = row.get(f'{name}_email')
+        if user_id is None and not email:
+            raise RowError(f'{name}_id or {name}_email is required')
+        if user_id is not None:
+            found = self.by_id.get(user_id)
+        else:
+            user_id, found = self.by_email.get(email, (None, None))
+        if found is None:
+            raise RowError(f'{name} {email or user_id} does not exist')
+        if found != role:
+            raise RowError(f'{name} {email or user_id} is not a {role}')
+        return user_id
+
+
+def prepare_users(rows, hasher):
+    """Turn a chunk of raw rows into insert values; returns (values, version keys)."""
+    values = []
+    to_hash = []
+    for line_no, row in rows:
+        try:
+            value = {
+                'id': to_int(row, 'id'),
+                'name': row.get('name') or '',
+                'email': required(row, 'email'),
+                'role': choice(row, 'role', ROLES),
+                'password_hash': row.get('password_hash'),
+                'created_at': to_datetime(row, 'created_at') or datetime.utcnow(),
+            }
+            if not value['password_hash']:
+                to_hash.append((len(values), required(row, 'password')))
+        except RowError as e:
+            raise click.ClickException(f'line {line_no}: {e}')
+        values.append(value)
+    if to_hash:
+        hashes = hasher([password for _, password in to_hash])
+        for (index, _), password_hash in zip(to_hash, hashes):
+            values[index]['password_hash'] = password_hash
+    keys = {role_key(value['role']) for value in values} | {role_key(None)}
+    return values, keys
+
+
+def prepare_connections(rows, hasher):
+    lookup = UserLookup([row for _, row in rows], ['professional_id', 'client_id', 'initiated_by'],
+                        ['professional_email', 'client_email'])
+    values = []
+    users = set()
+    for line_no, row in rows:
+        try:
+            professional_id = lookup.resolve(row, 'professional', 'professional')
+            client_id = lookup.resolve(row, 'client', 'client')
+            initiated_by = to_int(row, 'initiated_by') or professional_id
+            if initiated_by not in (professional_id, client_id):
+                raise RowError('initiated_by must be the professional or the client')
+            values.append({
+                'id': to_int(row, 'id'),
+                'professional_id': professional_id,
+                'client_id': client_id,
+                'status': choice(row, 'status', CONNECTION_STATUSES, default='pending'),
+                'initiated_by': initiated_by,
+                'created_at': to_datetime(row, 'created_at') or datetime.utcnow(),
+            })
+        except RowError as e:
+            raise click.ClickException(f'line {line_no}: {e}')
+        users.update((professional_id, client_id))
+    return values, users
+
+
+def prepare_activities(rows, hasher):
+    lookup = UserLookup([row for _, row in rows], ['created_by'], ['created_by_email'])
+    values = []
+    users = set()
+    for line_no, row in rows:
+        try:
+            created_by = lookup.resolve(row, 'created_by', 'professional')
+            values.append({
+                'id': to_int(row, 'id'),
+                'title': required(row, 'title'),
+                'description': row.get('description') or '',
+                'created_by': created_by,
+                'created_at': to_datetime(row, 'created_at') or datetime.utcnow(),
+            })
+        except RowError as e:
+            raise click.ClickException(f'line {line_no}: {e}')
+        users.add(created_by)
+    return values, users
+
+
+def prepare_invites(rows, hasher):
+    lookup = UserLookup([row for _, row in rows], ['client_id'], ['client_email'])
+    activity_ids = set()
+    for line_no, row in rows:
+        try:
+            activity_ids.add(int(required(row, 'activity_id')))
+        except (RowError, TypeError, ValueError):
+            raise click.ClickException(f'line {line_no}: activity_id must be an integer')
+    creators = dict(db.session.execute(
+        select(GroupActivity.id, GroupActivity.created_by).where(GroupActivity.id.in_(activity_ids))
+    ).all())
+    values = []
+    users = set()
+    for line_no, row in rows:
+        try:
+            activity_id = int(row['activity_id'])
+            if activity_id not in creators:
+                raise RowError(f'activity {activity_id} does not exist')
+            client_id = lookup.resolve(row, 'client', 'client')
+            values.append({
+                'id': to_int(row, 'id'),
+                'activity_id': activity_id,
+                'client_id': client_id,
+                'status': choice(row, 'status', INVITE_STATUSES, default='pending'),
+            })
+        except RowError as e:
+            raise click.ClickException(f'line {line_no}: {e}')
+        users.update((client_id, creators[activity_id]))
+    return values, users
+
+
+IMPORTERS = {
+    'users': (User, prepare_users),
+    'connections': (Connection, prepare_connections),
+    'activities': (GroupActivity, prepare_activities),
+    'invites': (ActivityInvite, prepare_invites),
+}
+
+
+def insert_chunk(model, values):
+    # Rows with and without an explicit id can't share one executemany
+    groups = {}
+    for value in values:
+        if value['id'] is None:
+            value = {key: item for key, item in value.items() if key != 'id'}
+        groups.setdefault(tuple(value), []).append(value)
+    postgres = db.session.get_bind().dialect.name == 'postgresql'
+    for columns, group in groups.items():
+        if postgres:
+            copy_rows(model, columns, group)
+        else:
+            db.session.execute(insert(model), group)
+
+
+def copy_field(value):
+    # In COPY's CSV format an unquoted empty field is NULL and "" is an
+    # empty string, so every other value is quoted
+    if value is None:
+        return ''
+    return '"' + str(value).replace('"', '""') + '"'
+
+
+def copy_rows(model, columns, values):
+    """COPY ``values`` into ``model``'s table inside the current transaction."""
+    buffer = io.StringIO()
+    for value in values:
+        buffer.write(','.join(copy_field(value[column]) for column in columns) + '\n')
+    buffer.seek(0)
+    preparer = db.engine.dialect.identifier_preparer
+    table = preparer.quote(model.__table__.name)
+    column_list = ', '.join(preparer.quote(column) for column in columns)
+    cursor = db.session.connection().connection.dbapi_connection.cursor()
+    try:
+        cursor.copy_expert(f"COPY {table} ({column_list}) FROM STDIN WITH (FORMAT csv, NULL '')", buffer)
+    finally:
+        cursor.close()
+
+
+def sync_sequence(model):
+    # Explicit ids don't advance a Postgres serial; move it past them
+    if db.session.get_bind().dialect.name == 'postgresql':
+        table = model.__table__.name
+        db.session.execute(
+            text(f"SELECT setval(pg_get_serial_sequence(:table, 'id'), "
+                 f"(SELECT COALESCE(MAX(id), 1) FROM {db.engine.dialect.identifier_preparer.quote(table)}))"),
+            {'table': table},
+        )
+
+
+class Progress:
+
+    def __init__(self, label):
+        self.label = label
+        self.rows = 0
+        self.started = time.perf_counter()
+
+    def add(self, rows):
+        self.rows += rows
+        elapsed = time.perf_counter() - self.started
+        click.echo(f'{self.label}: {self.rows:,} rows ({self.rows / elapsed:,.0f} rows/s)', err=True)
+
+    def done(self):
+        elapsed = time.perf_counter() - self.started
+        rate = self.rows / elapsed if elapsed else 0
+        click.echo(f'{self.label}: done, {self.rows:,} rows in {elapsed:.1f}s ({rate:,.0f} rows/s)', err=True)
+
+
+def chunks(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def write_rows(result, columns, target, fmt, progress=None):
+    """Write a streamed result to ``target`` one partition at a time."""
+    if fmt == 'csv':
+        writer = csv.writer(target)
+        writer.writerow(columns)
+    for partition in result.partitions():
+        for row in partition:
+            values = [value.isoformat() if isinstance(value, datetime) else value for value in row]
+            if fmt == 'csv':
+                writer.writerow(['' if value is None else value for value in values])
+            else:
+                target.write(json.dumps(dict(zip(columns, values)), separators=(',', ':')) + '\n')
+        if progress is not None:
+            progress.add(len(partition))
+
+
+@data_cli.command('import')
+@click.argument('entity', type=click.Choice(list(IMPORTERS)))
+@click.argument('source', type=click.File('r', encoding='utf-8'))
+@click.option('--format', 'fmt', type=click.Choice(['ndjson', 'csv']), help='Default: from the file extension.')
+@click.option('--batch-size', default=5000, show_default=True, help='Rows validated and inserted per chunk.')
+@click.option('--hash-workers', default=os.cpu_count() or 1, show_default=True,
+              help='Processes hashing plaintext passwords.')
+def import_command(entity, source, fmt, batch_size, hash_workers):
+    """Import ENTITY rows from SOURCE (a file, or - for stdin)."""
+    model, prepare = IMPORTERS[entity]
+    fmt = file_format(source.name, fmt)
+    progress = Progress(f'import {entity}')
+    pool = None
+
+    def hasher(passwords):
+        nonlocal pool
+        if pool is None:
+            pool = ProcessPoolExecutor(max_workers=hash_workers)
+        chunksize = max(1, len(passwords) // (hash_workers * 4))
+        return list(pool.map(generate_password_hash, passwords, chunksize=chunksize))
+
+    explicit_ids = False
+    try:
+        for chunk in chunks(read_rows(source, fmt), batch_size):
+            values, touched = prepare(chunk, hasher)
+            explicit_ids = explicit_ids or any(value['id'] is not None for value in values)
+            insert_chunk(model, values)
+            # The list views' ETags come from these counters
+            if entity == 'users':
+                bump(*touched)
+            else:
+                bump_users(*touched)
+            progress.add(len(values))
+        if explicit_ids:
+            sync_sequence(model)
+        if entity != 'users':
+            # Recount the dashboard counters once rather than per row
+            rebuild_counters()
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        if isinstance(e, click.ClickException):
+            raise
+        # DBAPI errors carry the whole statement; the driver's message is enough
+        reason = getattr(e, 'orig', None) or e
+        raise click.ClickException(f'import failed after {progress.rows:,} rows, nothing was saved: {reason}')
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    progress.done()
+
+
+@data_cli.command('export')
+@click.argument('entity', type=click.Choice(list(EXPORT_COLUMNS)))
+@click.argument('target', type=click.File('w', encoding='utf-8'))
+@click.option('--format', 'fmt', type=click.Choice(['ndjson', 'csv']), help='Default: from the file extension.')
+@click.option('--batch-size', default=5000, show_default=True, help='Rows fetched per round trip.')
+@click.option('--with-password-hash', is_flag=True, help='Include users\' password hashes (for migrations).')
+def export_command(entity, target, fmt, batch_size, with_password_hash):
+    """Export ENTITY rows to TARGET (a file, or - for stdout)."""
+    model, columns = EXPORT_COLUMNS[entity]
+    columns = list(columns)
+    if entity == 'users' and with_password_hash:
+        columns.append('password_hash')
+    fmt = file_format(target.name, fmt)
+    # Report progress on stderr so stdout can be the export itself
+    progress = Progress(f'export {entity}')
+
+    query = (
+        select(*(getattr(model, column) for column in columns))
+        .order_by(model.id)
+        .execution_options(yield_per=batch_size)
+    )
+    write_rows(db.session.execute(query), columns, target, fmt, progress)
+    progress.done()
+
+
+WHERE_CLAUSE = re.compile(r'^(\w+)\s*(>=|<=|!=|=|>|<)\s*(.*)$')
+OPERATORS = {
+    '=': operator.eq, '!=': operator.ne,
+    '<': operator.lt, '<=': operator.le, '>': operator.gt, '>=': operator.ge,
+}
+
+
+def parse_where(model, columns, clause):
+    match = WHERE_CLAUSE.match(clause)
+    if not match or match.group(1) not in columns:
+        raise click.BadParameter(
+            f'{clause!r}: expected COLUMN=VALUE (or !=, <, <=, >, >=) with one of {", ".join(columns)}',
+            param_hint='--where')
+    name, op, raw = match.groups()
+    column = getattr(model, name)
+    try:
+        if isinstance(column.type, db.Integer):
+            value = int(raw)
+        elif isinstance(column.type, db.DateTime):
+            value = datetime.fromisoformat(raw)
+        else:
+            value = raw
+    except ValueError:
+        raise click.BadParameter(f'{raw!r} is not a valid {name}', param_hint='--where')
+    return OPERATORS[op](column, value)
+
+
+def acceptance_rate(counts, accepted, declined):
+    # Share of answered requests that were accepted; pending ones don't count
+    answered = counts.get(accepted, 0) + counts.get(declined, 0)
+    return round(counts.get(accepted, 0) / answered, 4) if answered else None
+
+
+def report_summary():
+    """Counts by role and status, invites per activity and acceptance rates,
+    all computed by the database in four aggregate queries."""
+    users = dict(db.session.execute(select(User.role, func.count()).group_by(User.role)).all())
+
+    initiator = case((Connection.initiated_by == Connection.professional_id, 'professional'), else_='client')
+    connections, by_initiator = {}, {}
+    for who, status, count in db.session.execute(
+            select(initiator, Connection.status, func.count()).group_by(initiator, Connection.status)):
+        connections[status] = connections.get(status, 0) + count
+        by_initiator.setdefault(who, {})[status] = count
+
+    per_activity = (
+        select(func.count(ActivityInvite.id).label('invites'))
+        .select_from(GroupActivity)
+        .outerjoin(ActivityInvite, ActivityInvite.activity_id == GroupActivity.id)
+        .group_by(GroupActivity.id)
+        .subquery()
+    )
+    activities, without_invites, avg_invites, max_invites = db.session.execute(
+        select(func.count(), func.coalesce(func.sum(case((per_activity.c.invites == 0, 1), else_=0)), 0),
+               func.avg(per_activity.c.invites), func.max(per_activity.c.invites))
+    ).one()
+
+    invites = dict(db.session.execute(
+        select(ActivityInvite.status, func.count()).group_by(ActivityInvite.status)).all())
+
+    return {
+        'users': {'total': sum(users.values()), 'by_role': users},
+        'connections': {
+            'total': sum(connections.values()),
+            'by_status': connections,
+            'acceptance_rate': acceptance_rate(connections, 'accepted', 'rejected'),
+            'acceptance_rate_by_initiator': {
+                who: acceptance_rate(counts, 'accepted', 'rejected') for who, counts in sorted(by_initiator.items())},
+        },
+        'activities': {
+            'total': activities,
+            'without_invites': without_invites,
+            'invites_per_activity': {
+                'avg': round(float(avg_invites), 2) if avg_invites is not None else None,
+                'max': max_invites,
+            },
+        },
+        'invites': {
+            'total': sum(invites.values()),
+            'by_status': invites,
+            'acceptance_rate': acceptance_rate(invites, 'accepted', 'declined'),
+        },
+    }
+
+
+def flatten(report, prefix=''):
+    for key, value in report.items():
+        if isinstance(value, dict):
+            yield from flatten(value, f'{prefix}{key}.')
+        else:
+            yield f'{prefix}{key}', value
+
+
+def format_summary(report):
+    lines = []
+    for section, values in report.items():
+        lines.append(section.upper())
+        for key, value in flatten(values):
+            if isinstance(value, float) and 'rate' in key:
+                value = f'{value:.1%}'
+            lines.append(f'  {key:<45} {"n/a" if value is None else value}')
+    return '\n'.join(lines)
+
+
+@click.command('db-report')
+@click.option('--details', type=click.Choice(list(EXPORT_COLUMNS)),
+              help='Stream ENTITY rows instead of the summary.')
+@click.option('--where', 'filters', multiple=True, metavar='COLUMN=VALUE',
+              help='Filter detail rows (also !=, <, <=, >, >=). Repeat to combine.')
+@click.option('--limit', type=click.IntRange(min=1), help='Stop after this many detail rows.')
+@click.option('--format', 'fmt', type=click.Choice(['text', 'json', 'csv']),
+              help='Summary: text (default), json or csv. Details: csv (default) or json (NDJSON).')
+@click.option('--batch-size', default=5000, show_default=True, help='Detail rows fetched per round trip.')
+@click.option('-o', '--output', type=click.File('w', encoding='utf-8'), default='-', help='Default: stdout.')
+@with_appcontext
+def db_report_command(details, filters, limit, fmt, batch_size, output):
+    """Summarize the database, or stream the rows of one table."""
+    if not details:
+        if filters or limit:
+            raise click.UsageError('--where and --limit only apply with --details')
+        report = report_summary()
+        if fmt == 'json':
+            output.write(json.dumps(report, indent=2) + '\n')
+        elif fmt == 'csv':
+            writer = csv.writer(output)
+            writer.writerow(['metric', 'value'])
+            writer.writerows(flatten(report))
+        else:
+            output.write(format_summary(report) + '\n')
+        return
+
+    if fmt == 'text':
+        raise click.UsageError('--details writes csv or json')
+    model, columns = EXPORT_COLUMNS[details]
+    query = (
+        select(*(getattr(model, column) for column in columns))
+        .where(*(parse_where(model, columns, clause) for clause in filters))
+        .order_by(model.id)
+        .limit(limit)
+        .execution_options(yield_per=batch_size)
+    )
+    write_rows(db.session.execute(query), columns, output, 'ndjson' if fmt == 'json' else 'csv')
+
+
+stats_cli = AppGroup('stats', help='Dashboard counters.')
+
+
+@stats_cli.command('rebuild')
+def stats_rebuild_command():
+    """Recount every professional's dashboard counters from scratch."""
+    started = time.perf_counter()
+    professionals = rebuild_counters()
+    db.session.commit()
+    click.echo(f'rebuilt counters for {professionals:,} professionals in {time.perf_counter() - started:.1f}s')
+
+
+@stats_cli.command('check')
+@click.option('--show', default=20, show_default=True, help='Mismatches to list.')
+def stats_check_command(show):
+    """Compare the stored counters with a fresh count; exit 1 on drift."""
+    mismatches = 0
+    for professional_id, counter, stored, actual in check_counters():
+        mismatches += 1
+        if mismatches <= show:
+            click.echo(f'professional {professional_id}: {counter} is {stored}, should be {actual}')
+    if mismatches:
+        raise click.ClickException(f'{mismatches:,} counter(s) out of date; run flask stats rebuild')
+    click.echo('counters match')
+
+
+sessions_cli = AppGroup('sessions', help='Refresh sessions.')
+
+
+@sessions_cli.command('prune')
+def sessions_prune_command():
+    """Delete revoked and expired refresh sessions."""
+    deleted = prune_sessions()
+    db.session.commit()
+    click.echo(f'deleted {deleted:,} refresh sessions')
+
+
+class MigrateGroup(click.Group):
+    """``flask db``: Flask-Migrate's commands, set up when one is looked up.
+
+    Flask-Migrate imports Alembic, about 90 ms that requests and the other
+    commands never need, so it isn't initialized in create_app.
+    """
+
+    def migrate_group(self):
+        app = current_app._get_current_object()
+        if 'migrate' not in app.extensions:
+            from flask_migrate import Migrate
+            from . import search
+            # Registers Flask-Migrate's own group over this one in app.cli
+            Migrate(app, db, include_name=search.include_name)
+        return app.cli.commands['db']
+
+    def make_context(self, info_name, args, parent=None, **extra):
+        # Flask-Migrate's group parses its own options and runs the command
+        return self.migrate_group().make_context(info_name, args, parent=parent, **extra)
+
+
+db_cli = MigrateGroup('db', help='Perform database migrations.')
@@ -0,0 +1,130 @@
+"""gzip and brotli response compression, negotiated from Accept-Encoding.
+
+List responses repeat the same nested user objects on every row, so they
+compress 5-20x. An after_request hook compresses a response when:
+
+* the client accepts ``br`` or ``gzip`` (brotli only if the ``brotli``
+  package is installed; the best-weighted encoding wins)
+* its mimetype is in COMPRESS_MIMETYPES (JSON, NDJSON and plain text,
+  which covers /metrics, by default; never text/event-stream, whose
+  events have to arrive as they happen)
+* it is at least COMPRESS_MIN_SIZE bytes. Smaller bodies fit in one
+  packet either way and aren't worth the CPU
+
+A streamed response (the NDJSON exports) is compressed as it streams.
+Chunks go through one compressor, which is flushed every
+COMPRESS_STREAM_FLUSH_BYTES of input, so the client keeps receiving rows
+and memory stays flat however long the export is.
+
+Compressed responses get ``Vary: Accept-Encoding``, and a strong ETag is
+made weak, since the bytes now depend on the encoding. If-None-Match is
+compared weakly (versions.py, asgi.py), so the tag still validates.
+"""
+import zlib
+
+from flask import request
+from werkzeug.http import parse_accept_header
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+ENCODINGS = ('br', 'gzip') if brotli is not None else ('gzip',)
+DEFAULT_MIMETYPES = ('application/json', 'application/x-ndjson', 'text/plain')
+SKIPPED_STATUSES = frozenset((204, 206, 304))
+
+
+def negotiate(accept_encoding):
+    """The encoding to use for an Accept-Encoding header, or None."""
+    if not accept_encoding:
+        return None
+    return parse_accept_header(accept_encoding).best_match(ENCODINGS)
+
+
+def compressor(encoding, gzip_level=6, brotli_quality=4):
+    """Return (compress, flush, finish) callables for one stream."""
+    if encoding == 'br':
+        c = brotli.Compressor(quality=brotli_quality)
+        return c.process, c.flush, c.finish
+    # wbits 31: a gzip header and trailer around the deflate stream
+    c = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)
+    return c.compress, lambda: c.flush(zlib.Z_SYNC_FLUSH), c.flush
+
+
+def compress(data, encoding, gzip_level=6, brotli_quality=4):
+    if encoding == 'br':
+        return brotli.compress(data, quality=brotli_quality)
+    c = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)
+    return c.compress(data) + c.flush()
+
+
+def compress_stream(chunks, encoding, gzip_level=6, brotli_quality=4, flush_bytes=65536):
+    """Compress an iterable of str/bytes chunks, yielding as output is ready."""
+    process, flush, finish = compressor(encoding, gzip_level, brotli_quality)
+    pending = 0
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = chunk.encode('utf-8')
+        out = process(chunk)
+        pending += len(chunk)
+        if pending >= flush_bytes:
+            out += flush()
+            pending = 0
+        if out:
+            yield out
+    yield finish()
+
+
+class Compression:
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Install the hook. Call after metrics, so the response size
+        histogram records the bytes actually sent."""
+        app.config.setdefault('COMPRESS_ENABLED', True)
+        app.config.setdefault('COMPRESS_MIN_SIZE', 1024)
+        app.config.setdefault('COMPRESS_GZIP_LEVEL', 6)
+        app.config.setdefault('COMPRESS_BROTLI_QUALITY', 4)
+        app.config.setdefault('COMPRESS_STREAM_FLUSH_BYTES', 65536)
+        app.config.setdefault('COMPRESS_MIMETYPES', DEFAULT_MIMETYPES)
+        self.config = app.config
+        app.extensions['compression'] = self
+        if app.config['COMPRESS_ENABLED']:
+            app.after_request(self._compress)
+
+    def options(self):
+        return self.config['COMPRESS_GZIP_LEVEL'], self.config['COMPRESS_BROTLI_QUALITY']
+
+    def _compress(self, response):
+        if (request.method == 'HEAD' or response.status_code < 200
+                or response.status_code in SKIPPED_STATUSES
+                or response.direct_passthrough or 'Content-Encoding' in response.headers
+                or response.mimetype not in self.config['COMPRESS_MIMETYPES']):
+            return response
+        response.vary.add('Accept-Encoding')
+        encoding = negotiate(request.headers.get('Accept-Encoding'))
+        if encoding is None:
+            return response
+
+        if response.is_streamed:
+            original = response.response
+            response.response = compress_stream(original, encoding, *self.options(),
+                                                flush_bytes=self.config['COMPRESS_STREAM_FLUSH_BYTES'])
+            if hasattr(original, 'close'):
+                response.call_on_close(original.close)
+            response.headers.pop('Content-Length', None)
+        else:
+            data = response.get_data()
+            if len(data) < self.config['COMPRESS_MIN_SIZE']:
+                return response
+            response.set_data(compress(data, encoding, *self.options()))
+
+        response.headers['Content-Encoding'] = encoding
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
@@ -1,13 +1,76 @@
 import os
+from datetime import timedelta
 from dotenv import load_dotenv
+from .logs import parse_logger_map
+from .ratelimit import DEFAULT_RULES
 
 load_dotenv()
 
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'you-will-never-guess'
+    # Reverse proxies in front of the app that append to X-Forwarded-For;
+    # request.remote_addr is then the client's address (rate limits, logs)
+    PROXY_FIX_X_FOR = int(os.environ.get('PROXY_FIX_X_FOR', 0))
     uri = os.environ.get('DATABASE_URL')
     if uri and uri.startswith("postgres://"):
         uri = uri.replace("postgres://", "postgresql://", 1)
     SQLALCHEMY_DATABASE_URI = uri or 'sqlite:///healthcare.db'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Read replicas for GET requests (see app/replicas.py)
+    SQLALCHEMY_REPLICA_URIS = [
+        replica.strip().replace("postgres://", "postgresql://", 1)
+        for replica in os.environ.get('DATABASE_REPLICA_URLS', '').split(',') if replica.strip()
+    ]
+    # Engine profile (see app/db_profiles.py); unset picks one from the URI
+    DB_PROFILE = os.environ.get('DB_PROFILE')
+    DB_POOL_SIZE = int(os.environ['DB_POOL_SIZE']) if os.environ.get('DB_POOL_SIZE') else None
+    DB_MAX_OVERFLOW = int(os.environ['DB_MAX_OVERFLOW']) if os.environ.get('DB_MAX_OVERFLOW') else None
+    DB_POOL_TIMEOUT = float(os.environ['DB_POOL_TIMEOUT']) if os.environ.get('DB_POOL_TIMEOUT') else None
+    DB_POOL_RECYCLE = int(os.environ['DB_POOL_RECYCLE']) if os.environ.get('DB_POOL_RECYCLE') else None
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY') or 'super-secret-jwt-key'
+    JWT_ACCESS_TOKEN_EXPIRES = timedelta(minutes=int(os.environ.get('JWT_ACCESS_TOKEN_MINUTES', 15)))
+    # Only /api/events reads tokens from the query string (EventSource can't set headers)
+    JWT_QUERY_STRING_NAME = 'token'
+    JWT_REFRESH_TOKEN_EXPIRES = timedelta(days=int(os.environ.get('JWT_REFRESH_TOKEN_DAYS', 30)))
+
+    # Password hashing pool (see app/hashing.py)
+    HASH_POOL_KIND = os.environ.get('HASH_POOL_KIND', 'thread')  # 'thread' or 'process'
+    HASH_POOL_WORKERS = int(os.environ.get('HASH_POOL_WORKERS', 2))
+    HASH_POOL_MAX_QUEUE = int(os.environ.get('HASH_POOL_MAX_QUEUE', 16))
+    HASH_POOL_TIMEOUT = float(os.environ.get('HASH_POOL_TIMEOUT', 10))
+    HASH_POOL_RETRY_AFTER = int(os.environ.get('HASH_POOL_RETRY_AFTER', 1))
+
+    # Change feed (see app/events.py)
+    EVENTS_BACKEND = os.environ.get('EVENTS_BACKEND', 'app.events:LocalEventBackend')
+    EVENTS_BUFFER_SIZE = int(os.environ.get('EVENTS_BUFFER_SIZE', 1000))
+    EVENTS_POLL_SECONDS = float(os.environ.get('EVENTS_POLL_SECONDS', 1))
+
+    # Threads for the requests asgi.py hands to Flask; each open change feed holds one
+    ASGI_THREADS = int(os.environ.get('ASGI_THREADS', 32))
+
+    # Prometheus /metrics (see app/metrics.py)
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+
+    # Structured logging (see app/logs.py)
+    LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO').upper()
+    LOG_LEVELS = parse_logger_map(os.environ.get('LOG_LEVELS'), str.upper)
+    LOG_SAMPLE_RATES = parse_logger_map(os.environ.get('LOG_SAMPLE_RATES'), float)
+    LOG_RATE_LIMITS = parse_logger_map(os.environ.get('LOG_RATE_LIMITS'), float)
+    LOG_QUEUE_SIZE = int(os.environ.get('LOG_QUEUE_SIZE', 10000))
+
+    # Rate limits for auth and write requests (see app/ratelimit.py)
+    RATELIMIT_ENABLED = os.environ.get('RATELIMIT_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+    RATELIMIT_BACKEND = os.environ.get('RATELIMIT_BACKEND', 'app.ratelimit:LocalRateLimitBackend')
+    RATELIMIT_RULES = {**DEFAULT_RULES, **parse_logger_map(os.environ.get('RATELIMIT_RULES'), str)}
+    RATELIMIT_MAX_KEYS = int(os.environ.get('RATELIMIT_MAX_KEYS', 100000))
+
+    # JSON encoding and response compression (see app/json_provider.py, app/compression.py)
+    JSON_PROVIDER = os.environ.get('JSON_PROVIDER', 'auto')  # 'auto', 'orjson' or 'stdlib'
+    COMPRESS_ENABLED = os.environ.get('COMPRESS_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+    COMPRESS_MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE', 1024))
+    COMPRESS_GZIP_LEVEL = int(os.environ.get('COMPRESS_GZIP_LEVEL', 6))
+    COMPRESS_BROTLI_QUALITY = int(os.environ.get('COMPRESS_BROTLI_QUALITY', 4))
+
+    # In-memory recommendation graph (see app/recommend.py)
+    RECOMMENDATIONS_REFRESH_SECONDS = float(os.environ.get('RECOMMENDATIONS_REFRESH_SECONDS', 300))
+    RECOMMENDATIONS_MAX_CHANGES = int(os.environ.get('RECOMMENDATIONS_MAX_CHANGES', 5000))
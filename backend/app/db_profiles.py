@@ -0,0 +1,195 @@
+"""Engine profiles: pool sizing, SQLite pragmas and pool metrics.
+
+``DB_PROFILE`` picks one of PROFILES (default: ``dev-sqlite`` for SQLite
+URIs, ``prod-postgres`` otherwise). A profile supplies pool options for
+``SQLALCHEMY_ENGINE_OPTIONS`` and, for SQLite, pragmas that are run on
+every new connection. The important ones are busy_timeout, which makes a
+second writer wait for the lock instead of failing at once with "database
+is locked", and in ``prod-sqlite`` WAL, which lets readers proceed while
+one writer commits. WAL is a setting of the database file itself and adds
+-wal and -shm files next to it, so ``dev-sqlite`` leaves the journal mode
+of a development database alone. Anything set explicitly in ``SQLALCHEMY_ENGINE_OPTIONS`` or
+the ``DB_POOL_*`` settings wins over the profile.
+
+Engines use TimedQueuePool, which counts checkouts, the time spent waiting
+for a free connection, pool timeouts and peak utilization. Stats are per
+worker process.
+"""
+import logging
+import threading
+import time
+
+from sqlalchemy import event, exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
+
+PROFILES = {
+    'dev-sqlite': {
+        'dialect': 'sqlite',
+        'engine_options': {},
+        'pragmas': {
+            'busy_timeout': 5000,
+        },
+    },
+    'prod-sqlite': {
+        'dialect': 'sqlite',
+        # SQLite has a single writer, so a large pool only adds lock waits
+        'engine_options': {'pool_size': 8, 'max_overflow': 8, 'pool_timeout': 10},
+        'pragmas': {
+            'journal_mode': 'WAL',
+            # Durable at each checkpoint; a power loss can drop the last
+            # few commits but never corrupts the database in WAL mode
+            'synchronous': 'NORMAL',
+            'busy_timeout': 5000,
+            'cache_size': -64000,  # KiB, i.e. 64 MiB of page cache
+            'mmap_size': 268435456,
+            'temp_store': 'MEMORY',
+        },
+    },
+    'prod-postgres': {
+        'dialect': 'postgresql',
+        'engine_options': {
+            'pool_size': 10,
+            'max_overflow': 20,
+            'pool_timeout': 30,
+            # Recycle before typical server/proxy idle timeouts cut the
+            # connection, and ping on checkout in case one did anyway
+            'pool_recycle': 1800,
+            'pool_pre_ping': True,
+        },
+        'pragmas': {},
+    },
+}
+
+# DB_POOL_* config keys and the engine option each one overrides
+POOL_OVERRIDES = {
+    'DB_POOL_SIZE': 'pool_size',
+    'DB_MAX_OVERFLOW': 'max_overflow',
+    'DB_POOL_TIMEOUT': 'pool_timeout',
+    'DB_POOL_RECYCLE': 'pool_recycle',
+}
+
+
+class PoolStats:
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.checkouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.timeouts = 0
+        self.peak_checked_out = 0
+
+    def record(self, waited, checked_out):
+        with self.lock:
+            self.checkouts += 1
+            self.wait_total += waited
+            if waited > self.wait_max:
+                self.wait_max = waited
+            if checked_out > self.peak_checked_out:
+                self.peak_checked_out = checked_out
+
+    def timed_out(self):
+        with self.lock:
+            self.timeouts += 1
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+        if not self.echo:
+            # SQLAlchemy names pool loggers after the class's module, which
+            # would put checkout chatter under the app's own 'app' logger
+            self.logger = logging.getLogger(f'{QueuePool.__module__}.{QueuePool.__name__}')
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            self.stats.timed_out()
+            raise
+        self.stats.record(time.perf_counter() - started, self.checkedout())
+        return connection
+
+
+def apply_pragmas(engine, pragmas):
+    """Run ``PRAGMA name=value`` for each pragma on every new connection."""
+    if not pragmas:
+        return
+
+    @event.listens_for(engine, 'connect')
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f'PRAGMA {name}={value}')
+        finally:
+            cursor.close()
+
+
+class EngineProfile:
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Fill in SQLALCHEMY_ENGINE_OPTIONS. Call before db.init_app."""
+        url = make_url(app.config['SQLALCHEMY_DATABASE_URI'])
+        dialect = url.get_backend_name()
+        name = app.config.get('DB_PROFILE') or ('dev-sqlite' if dialect == 'sqlite' else 'prod-postgres')
+        if name not in PROFILES:
+            raise ValueError(f'Unknown DB_PROFILE {name!r}; expected one of {", ".join(PROFILES)}')
+        profile = PROFILES[name]
+        if profile['dialect'] != dialect:
+            raise ValueError(f'DB_PROFILE {name!r} is for {profile["dialect"]}, not {dialect}')
+
+        options = {}
+        # In-memory SQLite gets a StaticPool from Flask-SQLAlchemy, so pool
+        # options don't apply; every other database uses the timed pool.
+        if not (dialect == 'sqlite' and url.database in (None, '', ':memory:')):
+            options.update(profile['engine_options'], poolclass=TimedQueuePool)
+            for key, option in POOL_OVERRIDES.items():
+                if app.config.get(key) is not None:
+                    options[option] = app.config[key]
+        options.update(app.config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+        app.config['DB_PROFILE'] = name
+        app.extensions['engine_profile'] = self
+
+    def instrument(self, app, engine):
+        """Install the profile's connect-time pragmas on ``engine``."""
+        apply_pragmas(engine, PROFILES[app.config['DB_PROFILE']]['pragmas'])
+
+    def stats(self, app, engine):
+        pool = engine.pool
+        stats = {
+            'profile': app.config['DB_PROFILE'],
+            'pool': type(pool).__name__,
+        }
+        if isinstance(pool, QueuePool):
+            capacity = pool.size() + max(pool._max_overflow, 0)
+            stats.update({
+                'size': pool.size(),
+                'max_overflow': pool._max_overflow,
+                'checked_out': pool.checkedout(),
+                'idle': pool.checkedin(),
+                'utilization': round(pool.checkedout() / capacity, 3) if capacity else None,
+            })
+        if isinstance(pool, TimedQueuePool):
+            pool_stats = pool.stats
+            with pool_stats.lock:
+                checkouts = pool_stats.checkouts
+                stats.update({
+                    'checkouts': checkouts,
+                    'checkout_wait_total_ms': round(pool_stats.wait_total * 1000, 3),
+                    'checkout_wait_avg_ms': round(pool_stats.wait_total * 1000 / checkouts, 3) if checkouts else 0.0,
+                    'checkout_wait_max_ms': round(pool_stats.wait_max * 1000, 3),
+                    'timeouts': pool_stats.timeouts,
+                    'peak_checked_out': pool_stats.peak_checked_out,
+                })
+        return stats
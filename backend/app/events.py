@@ -0,0 +1,250 @@
+"""Per-user change feed for connection requests and activity invites.
+
+Write paths call ``events.publish(user_ids, type, data)`` after they commit;
+/api/events streams each user's events as server-sent events. The broker
+delegates storage and fan-out to a backend chosen by ``EVENTS_BACKEND``:
+
+* ``publish(user_id, event_type, data)`` stores the event and returns its id
+* ``replay(user_id, after_id)`` returns ``(events, complete)``, where
+  ``complete`` is False if events after ``after_id`` already fell out of the
+  buffer
+* ``subscribe(user_id)`` returns a subscription with ``get(timeout)`` and
+  ``close()``
+
+LocalEventBackend keeps everything in this process. That is enough for the
+dev server or a single worker. With several workers or servers, a client's
+stream and the write it should hear about land in different processes, so
+use SQLEventBackend, which shares the events through a table.
+"""
+import itertools
+import logging
+import queue
+import threading
+import time
+from collections import deque, namedtuple
+
+from sqlalchemy import func, select
+from werkzeug.utils import import_string
+
+logger = logging.getLogger(__name__)
+
+Event = namedtuple('Event', 'id user_id type data')
+
+
+class Subscription:
+
+    def __init__(self, backend, user_id, maxsize):
+        self.backend = backend
+        self.user_id = user_id
+        self.queue = queue.Queue(maxsize=maxsize)
+        # Set when the reader fell behind and events were dropped; the
+        # stream then tells the client to refetch instead of going silent.
+        self.overflowed = False
+
+    def put(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except queue.Full:
+            self.overflowed = True
+
+    def get(self, timeout):
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self.backend.unsubscribe(self)
+
+
+class LocalEventBackend:
+
+    def __init__(self, buffer_size=1000, subscriber_queue_size=100, poll_seconds=None):
+        # One ring buffer shared by all users keeps memory bounded no
+        # matter how many users there are; replay scans it, which is fine
+        # because replay only happens on reconnect. Nothing is polled, so
+        # poll_seconds isn't used.
+        self.buffer = deque(maxlen=buffer_size)
+        self.subscriber_queue_size = subscriber_queue_size
+        self.subscribers = {}
+        self.ids = itertools.count(1)
+        self.lock = threading.Lock()
+
+    def publish(self, user_id, event_type, data):
+        user_id = str(user_id)
+        with self.lock:
+            event = Event(next(self.ids), user_id, event_type, data)
+            self.buffer.append(event)
+            subscribers = list(self.subscribers.get(user_id, ()))
+        for subscription in subscribers:
+            subscription.put(event)
+        return event.id
+
+    def replay(self, user_id, after_id):
+        user_id = str(user_id)
+        with self.lock:
+            buffered = list(self.buffer)
+        if buffered:
+            # Complete if nothing after after_id has been evicted yet, and
+            # after_id is one of ours (ids restart with the process).
+            complete = buffered[0].id <= after_id + 1 and after_id <= buffered[-1].id
+        else:
+            complete = after_id == 0
+        events = [event for event in buffered if event.id > after_id and event.user_id == user_id]
+        return events, complete
+
+    def subscribe(self, user_id):
+        subscription = Subscription(self, str(user_id), self.subscriber_queue_size)
+        with self.lock:
+            self.subscribers.setdefault(subscription.user_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            subscribers = self.subscribers.get(subscription.user_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self.subscribers[subscription.user_id]
+
+
+class SQLEventBackend:
+    """Events in the change_event table of the primary database.
+
+    publish() inserts a row in its own transaction, apart from the
+    request's session, and the row id is the event id. While a process has
+    subscribers, one thread polls the table every poll_seconds for rows
+    after the last one it saw and hands them to the local subscriptions, so
+    an event reaches streams in every worker and server within about
+    poll_seconds. Replay reads the table; the newest buffer_size rows are
+    kept and older ones are deleted every PRUNE_SECONDS.
+    """
+
+    PRUNE_SECONDS = 60
+
+    def __init__(self, buffer_size=1000, subscriber_queue_size=100, poll_seconds=1):
+        from .extensions import db
+        from .models import ChangeEvent
+        self.db = db
+        self.model = ChangeEvent
+        self.buffer_size = buffer_size
+        self.subscriber_queue_size = subscriber_queue_size
+        self.poll_seconds = poll_seconds
+        self.subscribers = {}
+        self.lock = threading.Lock()
+        self.poller = None
+        self.last_id = 0
+        self.next_prune = 0
+
+    def publish(self, user_id, event_type, data):
+        table = self.model.__table__
+        with self.db.engine.begin() as conn:
+            if conn.dialect.name == 'postgresql':
+                # Commit in id order, or a poller could see an id and move
+                # past a smaller one that commits after it
+                conn.exec_driver_sql('LOCK TABLE change_event IN EXCLUSIVE MODE')
+            event_id = conn.execute(table.insert().values(
+                user_id=str(user_id), type=event_type, data=data)).inserted_primary_key[0]
+            now = time.monotonic()
+            if now >= self.next_prune:
+                self.next_prune = now + self.PRUNE_SECONDS
+                conn.execute(table.delete().where(table.c.id <= event_id - self.buffer_size))
+        return event_id
+
+    def replay(self, user_id, after_id):
+        table = self.model.__table__
+        with self.db.engine.connect() as conn:
+            first, last = conn.execute(select(func.min(table.c.id), func.max(table.c.id))).one()
+            rows = conn.execute(
+                select(table.c.id, table.c.user_id, table.c.type, table.c.data)
+                .where(table.c.user_id == str(user_id), table.c.id > after_id)
+                .order_by(table.c.id)).all()
+        if first is None:
+            complete = after_id == 0
+        else:
+            complete = first <= after_id + 1 and after_id <= last
+        return [Event(*row) for row in rows], complete
+
+    def subscribe(self, user_id):
+        subscription = Subscription(self, str(user_id), self.subscriber_queue_size)
+        engine = self.db.engine
+        with self.lock:
+            if self.poller is None:
+                # Start after the newest row, so the poller delivers exactly
+                # what is published from here on
+                with engine.connect() as conn:
+                    self.last_id = conn.execute(select(func.max(self.model.id))).scalar() or 0
+                self.poller = threading.Thread(target=self._poll, args=(engine,),
+                                               name='events-poller', daemon=True)
+                self.poller.start()
+            self.subscribers.setdefault(subscription.user_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            subscribers = self.subscribers.get(subscription.user_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self.subscribers[subscription.user_id]
+
+    def _poll(self, engine):
+        table = self.model.__table__
+        while True:
+            time.sleep(self.poll_seconds)
+            with self.lock:
+                if not self.subscribers:
+                    self.poller = None
+                    return
+                last_id = self.last_id
+            try:
+                with engine.connect() as conn:
+                    rows = conn.execute(
+                        select(table.c.id, table.c.user_id, table.c.type, table.c.data)
+                        .where(table.c.id > last_id)
+                        .order_by(table.c.id)
+                        .limit(self.buffer_size)).all()
+            except Exception:
+                logger.exception('events_poll_failed')
+                continue
+            if not rows:
+                continue
+            with self.lock:
+                self.last_id = rows[-1].id
+                deliveries = [(subscription, Event(*row)) for row in rows
+                              for subscription in self.subscribers.get(row.user_id, ())]
+            for subscription, event in deliveries:
+                subscription.put(event)
+
+
+class EventBroker:
+
+    def __init__(self, app=None):
+        self.backend = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('EVENTS_BACKEND', 'app.events:LocalEventBackend')
+        app.config.setdefault('EVENTS_BUFFER_SIZE', 1000)
+        app.config.setdefault('EVENTS_SUBSCRIBER_QUEUE_SIZE', 100)
+        app.config.setdefault('EVENTS_HEARTBEAT_SECONDS', 15)
+        app.config.setdefault('EVENTS_POLL_SECONDS', 1)
+        backend_class = import_string(app.config['EVENTS_BACKEND'])
+        self.backend = backend_class(
+            buffer_size=app.config['EVENTS_BUFFER_SIZE'],
+            subscriber_queue_size=app.config['EVENTS_SUBSCRIBER_QUEUE_SIZE'],
+            poll_seconds=app.config['EVENTS_POLL_SECONDS'],
+        )
+        app.extensions['events'] = self
+
+    def publish(self, user_ids, event_type, data):
+        """Send one event to each of ``user_ids``. Call only after commit."""
+        for user_id in dict.fromkeys(str(user_id) for user_id in user_ids):
+            self.backend.publish(user_id, event_type, data)
+
+    def replay(self, user_id, after_id):
+        return self.backend.replay(user_id, after_id)
+
+    def subscribe(self, user_id):
+        return self.backend.subscribe(user_id)
@@ -1,9 +1,23 @@
 from flask_sqlalchemy import SQLAlchemy
-from flask_migrate import Migrate
 from flask_jwt_extended import JWTManager
-from flask_marshmallow import Marshmallow
+from .hashing import PasswordHasher
+from .events import EventBroker
+from .db_profiles import EngineProfile
+from .replicas import ReplicaRouter, RoutingSession
+from .metrics import Metrics
+from .logs import AppLogging
+from .recommend import Recommender
+from .ratelimit import RateLimiter
+from .compression import Compression
 
-db = SQLAlchemy()
-migrate = Migrate()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+engine_profile = EngineProfile()
+replica_router = ReplicaRouter()
 jwt = JWTManager()
-ma = Marshmallow()
+password_hasher = PasswordHasher()
+events = EventBroker()
+metrics = Metrics()
+logs = AppLogging()
+recommendations = Recommender()
+rate_limiter = RateLimiter()
+compression = Compression()
@@ -0,0 +1,158 @@
+"""Password hashing on a bounded worker pool.
+
+werkzeug's generate_password_hash/check_password_hash are deliberately slow
+KDF calls. Running them inline lets a login burst occupy every request
+thread, so cheap endpoints queue behind them. PasswordHasher runs them on a
+small dedicated pool instead: at most HASH_POOL_WORKERS hashes run at once,
+at most HASH_POOL_MAX_QUEUE more wait, and anything beyond that fails fast
+with HashPoolBusy so the route can answer 503 + Retry-After.
+
+The hash format is unchanged; the pool only decides where werkzeug runs.
+"""
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+
+from flask import g, has_app_context
+from werkzeug.security import check_password_hash, generate_password_hash
+
+
+class HashPoolBusy(Exception):
+
+    def __init__(self, retry_after):
+        super().__init__('password hashing pool is saturated')
+        self.retry_after = retry_after
+
+
+def _timed(func, *args):
+    # Runs in the worker. time.monotonic() is system-wide on Linux, so the
+    # start time is comparable with the submitting process for queue wait.
+    started = time.monotonic()
+    result = func(*args)
+    return result, started, time.monotonic()
+
+
+class _PhaseStats:
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def as_dict(self):
+        return {
+            'count': self.count,
+            'total_ms': round(self.total * 1000, 3),
+            'avg_ms': round(self.total * 1000 / self.count, 3) if self.count else 0.0,
+            'max_ms': round(self.max * 1000, 3),
+        }
+
+
+class PasswordHasher:
+
+    def __init__(self, app=None):
+        self._executor = None
+        self._executor_pid = None
+        self._slots = None
+        self._lock = threading.Lock()
+        self._stats = {}
+        self.rejected = 0
+        self.timed_out = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('HASH_POOL_KIND', 'thread')  # 'thread' or 'process'
+        app.config.setdefault('HASH_POOL_WORKERS', 2)
+        app.config.setdefault('HASH_POOL_MAX_QUEUE', 16)
+        app.config.setdefault('HASH_POOL_TIMEOUT', 10.0)
+        app.config.setdefault('HASH_POOL_RETRY_AFTER', 1)
+        self.kind = app.config['HASH_POOL_KIND']
+        self.workers = app.config['HASH_POOL_WORKERS']
+        self.max_queue = app.config['HASH_POOL_MAX_QUEUE']
+        self.timeout = app.config['HASH_POOL_TIMEOUT']
+        self.retry_after = app.config['HASH_POOL_RETRY_AFTER']
+        self._slots = threading.BoundedSemaphore(self.workers + self.max_queue)
+        app.extensions['password_hasher'] = self
+        app.after_request(self._add_server_timing)
+
+    def generate(self, password):
+        return self._run('hash', generate_password_hash, password)
+
+    def check(self, pwhash, password):
+        return self._run('verify', check_password_hash, pwhash, password)
+
+    def stats(self):
+        with self._lock:
+            phases = {name: stats.as_dict() for name, stats in self._stats.items()}
+        return {
+            'kind': self.kind,
+            'workers': self.workers,
+            'max_queue': self.max_queue,
+            'rejected': self.rejected,
+            'timed_out': self.timed_out,
+            'phases': phases,
+        }
+
+    def _pool(self):
+        # Created lazily and per process: a pool built before gunicorn forks
+        # would be shared (threads) or broken (processes) in the workers.
+        pid = os.getpid()
+        if self._executor is None or self._executor_pid != pid:
+            with self._lock:
+                if self._executor is None or self._executor_pid != pid:
+                    executor_class = ProcessPoolExecutor if self.kind == 'process' else ThreadPoolExecutor
+                    self._executor = executor_class(max_workers=self.workers)
+                    self._executor_pid = pid
+        return self._executor
+
+    def _run(self, op, func, *args):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise HashPoolBusy(self.retry_after)
+
+        submitted = time.monotonic()
+        try:
+            future = self._pool().submit(_timed, func, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+
+        try:
+            result, started, finished = future.result(timeout=self.timeout)
+        except FutureTimeout:
+            with self._lock:
+                self.timed_out += 1
+            raise HashPoolBusy(self.retry_after)
+
+        self._record(op, started - submitted, finished - started)
+        return result
+
+    def _record(self, op, queued, computed):
+        with self._lock:
+            for phase, seconds in ((f'{op}_queue', queued), (op, computed)):
+                self._stats.setdefault(phase, _PhaseStats()).add(max(seconds, 0.0))
+        if has_app_context():
+            timings = g.setdefault('server_timing', [])
+            timings.append((f'{op}-queue', queued))
+            timings.append((op, computed))
+
+    @staticmethod
+    def _add_server_timing(response):
+        timings = g.get('server_timing')
+        if timings:
+            response.headers['Server-Timing'] = ', '.join(
+                f'{name};dur={seconds * 1000:.1f}' for name, seconds in timings
+            )
+        return response
+
@@ -0,0 +1,91 @@
+"""JSON providers for ``app.json``, with orjson when it is installed.
+
+JSON_PROVIDER picks the provider create_app installs:
+
+* ``auto`` (default): orjson if it can be imported, otherwise the stdlib
+* ``orjson``: orjson, and fail at startup if it is missing
+* ``stdlib``: the json module, through Flask's provider
+
+Every jsonify() and NDJSON stream goes through ``app.json``, so this is
+the only switch. Both providers write dates and datetimes as the
+marshmallow schemas do, with ``isoformat()``: '2026-01-01T09:30:00',
+microseconds when set, an offset when tz-aware. Flask's HTTP-date format
+is not used, so the output doesn't depend on which provider is installed.
+Keys are sorted, and the output is compact outside debug mode, as with
+Flask's default. One difference: orjson writes non-ASCII text as UTF-8
+rather than ``\\u`` escapes.
+"""
+import decimal
+import uuid
+from datetime import date
+
+from flask.json.provider import DefaultJSONProvider, JSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _default(o):
+    if isinstance(o, date):
+        return o.isoformat()
+    return DefaultJSONProvider.default(o)
+
+
+class StdlibJSONProvider(DefaultJSONProvider):
+
+    default = staticmethod(_default)
+
+
+def _orjson_default(o):
+    # What orjson doesn't handle natively, the way Flask's provider does
+    if isinstance(o, (decimal.Decimal, uuid.UUID)):
+        return str(o)
+    if hasattr(o, '__html__'):
+        return str(o.__html__())
+    raise TypeError(f'Object of type {type(o).__name__} is not JSON serializable')
+
+
+class OrjsonProvider(JSONProvider):
+
+    sort_keys = True
+    compact = None
+    mimetype = 'application/json'
+
+    def _options(self, indent=False):
+        options = orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        if indent:
+            options |= orjson.OPT_INDENT_2
+        return options
+
+    def dumps(self, obj, **kwargs):
+        # separators and the like are stdlib options; orjson is always compact
+        return orjson.dumps(obj, default=_orjson_default, option=self._options(bool(kwargs.get('indent')))).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        data = orjson.dumps(obj, default=_orjson_default, option=self._options(indent))
+        return self._app.response_class(data + b'\n', mimetype=self.mimetype)
+
+
+PROVIDERS = {'stdlib': StdlibJSONProvider, 'orjson': OrjsonProvider}
+
+
+def json_provider(app):
+    """Build the provider JSON_PROVIDER asks for."""
+    name = app.config.get('JSON_PROVIDER') or 'auto'
+    if name == 'auto':
+        name = 'orjson' if orjson is not None else 'stdlib'
+    if name not in PROVIDERS:
+        raise ValueError(f'Unknown JSON_PROVIDER {name!r}; expected auto, {", ".join(PROVIDERS)}')
+    if name == 'orjson' and orjson is None:
+        raise ValueError('JSON_PROVIDER is orjson but the orjson package is not installed')
+    app.config['JSON_PROVIDER'] = name
+    return PROVIDERS[name](app)
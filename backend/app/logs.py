@@ -0,0 +1,251 @@
+"""Structured application logging through a queue and a background writer.
+
+Request threads never write to stderr themselves. Records from the ``app``
+logger tree (``logging.getLogger(__name__)`` in any module under app/) go
+through a QueueHandler. The handler drops the record if the queue is full
+instead of blocking, and a QueueListener thread formats and writes it. A
+slow or stalled stderr pipe under gunicorn then costs lost log lines, not
+stalled workers.
+
+Each record is written as one JSON object with ``ts``, ``level``,
+``logger``, ``message``, the ``request_id`` of the request that logged it,
+and any ``extra={...}`` fields. Request ids come from an incoming
+X-Request-ID header or are generated, and are echoed in the response.
+Requests the ASGI mode answers without Flask put theirs in
+``native_request_id``.
+
+Below WARNING, hot loggers can be thinned out (logger names match by
+prefix, so ``app.routes`` covers every route module):
+
+* LOG_SAMPLE_RATES: ``{logger: fraction}``. Sampling is decided per
+  request id, so a sampled request keeps all of its lines.
+* LOG_RATE_LIMITS: ``{logger: records per second}``, a token bucket that
+  allows a one-second burst.
+
+LOG_LEVEL is the level switch. LOG_LEVELS overrides it per logger, e.g.
+``{'app.routes.connection_routes': 'DEBUG'}``.
+"""
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import re
+import threading
+import time
+import uuid
+import zlib
+from contextvars import ContextVar
+from datetime import datetime, timezone
+
+from flask import g, has_request_context, request
+
+REQUEST_ID_HEADER = 'X-Request-ID'
+VALID_REQUEST_ID = re.compile(r'^[A-Za-z0-9._:-]{1,128}$')
+# Attributes every LogRecord has; anything else on a record came from extra=
+RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {'message', 'request_id'}
+native_request_id = ContextVar('native_request_id', default=None)
+
+
+def make_request_id(header):
+    """The incoming X-Request-ID if it is well-formed, else a new one."""
+    header = header or ''
+    return header if VALID_REQUEST_ID.match(header) else uuid.uuid4().hex
+
+
+def parse_logger_map(value, convert):
+    """Parse ``'name=value,name=value'`` from an environment variable."""
+    result = {}
+    for item in (value or '').split(','):
+        if item.strip():
+            name, _, setting = item.partition('=')
+            result[name.strip()] = convert(setting.strip())
+    return result
+
+
+def lookup(settings, name):
+    """Return the setting for the closest configured ancestor of ``name``."""
+    while True:
+        if name in settings:
+            return name, settings[name]
+        if '.' not in name:
+            return None, None
+        name = name.rsplit('.', 1)[0]
+
+
+class JsonFormatter(logging.Formatter):
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        if getattr(record, 'request_id', None):
+            entry['request_id'] = record.request_id
+        for key, value in vars(record).items():
+            if key not in RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class _TokenBucket:
+
+    def __init__(self, rate):
+        self.rate = rate
+        self.tokens = rate
+        self.updated = time.monotonic()
+
+    def take(self):
+        now = time.monotonic()
+        self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+
+class AsyncJsonHandler(logging.handlers.QueueHandler):
+    """Enqueues records without blocking; a listener thread writes them."""
+
+    def __init__(self, stream_handler, queue_size, sample_rates, rate_limits):
+        super().__init__(queue.Queue(maxsize=queue_size))
+        self.stream_handler = stream_handler
+        self.sample_rates = sample_rates
+        self.rate_limits = rate_limits
+        self._buckets = {name: _TokenBucket(rate) for name, rate in rate_limits.items()}
+        self._listener = None
+        self._listener_pid = None
+        self._lock = threading.Lock()
+        self.dropped = 0
+        self.sampled_out = 0
+        self.rate_limited = 0
+
+    def filter(self, record):
+        record.request_id = g.get('request_id') if has_request_context() else native_request_id.get()
+        if record.levelno >= logging.WARNING:
+            return True
+        _, rate = lookup(self.sample_rates, record.name)
+        if rate is not None and not self._sampled(record.request_id, rate):
+            self.sampled_out += 1
+            return False
+        name, _ = lookup(self.rate_limits, record.name)
+        if name is not None:
+            with self._lock:
+                allowed = self._buckets[name].take()
+            if not allowed:
+                self.rate_limited += 1
+                return False
+        return super().filter(record)
+
+    @staticmethod
+    def _sampled(request_id, rate):
+        if request_id is None:
+            return random.random() < rate
+        return zlib.crc32(request_id.encode()) / 0xFFFFFFFF < rate
+
+    def prepare(self, record):
+        # Runs in the request thread. Only resolve what can't travel across
+        # threads (args, traceback objects); JSON formatting and the write
+        # happen in the listener.
+        record = logging.makeLogRecord(vars(record))
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        self._ensure_listener()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def _ensure_listener(self):
+        # Started lazily and per process: a listener thread started before
+        # gunicorn forks does not exist in the workers.
+        pid = os.getpid()
+        if self._listener is None or self._listener_pid != pid:
+            with self._lock:
+                if self._listener is None or self._listener_pid != pid:
+                    self._listener = logging.handlers.QueueListener(
+                        self.queue, self.stream_handler, respect_handler_level=True)
+                    self._listener.start()
+                    self._listener_pid = pid
+
+    def close(self):
+        with self._lock:
+            if self._listener is not None and self._listener_pid == os.getpid():
+                self._listener.stop()
+            self._listener = None
+        super().close()
+
+    def stats(self):
+        return {
+            'queued': self.queue.qsize(),
+            'queue_size': self.queue.maxsize,
+            'dropped': self.dropped,
+            'sampled_out': self.sampled_out,
+            'rate_limited': self.rate_limited,
+        }
+
+
+class AppLogging:
+
+    def __init__(self, app=None):
+        self.handler = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('LOG_LEVEL', 'INFO')
+        app.config.setdefault('LOG_LEVELS', {})
+        app.config.setdefault('LOG_SAMPLE_RATES', {})
+        app.config.setdefault('LOG_RATE_LIMITS', {})
+        app.config.setdefault('LOG_QUEUE_SIZE', 10000)
+
+        if self.handler is not None:
+            self.close()
+        stream_handler = logging.StreamHandler()
+        stream_handler.setFormatter(JsonFormatter())
+        self.handler = AsyncJsonHandler(
+            stream_handler, app.config['LOG_QUEUE_SIZE'],
+            app.config['LOG_SAMPLE_RATES'], app.config['LOG_RATE_LIMITS'])
+
+        # 'app' is this package and also Flask's app.logger, which skips its
+        # own stderr handler when a handler is already attached.
+        logger = logging.getLogger('app')
+        logger.addHandler(self.handler)
+        logger.setLevel(app.config['LOG_LEVEL'])
+        logger.propagate = False
+        for name, level in app.config['LOG_LEVELS'].items():
+            logging.getLogger(name).setLevel(level)
+
+        app.before_request(self._assign_request_id)
+        app.after_request(self._add_request_id)
+        app.extensions['logging'] = self
+
+    def close(self):
+        logging.getLogger('app').removeHandler(self.handler)
+        self.handler.close()
+        self.handler = None
+
+    def stats(self):
+        return self.handler.stats()
+
+    @staticmethod
+    def _assign_request_id():
+        g.request_id = make_request_id(request.headers.get(REQUEST_ID_HEADER))
+
+    @staticmethod
+    def _add_request_id(response):
+        if 'request_id' in g:
+            response.headers[REQUEST_ID_HEADER] = g.request_id
+        return response
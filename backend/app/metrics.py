@@ -0,0 +1,158 @@
+"""Prometheus metrics: per-route latency, payload sizes, SQL and JWT cost.
+
+Every request records, labelled by blueprint and endpoint:
+
+* ``http_request_duration_seconds``: time until the response headers
+  are ready (for streamed responses that is time to first byte)
+* ``http_request_size_bytes`` and ``http_response_size_bytes``
+* ``http_requests_total`` by method and status
+* ``db_statements_per_request`` and ``db_time_per_request_seconds``:
+  counted from SQLAlchemy cursor events on every engine
+* ``jwt_decode_seconds``: time to verify the access/refresh token
+
+The ASGI mode's native list handlers (asgi.py) record the same metrics
+under the same labels; their statements are counted through ``db_usage``.
+
+GET /metrics serves them in the Prometheus text format. Under gunicorn,
+set PROMETHEUS_MULTIPROC_DIR to an empty directory. Each worker then
+writes its samples there (mmap'd files, so recording stays a few
+hundred nanoseconds), and /metrics, served by any worker, aggregates
+them all. gunicorn.conf.py cleans up after dead workers.
+"""
+import os
+import time
+from contextvars import ContextVar
+
+from flask import Response, g, has_request_context, request
+from flask_jwt_extended.config import config as jwt_config
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest, multiprocess,
+)
+from sqlalchemy import event
+
+ROUTE_LABELS = ('blueprint', 'endpoint')
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, float('inf'))
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 50, 100, float('inf'))
+
+REQUEST_DURATION = Histogram(
+    'http_request_duration_seconds', 'Time to produce the response', ROUTE_LABELS + ('method',))
+REQUESTS = Counter(
+    'http_requests_total', 'Requests handled', ROUTE_LABELS + ('method', 'status'))
+REQUEST_SIZE = Histogram(
+    'http_request_size_bytes', 'Request body size', ROUTE_LABELS, buckets=SIZE_BUCKETS)
+RESPONSE_SIZE = Histogram(
+    'http_response_size_bytes', 'Response body size (unknown for streamed responses)',
+    ROUTE_LABELS, buckets=SIZE_BUCKETS)
+DB_STATEMENTS = Histogram(
+    'db_statements_per_request', 'SQL statements executed per request', ROUTE_LABELS,
+    buckets=STATEMENT_BUCKETS)
+DB_TIME = Histogram(
+    'db_time_per_request_seconds', 'Time spent in SQL statements per request', ROUTE_LABELS)
+JWT_DECODE = Histogram(
+    'jwt_decode_seconds', 'Time to decode and verify a JWT',
+    buckets=(0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, float('inf')))
+
+
+# [statements, seconds] of a request served without Flask, which has no g
+db_usage = ContextVar('db_usage', default=None)
+
+
+def route_labels():
+    endpoint = request.endpoint or 'unmatched'
+    return request.blueprint or '', endpoint
+
+
+def record_request(labels, method, status, duration, request_size, response_size, statements, db_time):
+    """Observe one request; ``response_size`` is None for streamed responses."""
+    REQUEST_DURATION.labels(*labels, method).observe(duration)
+    REQUESTS.labels(*labels, method, str(status)).inc()
+    REQUEST_SIZE.labels(*labels).observe(request_size)
+    if response_size is not None:
+        RESPONSE_SIZE.labels(*labels).observe(response_size)
+    DB_STATEMENTS.labels(*labels).observe(statements)
+    DB_TIME.labels(*labels).observe(db_time)
+
+
+class Metrics:
+
+    def __init__(self, app=None, db=None, jwt=None):
+        if app is not None:
+            self.init_app(app, db, jwt)
+
+    def init_app(self, app, db, jwt):
+        """Hook into ``app``; call after db.init_app so every engine exists."""
+        app.config.setdefault('METRICS_ENABLED', True)
+        if not app.config['METRICS_ENABLED']:
+            return
+        app.before_request(self._start)
+        app.after_request(self._finish)
+        with app.app_context():
+            for engine in db.engines.values():
+                self.instrument(engine)
+        # The decode key is looked up right before the signature check and
+        # custom verification runs right after the claims are validated
+        jwt.decode_key_loader(self._jwt_decode_started)
+        jwt.token_verification_loader(self._jwt_decode_finished)
+        app.add_url_rule('/metrics', 'metrics', self.metrics_view)
+        app.extensions['metrics'] = self
+
+    def instrument(self, engine):
+        """Count ``engine``'s statements towards the request that runs them."""
+        event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+
+    @staticmethod
+    def _start():
+        g.metrics_started = time.perf_counter()
+        g.db_statements = 0
+        g.db_time = 0.0
+
+    @staticmethod
+    def _finish(response):
+        started = g.pop('metrics_started', None)
+        if started is None or request.endpoint == 'metrics':
+            return response
+        record_request(
+            route_labels(), request.method, response.status_code, time.perf_counter() - started,
+            request.content_length or 0,
+            None if response.is_streamed else response.calculate_content_length() or 0,
+            g.db_statements, g.db_time)
+        return response
+
+    @staticmethod
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('metrics_started', []).append(time.perf_counter())
+
+    @staticmethod
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info['metrics_started'].pop()
+        if has_request_context():
+            if 'db_statements' in g:
+                g.db_statements += 1
+                g.db_time += elapsed
+        elif db_usage.get() is not None:
+            usage = db_usage.get()
+            usage[0] += 1
+            usage[1] += elapsed
+
+    @staticmethod
+    def _jwt_decode_started(jwt_header, jwt_data):
+        if has_request_context():
+            g.jwt_decode_started = time.perf_counter()
+        return jwt_config.decode_key
+
+    @staticmethod
+    def _jwt_decode_finished(jwt_header, jwt_data):
+        started = g.pop('jwt_decode_started', None) if has_request_context() else None
+        if started is not None:
+            JWT_DECODE.observe(time.perf_counter() - started)
+        return True
+
+    @staticmethod
+    def metrics_view():
+        registry = REGISTRY
+        if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+            # Merge the samples every worker wrote to the shared directory
+            registry = CollectorRegistry()
+            multiprocess.MultiProcessCollector(registry)
+        return Response(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
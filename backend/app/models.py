@@ -13,6 +13,17 @@ class User(db.Model):
     role = db.Column(db.String(20), nullable=False) # 'professional' or 'client'
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        # Directory filtered by role and keyset-paginated on id
+        db.Index('ix_user_role_id', 'role', 'id'),
+        # Name-prefix search (app/search.py), with and without a role filter.
+        # text_pattern_ops lets Postgres use them for LIKE 'abc%'.
+        db.Index('ix_user_name_lower', db.func.lower(name).label('name_lower'),
+                 postgresql_ops={'name_lower': 'text_pattern_ops'}),
+        db.Index('ix_user_role_name_lower', 'role', db.func.lower(name).label('name_lower'),
+                 postgresql_ops={'name_lower': 'text_pattern_ops'}),
+    )
+
     # Relationships
     # A professional has many connections (as pro)
     # A client has many connections (as client)
@@ -29,6 +40,14 @@ class Connection(db.Model):
     professional = db.relationship('User', foreign_keys=[professional_id], backref='pro_connections')
     client = db.relationship('User', foreign_keys=[client_id], backref='client_connections')
 
+    __table_args__ = (
+        # One connection per pair: request_pro/invite_client insert with ON
+        # CONFLICT DO NOTHING against it. Also the client_id side of list_connections.
+        db.Index('ix_connection_client_professional', 'client_id', 'professional_id', unique=True),
+        # professional_id side of the OR in list_connections
+        db.Index('ix_connection_professional_id', 'professional_id'),
+    )
+
 class GroupActivity(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(100), nullable=False)
@@ -38,6 +57,10 @@ class GroupActivity(db.Model):
 
     creator = db.relationship('User', backref='created_activities')
 
+    __table_args__ = (
+        db.Index('ix_group_activity_created_by', 'created_by'),
+    )
+
 class ActivityInvite(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     activity_id = db.Column(db.Integer, db.ForeignKey('group_activity.id'), nullable=False)
@@ -46,3 +69,68 @@ class ActivityInvite(db.Model):
 
     activity = db.relationship('GroupActivity', backref='invites')
     client = db.relationship('User', backref='activity_invites')
+
+    __table_args__ = (
+        # One invite per client and activity (the ON CONFLICT target for
+        # invites), and delete-by-activity via the leading column
+        db.Index('ix_activity_invite_activity_client', 'activity_id', 'client_id', unique=True),
+        db.Index('ix_activity_invite_client_id', 'client_id'),
+    )
+
+class RefreshSession(db.Model):
+    # One row per login session rather than per refresh token: a token is
+    # valid only while its generation matches, so rotating it is a single
+    # conditional UPDATE of this row and revocation is a primary-key lookup.
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    generation = db.Column(db.Integer, nullable=False, default=0)
+    revoked = db.Column(db.Boolean, nullable=False, default=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # When the current refresh token was issued; it expires
+    # JWT_REFRESH_TOKEN_EXPIRES later, and then the row can go (app/sessions.py)
+    refreshed_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_refresh_session_user_id', 'user_id'),
+    )
+
+class ChangeVersion(db.Model):
+    # Monotonic counters behind the list endpoints' ETags. Keys are
+    # 'user:<id>' (connections/activities/invites touching that user) and
+    # 'role:<role>' / 'role:*' (the user directory).
+    key = db.Column(db.String(64), primary_key=True)
+    version = db.Column(db.BigInteger, nullable=False, default=0)
+
+class ProfessionalStats(db.Model):
+    # Dashboard counters per professional, kept up to date by the write
+    # paths in the same transaction as the change (see app/stats.py), so
+    # /api/stats is a primary-key read.
+    professional_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    pending_incoming = db.Column(db.BigInteger, nullable=False, default=0)
+    pending_outgoing = db.Column(db.BigInteger, nullable=False, default=0)
+    accepted_clients = db.Column(db.BigInteger, nullable=False, default=0)
+    activities = db.Column(db.BigInteger, nullable=False, default=0)
+    invites_pending = db.Column(db.BigInteger, nullable=False, default=0)
+    invites_accepted = db.Column(db.BigInteger, nullable=False, default=0)
+    invites_declined = db.Column(db.BigInteger, nullable=False, default=0)
+
+class RateLimitBucket(db.Model):
+    # Token buckets for SQLRateLimitBackend (see app/ratelimit.py), shared
+    # by every worker. Times are Unix seconds, comparable across servers.
+    key = db.Column(db.String(255), primary_key=True)
+    tokens = db.Column(db.Float, nullable=False)
+    updated = db.Column(db.Float, nullable=False)
+    rate = db.Column(db.Float, nullable=False)
+    capacity = db.Column(db.Float, nullable=False)
+
+class ChangeEvent(db.Model):
+    # Change feed events for SQLEventBackend (see app/events.py), shared by
+    # every worker. Ids are the event ids clients send back in Last-Event-ID.
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.String(64), nullable=False)
+    type = db.Column(db.String(64), nullable=False)
+    data = db.Column(db.JSON, nullable=False)
+
+    __table_args__ = (
+        db.Index('ix_change_event_user_id_id', 'user_id', 'id'),
+    )
@@ -0,0 +1,100 @@
+import base64
+import json
+
+from flask import Response, current_app, stream_with_context
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+# Rows fetched per round trip when streaming. yield_per turns on
+# stream_results, which uses a server-side cursor on Postgres, so only one
+# batch is held in memory at a time.
+STREAM_BATCH_SIZE = 1000
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(last_id):
+    raw = json.dumps({'id': last_id}).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        return int(data['id'])
+    except (ValueError, TypeError, KeyError):
+        raise InvalidCursor(cursor)
+
+
+def parse_limit(value, default=DEFAULT_PAGE_SIZE, maximum=MAX_PAGE_SIZE):
+    if value is None or value == '':
+        return default
+    limit = int(value)
+    if limit < 1:
+        raise ValueError(value)
+    if maximum is not None:
+        limit = min(limit, maximum)
+    return limit
+
+
+def keyset_query(query, id_column, cursor, limit):
+    """Narrow ``query`` to the page after ``cursor``.
+
+    Rows are ordered by ``id_column`` (monotonic with created_at), so each
+    page is a single index range scan no matter how deep the client pages.
+    """
+    after = decode_cursor(cursor)
+    if after is not None:
+        query = query.filter(id_column > after)
+    # Fetch one extra row to know whether another page exists
+    return query.order_by(id_column).limit(limit + 1)
+
+
+def finish_page(rows, limit):
+    """Trim the extra row fetched by keyset_query and build next_cursor."""
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].id)
+    return rows, next_cursor
+
+
+def keyset_page(query, id_column, cursor, limit):
+    """Return (rows, next_cursor) for the page after ``cursor``."""
+    rows = keyset_query(query, id_column, cursor, limit).all()
+    return finish_page(rows, limit)
+
+
+def stream_ndjson(query, id_column, cursor, dump, limit=None):
+    """Stream ``query`` as newline-delimited JSON, one object per row."""
+    after = decode_cursor(cursor)
+    if after is not None:
+        query = query.filter(id_column > after)
+    query = query.order_by(id_column)
+    if limit is not None:
+        query = query.limit(limit)
+    query = query.yield_per(STREAM_BATCH_SIZE)
+
+    def generate():
+        dumps = current_app.json.dumps
+        try:
+            for row in query:
+                yield dumps(dump(row), separators=(',', ':')) + '\n'
+        finally:
+            # The request's teardown has already dropped this session from
+            # the scoped registry, so nothing else returns its connection
+            query.session.close()
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+
+def wants_ndjson(request):
+    if request.args.get('format') == 'ndjson':
+        return True
+    best = request.accept_mimetypes.best_match(['application/json', 'application/x-ndjson'])
+    return best == 'application/x-ndjson'
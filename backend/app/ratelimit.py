@@ -0,0 +1,272 @@
+"""Token-bucket rate limiting for auth and write requests.
+
+RATELIMIT_RULES maps a blueprint (``auth``) or an endpoint
+(``auth.login``) to one or more limits separated by ``;``, each written
+``COUNT/PERIOD@SCOPE``, e.g. ``'10/minute@ip;100/hour@ip'``. The most
+specific name wins, as with LOG_LEVELS, and an empty value exempts an
+endpoint from its blueprint's rule. Rules only apply to POST, PUT, PATCH
+and DELETE; reads are never limited.
+
+Every limit is a token bucket per scope, caller and endpoint. It holds
+COUNT tokens and refills at COUNT per PERIOD, so a caller can burst COUNT
+requests and then keep up the average rate. ``@ip`` keys on the client
+address. ``@user`` keys on the JWT subject, or on the address when there
+is no valid token. Only the token's signature and expiry are checked.
+Behind a reverse proxy the address is the proxy's unless
+PROXY_FIX_X_FOR is set to the number of proxies (see create_app).
+
+A request is admitted only if every limit on it has a token, and only
+then is a token taken from each, so a request turned away by one limit
+doesn't use up the others.
+
+The check runs in a before_request hook, ahead of the route, so a
+throttled request is answered 429 with Retry-After without touching the
+database or the password hashing pool.
+
+Buckets live in the backend named by RATELIMIT_BACKEND. It is created
+with ``max_keys`` (RATELIMIT_MAX_KEYS) and needs one method:
+
+* ``take(buckets)`` gets a ``(key, rate, capacity)`` tuple per limit. If
+  every bucket has a token it takes one from each and returns 0;
+  otherwise it takes none and returns the seconds until all of them do
+
+LocalRateLimitBackend keeps the buckets in this process. With several
+gunicorn workers each one counts separately, so a caller can get up to
+the worker count times the limit. SQLRateLimitBackend keeps them in the
+primary database, shared by every worker, at the cost of a short
+transaction per limited request.
+"""
+import math
+import re
+import threading
+import time
+from collections import Counter, namedtuple
+from contextlib import ExitStack
+
+from flask import jsonify, request
+from flask_jwt_extended import decode_token
+from prometheus_client import Counter as PrometheusCounter
+from sqlalchemy import bindparam, select
+from werkzeug.utils import import_string
+
+from .logs import lookup
+
+LIMITED_METHODS = frozenset(('POST', 'PUT', 'PATCH', 'DELETE'))
+PERIODS = {'second': 1, 'minute': 60, 'hour': 3600, 'day': 86400}
+LIMIT_FORMAT = re.compile(r'^(\d+)/(second|minute|hour|day)@(ip|user)$')
+
+DEFAULT_RULES = {
+    # Each attempt costs a full password hash
+    'auth.login': '10/minute@ip;100/hour@ip',
+    'auth.signup': '10/minute@ip;100/hour@ip',
+    'auth': '60/minute@ip',
+    'connection': '60/minute@user',
+    'activity': '60/minute@user',
+}
+
+DECISIONS = PrometheusCounter(
+    'rate_limit_requests_total', 'Requests checked against a rate limit rule', ('rule', 'decision'))
+
+Limit = namedtuple('Limit', 'text count period scope')
+
+
+def parse_limits(value):
+    limits = []
+    for text in filter(None, value.split(';')):
+        text = text.replace(' ', '')
+        match = LIMIT_FORMAT.match(text)
+        if not match:
+            raise ValueError(f'Invalid rate limit {text!r}; expected e.g. 10/minute@ip or 60/hour@user')
+        count, period, scope = match.groups()
+        limits.append(Limit(text, int(count), PERIODS[period], scope))
+    return limits
+
+
+class LocalRateLimitBackend:
+    """In-process buckets, spread over striped locks so concurrent
+    requests rarely wait on each other."""
+
+    STRIPES = 64
+
+    def __init__(self, max_keys=100_000):
+        self.max_keys_per_stripe = max(1, max_keys // self.STRIPES)
+        self.stripes = [(threading.Lock(), {}) for _ in range(self.STRIPES)]
+
+    def take(self, buckets):
+        now = time.monotonic()
+        with ExitStack() as stack:
+            # Stripe locks in index order, so two requests can't deadlock
+            for index in sorted({hash(key) % self.STRIPES for key, _, _ in buckets}):
+                lock, stripe = self.stripes[index]
+                stack.enter_context(lock)
+                if len(stripe) >= self.max_keys_per_stripe:
+                    self._prune(stripe, now)
+            wait = 0
+            refilled = []
+            for key, rate, capacity in buckets:
+                stripe = self.stripes[hash(key) % self.STRIPES][1]
+                bucket = stripe.get(key)
+                if bucket is None:
+                    # [tokens, updated, rate, capacity]
+                    bucket = stripe[key] = [capacity, now, rate, capacity]
+                bucket[0] = min(capacity, bucket[0] + (now - bucket[1]) * rate)
+                bucket[1] = now
+                if bucket[0] < 1:
+                    wait = max(wait, (1 - bucket[0]) / rate)
+                refilled.append(bucket)
+            if not wait:
+                for bucket in refilled:
+                    bucket[0] -= 1
+            return wait
+
+    def _prune(self, buckets, now):
+        # A bucket that has refilled is the same as no bucket
+        for key in [key for key, (tokens, updated, rate, capacity) in buckets.items()
+                    if tokens + (now - updated) * rate >= capacity]:
+            del buckets[key]
+        if len(buckets) >= self.max_keys_per_stripe:
+            # Still full of active callers: forget the oldest half
+            for key in list(buckets)[:len(buckets) // 2]:
+                del buckets[key]
+
+    def __len__(self):
+        return sum(len(buckets) for _, buckets in self.stripes)
+
+
+class SQLRateLimitBackend:
+    """Buckets in the rate_limit_bucket table of the primary database.
+
+    Each check is its own transaction on its own connection, apart from
+    the request's session: an INSERT ... ON CONFLICT DO NOTHING that makes
+    sure the rows exist (and takes SQLite's write lock), a SELECT ... FOR
+    UPDATE, and the UPDATE if the request is admitted. Bucket times are
+    Unix seconds, so they mean the same on every server. Buckets that have
+    refilled are deleted every PRUNE_SECONDS; max_keys isn't used.
+    """
+
+    PRUNE_SECONDS = 60
+
+    def __init__(self, max_keys=None):
+        from .extensions import db
+        from .models import RateLimitBucket
+        self.db = db
+        self.model = RateLimitBucket
+        self.next_prune = 0
+
+    def take(self, buckets):
+        from .upsert import dialect_insert
+        table = self.model.__table__
+        # Rows in key order, so two requests can't deadlock
+        buckets = sorted(buckets)
+        now = time.time()
+        if now >= self.next_prune:
+            self.next_prune = now + self.PRUNE_SECONDS
+            self.prune(now)
+        with self.db.engine.begin() as conn:
+            conn.execute(
+                dialect_insert(self.model, conn)
+                .values([{'key': key, 'tokens': capacity, 'updated': now, 'rate': rate, 'capacity': capacity}
+                         for key, rate, capacity in buckets])
+                .on_conflict_do_nothing(index_elements=['key']))
+            rows = {key: (tokens, updated) for key, tokens, updated in conn.execute(
+                select(table.c.key, table.c.tokens, table.c.updated)
+                .where(table.c.key.in_([key for key, _, _ in buckets]))
+                .order_by(table.c.key)
+                .with_for_update())}
+            wait = 0
+            refilled = []
+            for key, rate, capacity in buckets:
+                tokens, updated = rows[key]
+                tokens = min(capacity, tokens + max(0, now - updated) * rate)
+                if tokens < 1:
+                    wait = max(wait, (1 - tokens) / rate)
+                refilled.append({'b_key': key, 'tokens': tokens - 1, 'rate': rate, 'capacity': capacity})
+            if not wait:
+                conn.execute(
+                    table.update().where(table.c.key == bindparam('b_key'))
+                    .values(updated=now), refilled)
+            return wait
+
+    def prune(self, now):
+        table = self.model.__table__
+        with self.db.engine.begin() as conn:
+            conn.execute(table.delete().where(
+                table.c.tokens + (now - table.c.updated) * table.c.rate >= table.c.capacity))
+
+
+class RateLimiter:
+
+    def __init__(self, app=None):
+        self.backend = None
+        self.rules = {}
+        self.admitted = Counter()
+        self.throttled = Counter()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Install the check. Call after logs and metrics so throttled
+        requests still get a request id and are counted."""
+        app.config.setdefault('RATELIMIT_ENABLED', True)
+        app.config.setdefault('RATELIMIT_BACKEND', 'app.ratelimit:LocalRateLimitBackend')
+        app.config.setdefault('RATELIMIT_RULES', DEFAULT_RULES)
+        app.config.setdefault('RATELIMIT_MAX_KEYS', 100_000)
+        self.rules = {name: parse_limits(value) for name, value in app.config['RATELIMIT_RULES'].items()}
+        self.backend = import_string(app.config['RATELIMIT_BACKEND'])(max_keys=app.config['RATELIMIT_MAX_KEYS'])
+        app.extensions['ratelimit'] = self
+        if app.config['RATELIMIT_ENABLED']:
+            app.before_request(self._check)
+
+    def _check(self):
+        if request.method not in LIMITED_METHODS or request.endpoint is None:
+            return None
+        rule, limits = lookup(self.rules, request.endpoint)
+        if not limits:
+            return None
+
+        user = None
+        buckets = []
+        for limit in limits:
+            if limit.scope == 'user':
+                if user is None:
+                    user = self._user_key()
+                caller = user
+            else:
+                caller = f'ip:{request.remote_addr}'
+            buckets.append((f'{limit.text}|{caller}|{request.endpoint}', limit.count / limit.period, limit.count))
+        wait = self.backend.take(buckets)
+
+        if not wait:
+            self.admitted[rule] += 1
+            DECISIONS.labels(rule, 'admitted').inc()
+            return None
+        self.throttled[rule] += 1
+        DECISIONS.labels(rule, 'throttled').inc()
+        return jsonify({'message': 'Too many requests, please slow down'}), 429, {
+            'Retry-After': str(math.ceil(wait))}
+
+    @staticmethod
+    def _user_key():
+        header = request.headers.get('Authorization', '')
+        if header.startswith('Bearer '):
+            try:
+                return f'user:{decode_token(header[7:])["sub"]}'
+            except Exception:
+                pass  # the route itself rejects the token
+        return f'ip:{request.remote_addr}'
+
+    def stats(self):
+        stats = {
+            'backend': type(self.backend).__name__,
+            'rules': {
+                name: {
+                    'limits': [limit.text for limit in limits],
+                    'admitted': self.admitted[name],
+                    'throttled': self.throttled[name],
+                }
+                for name, limits in self.rules.items()
+            },
+        }
+        if hasattr(self.backend, '__len__'):
+            stats['buckets'] = len(self.backend)
+        return stats
@@ -0,0 +1,274 @@
+"""Professional recommendations from the accepted-connection graph.
+
+Accepted connections form a bipartite client-professional graph. For a
+client, every professional is scored by how many clients share one of the
+client's professionals and are also connected to it ("clients like you
+also connected with"). The highest scores win, and ties go to the lower
+id. Remaining places, and every place for a client with no connections
+yet, go to the most-connected professionals as of the last load.
+
+The graph is kept in memory in each worker process as a GraphSnapshot: two
+CSR adjacency lists (client -> professionals and professional -> clients)
+in flat ``array`` buffers of int32 positions, with the sorted user ids
+alongside for bisect lookups. That is about 16 bytes per connection. A
+recommendation only reads the slices around one client, so it costs the
+same at any table size.
+
+The snapshot is loaded with one query the first time it is needed. On
+gunicorn, gunicorn.conf.py loads it when each worker starts. Connections
+this worker accepts or removes go into a small copy-on-write overlay right
+after they commit. The snapshot is reloaded in a background thread once
+it is RECOMMENDATIONS_REFRESH_SECONDS old, which picks up changes the other
+workers made. It is also reloaded when the overlay holds more than
+RECOMMENDATIONS_MAX_CHANGES edges. Readers never take a lock.
+"""
+import os
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from collections import Counter
+
+from flask import current_app
+from sqlalchemy import select
+
+# Upper bound on the neighbouring clients one recommendation looks at, so a
+# client of very popular professionals still costs a bounded amount of work
+MAX_NEIGHBORS = 2000
+
+
+def position(ids, value):
+    index = bisect_left(ids, value)
+    return index if index < len(ids) and ids[index] == value else None
+
+
+class GraphSnapshot:
+    """Accepted connections as client and professional CSR arrays."""
+
+    def __init__(self, client_ids, client_offsets, client_edges,
+                 professional_ids, professional_offsets, professional_edges):
+        self.client_ids = client_ids
+        self.client_offsets = client_offsets
+        self.client_edges = client_edges
+        self.professional_ids = professional_ids
+        self.professional_offsets = professional_offsets
+        self.professional_edges = professional_edges
+        # Most clients first, for clients without overlap to rank by
+        offsets = professional_offsets
+        order = sorted(range(len(professional_ids)), key=lambda i: (offsets[i] - offsets[i + 1], i))
+        self.popular = array('q', (professional_ids[i] for i in order))
+        self.built = time.monotonic()
+
+    @classmethod
+    def from_pairs(cls, pairs):
+        """Build from (client_id, professional_id) pairs sorted by client."""
+        client_ids = array('q')
+        client_offsets = array('q')
+        targets = array('q')
+        for client_id, professional_id in pairs:
+            if not client_ids or client_ids[-1] != client_id:
+                client_ids.append(client_id)
+                client_offsets.append(len(targets))
+            targets.append(professional_id)
+        client_offsets.append(len(targets))
+
+        professional_ids = array('q', sorted(set(targets)))
+        # Only used while building; the snapshot itself holds no dicts
+        index_of = {professional_id: i for i, professional_id in enumerate(professional_ids)}
+        client_edges = array('i', (index_of[professional_id] for professional_id in targets))
+        del targets, index_of
+
+        # Transpose with a counting sort: degrees, prefix sums, then fill
+        counts = array('q', bytes(8 * (len(professional_ids) + 1)))
+        for professional in client_edges:
+            counts[professional + 1] += 1
+        for i in range(len(professional_ids)):
+            counts[i + 1] += counts[i]
+        professional_offsets = array('q', counts)
+        professional_edges = array('i', bytes(4 * len(client_edges)))
+        for client in range(len(client_ids)):
+            for edge in range(client_offsets[client], client_offsets[client + 1]):
+                professional = client_edges[edge]
+                professional_edges[counts[professional]] = client
+                counts[professional] += 1
+        return cls(client_ids, client_offsets, client_edges,
+                   professional_ids, professional_offsets, professional_edges)
+
+    @classmethod
+    def load(cls):
+        # Imported here: extensions.py creates the Recommender
+        from .extensions import db
+        from .models import Connection
+        rows = db.session.execute(
+            select(Connection.client_id, Connection.professional_id)
+            .where(Connection.status == 'accepted')
+            .order_by(Connection.client_id, Connection.professional_id)
+            .execution_options(yield_per=10000)
+        )
+        return cls.from_pairs(rows)
+
+    def professionals(self, client_id):
+        client = position(self.client_ids, client_id)
+        if client is None:
+            return []
+        ids = self.professional_ids
+        edges = self.client_edges[self.client_offsets[client]:self.client_offsets[client + 1]]
+        return [ids[professional] for professional in edges]
+
+    def clients(self, professional_id, sample=None):
+        """The professional's clients, evenly thinned to ``sample`` at most."""
+        professional = position(self.professional_ids, professional_id)
+        if professional is None:
+            return []
+        start, stop = self.professional_offsets[professional], self.professional_offsets[professional + 1]
+        step = -(-(stop - start) // sample) if sample else 1
+        ids = self.client_ids
+        return [ids[client] for client in self.professional_edges[start:stop:step]]
+
+    def nbytes(self):
+        return sum(buffer.itemsize * len(buffer) for buffer in (
+            self.client_ids, self.client_offsets, self.client_edges, self.professional_ids,
+            self.professional_offsets, self.professional_edges, self.popular))
+
+
+class Overlay:
+    """Edges changed since the snapshot was loaded. Never mutated in place:
+    with_edge returns a new overlay, so readers need no lock."""
+
+    def __init__(self, by_client=None, by_professional=None, size=0):
+        self.by_client = by_client or {}
+        self.by_professional = by_professional or {}
+        self.size = size
+
+    def __len__(self):
+        return self.size
+
+    def with_edge(self, client_id, professional_id, accepted):
+        changes = self.by_client.get(client_id, {})
+        by_client = dict(self.by_client)
+        by_client[client_id] = {**changes, professional_id: accepted}
+        by_professional = dict(self.by_professional)
+        by_professional[professional_id] = {**by_professional.get(professional_id, {}), client_id: accepted}
+        return Overlay(by_client, by_professional, self.size + (professional_id not in changes))
+
+    @staticmethod
+    def apply(ids, changes):
+        if not changes:
+            return ids
+        present = set(ids)
+        return ([i for i in ids if changes.get(i, True)]
+                + [i for i, accepted in changes.items() if accepted and i not in present])
+
+
+class Recommender:
+
+    def __init__(self, app=None):
+        self.state = None  # (GraphSnapshot, Overlay)
+        self._pid = None
+        self._pending = None  # changes made while a reload is running
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('RECOMMENDATIONS_REFRESH_SECONDS', 300)
+        app.config.setdefault('RECOMMENDATIONS_MAX_CHANGES', 5000)
+        app.extensions['recommendations'] = self
+
+    def load(self, wait=True):
+        """(Re)load the snapshot from the database. Needs an app context."""
+        if not self._load_lock.acquire(blocking=wait):
+            return
+        try:
+            if wait and self._current():
+                return  # another thread loaded it while we waited
+            with self._lock:
+                self._pending = Overlay()
+            snapshot = GraphSnapshot.load()
+            with self._lock:
+                # Changes made before the load started are in the snapshot;
+                # replay the ones made since (they are absolute, so a change
+                # the snapshot already saw is harmless)
+                self.state = snapshot, self._pending
+                self._pending = None
+                self._pid = os.getpid()
+        finally:
+            self._load_lock.release()
+
+    def _current(self):
+        # A snapshot inherited from the parent process misses the parent's
+        # later changes; each worker loads its own
+        return self.state is not None and self._pid == os.getpid()
+
+    def graph(self):
+        if not self._current():
+            self.load()
+        snapshot, overlay = self.state
+        config = current_app.config
+        refresh = config['RECOMMENDATIONS_REFRESH_SECONDS']
+        stale = ((refresh and time.monotonic() - snapshot.built > refresh)
+                 or len(overlay) > config['RECOMMENDATIONS_MAX_CHANGES'])
+        if stale and not self._load_lock.locked():
+            app = current_app._get_current_object()
+            threading.Thread(target=self._load_in_background, args=(app,), daemon=True).start()
+        return snapshot, overlay
+
+    def _load_in_background(self, app):
+        with app.app_context():
+            self.load(wait=False)
+
+    def set_edge(self, client_id, professional_id, accepted):
+        """Record a committed connection change in this worker's graph."""
+        client_id, professional_id = int(client_id), int(professional_id)
+        with self._lock:
+            if self._pending is not None:
+                self._pending = self._pending.with_edge(client_id, professional_id, accepted)
+            if self._current():
+                snapshot, overlay = self.state
+                self.state = snapshot, overlay.with_edge(client_id, professional_id, accepted)
+
+    def recommend(self, client_id, limit, exclude=()):
+        """Return up to ``limit`` (professional_id, shared_clients) pairs."""
+        snapshot, overlay = self.graph()
+        client_id = int(client_id)
+
+        def professionals(client):
+            return overlay.apply(snapshot.professionals(client), overlay.by_client.get(client))
+
+        mine = professionals(client_id)
+        scores = Counter()
+        share = max(1, MAX_NEIGHBORS // len(mine)) if mine else None
+        for professional_id in mine:
+            neighbors = overlay.apply(snapshot.clients(professional_id, share),
+                                      overlay.by_professional.get(professional_id))
+            for other in neighbors:
+                if other != client_id:
+                    scores.update(professionals(other))
+
+        skip = set(mine).union(exclude)
+        ranked = sorted((professional_id for professional_id in scores if professional_id not in skip),
+                        key=lambda professional_id: (-scores[professional_id], professional_id))[:limit]
+        if len(ranked) < limit:
+            # Not enough overlap (or a new client): fill with the most connected
+            skip.update(ranked)
+            for professional_id in snapshot.popular:
+                if len(ranked) == limit:
+                    break
+                if professional_id not in skip:
+                    ranked.append(professional_id)
+        return [(professional_id, scores.get(professional_id, 0)) for professional_id in ranked]
+
+    def stats(self):
+        if not self._current():
+            return {'loaded': False}
+        snapshot, overlay = self.state
+        return {
+            'loaded': True,
+            'clients': len(snapshot.client_ids),
+            'professionals': len(snapshot.professional_ids),
+            'connections': len(snapshot.client_edges),
+            'bytes': snapshot.nbytes(),
+            'age_seconds': round(time.monotonic() - snapshot.built, 1),
+            'pending_changes': len(overlay),
+        }
@@ -0,0 +1,82 @@
+"""Read-replica routing.
+
+``SQLALCHEMY_REPLICA_URIS`` (env ``DATABASE_REPLICA_URLS``, comma separated)
+adds one bind per replica. RoutingSession then sends the SELECTs of GET
+and HEAD requests to a replica, picking one per request round-robin.
+Everything else goes to the primary: other methods, anything outside a
+request (CLI, scripts), and flushes. Any statement that isn't a SELECT
+also pins the rest of the request to the primary.
+
+Read-your-writes comes from the change versions every write already
+bumps (see versions.py). The versioned list views read their keys from
+the chosen replica and from the primary. If the replica is behind, the
+rest of the request reads from the primary. That covers the writer and
+everyone the write affected, in every worker process, for exactly as
+long as the replica lags.
+"""
+import itertools
+
+from flask import current_app, has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy.sql import Select
+
+READ_ONLY_METHODS = frozenset(['GET', 'HEAD'])
+
+
+class RoutingSession(Session):
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None:
+            replica = self._replica_bind(clause)
+            if replica is not None:
+                return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def _replica_bind(self, clause):
+        if self.info.get('primary') or not has_request_context():
+            return None
+        router = current_app.extensions.get('replica_router')
+        if router is None or not router.bind_keys or request.method not in READ_ONLY_METHODS:
+            return None
+        if self._flushing or not isinstance(clause, Select):
+            self.info['primary'] = True
+            return None
+        # One replica for the whole request, so its reads are consistent
+        key = self.info.get('replica')
+        if key is None:
+            key = self.info['replica'] = router.next_bind_key()
+        return self._db.engines[key]
+
+
+class ReplicaRouter:
+
+    def __init__(self, app=None):
+        self.bind_keys = ()
+        self.counter = itertools.count()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Add a bind per replica. Call before db.init_app."""
+        app.config.setdefault('SQLALCHEMY_REPLICA_URIS', [])
+        binds = dict(app.config.get('SQLALCHEMY_BINDS') or {})
+        # Replicas get the same engine profile (pool, pragmas) as the primary
+        options = app.config.get('SQLALCHEMY_ENGINE_OPTIONS') or {}
+        keys = []
+        for i, uri in enumerate(app.config['SQLALCHEMY_REPLICA_URIS']):
+            key = f'replica_{i}'
+            binds[key] = dict(options, url=uri)
+            keys.append(key)
+        app.config['SQLALCHEMY_BINDS'] = binds
+        self.bind_keys = tuple(keys)
+        app.extensions['replica_router'] = self
+
+    def next_bind_key(self):
+        return self.bind_keys[next(self.counter) % len(self.bind_keys)]
+
+    def on_replica(self, session):
+        """True if ``session`` is currently reading from a replica."""
+        return 'replica' in session.info and not session.info.get('primary')
+
+    def use_primary(self, session):
+        session.info['primary'] = True
@@ -1,11 +1,32 @@
 from flask import Blueprint, request, jsonify
 from app.models import GroupActivity, ActivityInvite, User
-from app.extensions import db
-from app.schemas.activity_schema import activity_schema, activities_schema, invite_schema, invites_schema
+from app.extensions import db, events
+from app.batch import BatchError, parse_batch_items
+from app.versions import bump_users, user_key, versioned
+from app.upsert import dialect_insert, insert_unless_exists
+from app.stats import CounterDeltas
 from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
+from sqlalchemy import delete, update
+from sqlalchemy.orm import joinedload
+
+# Schemas are imported in the views that use them (see app/schemas/__init__.py)
 
 activity_bp = Blueprint('activity', __name__)
 
+# Upper bound on clients per bulk invite; keeps the multi-row INSERT well
+# under SQLite's bound-parameter limit.
+MAX_BULK_INVITES = 500
+
+def publish_invite(event_type, invite_id, activity_id, client_id, creator_id, status):
+    # The invited client and the activity's creator both get the event;
+    # call only after the change is committed
+    events.publish([client_id, creator_id], event_type, {
+        'invite_id': invite_id,
+        'activity_id': activity_id,
+        'client_id': int(client_id),
+        'status': status
+    })
+
 @activity_bp.route('/', methods=['POST'])
 @jwt_required()
 def create_activity():
@@ -25,8 +46,13 @@ def create_activity():
     )
     
     db.session.add(activity)
+    deltas = CounterDeltas()
+    deltas.add(current_user_id, 'activities')
+    deltas.apply()
+    bump_users(current_user_id)
     db.session.commit()
     
+    from app.schemas.activity_schema import activity_schema
     return jsonify({
         'message': 'Activity created',
         'activity': activity_schema.dump(activity)
@@ -51,25 +77,133 @@ def invite_to_activity():
     if not activity or str(activity.created_by) != str(current_user_id):
         return jsonify({'message': 'Activity not found or unauthorized'}), 404
         
-    # Check if invite exists
-    existing = ActivityInvite.query.filter_by(activity_id=activity_id, client_id=client_id).first()
-    if existing:
-        return jsonify({'message': 'Invite already exists'}), 400
-        
-    invite = ActivityInvite(
-        activity_id=activity_id,
+    invite = insert_unless_exists(
+        ActivityInvite, [ActivityInvite.activity_id, ActivityInvite.client_id],
+        activity_id=activity.id,
         client_id=client_id,
         status='pending'
     )
-    
-    db.session.add(invite)
+    if invite is None:
+        return jsonify({'message': 'Invite already exists'}), 400
+
+    deltas = CounterDeltas()
+    deltas.invite(current_user_id, new_status='pending')
+    deltas.apply()
+    bump_users(client_id, current_user_id)
     db.session.commit()
+    publish_invite('invite.created', invite.id, activity.id, client_id, current_user_id, 'pending')
     
+    from app.schemas.activity_schema import invite_schema
     return jsonify({
         'message': 'Client invited to activity',
         'invite': invite_schema.dump(invite)
     }), 201
 
+@activity_bp.route('/invite/bulk', methods=['POST'])
+@jwt_required()
+def bulk_invite_to_activity():
+    current_user_id = get_jwt_identity()
+    claims = get_jwt()
+    if claims.get('role') != 'professional':
+        return jsonify({'message': 'Only professionals can invite to activities'}), 403
+
+    data = request.get_json() or {}
+    activity_id = data.get('activity_id')
+    client_ids = data.get('client_ids')
+    client_emails = data.get('client_emails')
+
+    if not activity_id or not (client_ids or client_emails):
+        return jsonify({'message': 'Activity ID and client_ids or client_emails are required'}), 400
+    if client_ids and client_emails:
+        return jsonify({'message': 'Send either client_ids or client_emails, not both'}), 400
+
+    by_email = bool(client_emails)
+    requested = client_emails if by_email else client_ids
+    if not isinstance(requested, list):
+        return jsonify({'message': 'client_ids/client_emails must be a list'}), 400
+    if by_email and not all(isinstance(email, str) for email in requested):
+        return jsonify({'message': 'client_emails must be strings'}), 400
+    # bool is an int subclass, but true isn't a client id
+    if not by_email and not all(isinstance(client_id, int) and not isinstance(client_id, bool)
+                                for client_id in requested):
+        return jsonify({'message': 'client_ids must be integers'}), 400
+    # Drop duplicates but keep the caller's order for the results
+    requested = list(dict.fromkeys(requested))
+    if len(requested) > MAX_BULK_INVITES:
+        return jsonify({'message': f'At most {MAX_BULK_INVITES} clients per request'}), 400
+
+    activity = GroupActivity.query.get(activity_id)
+    if not activity or str(activity.created_by) != str(current_user_id):
+        return jsonify({'message': 'Activity not found or unauthorized'}), 404
+    activity_id = activity.id
+
+    # Resolve every requested client in one query
+    key_column = User.email if by_email else User.id
+    clients = dict(
+        db.session.query(key_column, User.id)
+        .filter(key_column.in_(requested), User.role == 'client')
+        .all()
+    )
+
+    # Existing invites for the whole set in one query
+    existing = dict(
+        db.session.query(ActivityInvite.client_id, ActivityInvite.id)
+        .filter(ActivityInvite.activity_id == activity_id,
+                ActivityInvite.client_id.in_(list(clients.values())))
+        .all()
+    )
+
+    new_client_ids = [client_id for client_id in clients.values() if client_id not in existing]
+    created = {}
+    if new_client_ids:
+        # Single multi-row INSERT ... RETURNING. A concurrent request may
+        # have invited some of them since the read above; those rows are
+        # skipped by the unique index instead of failing the whole insert.
+        rows = db.session.execute(
+            dialect_insert(ActivityInvite)
+            .values([{'activity_id': activity_id, 'client_id': client_id, 'status': 'pending'}
+                     for client_id in new_client_ids])
+            .on_conflict_do_nothing(index_elements=[ActivityInvite.activity_id, ActivityInvite.client_id])
+            .returning(ActivityInvite.client_id, ActivityInvite.id)
+        ).all()
+        created = dict(rows)
+        raced = [client_id for client_id in new_client_ids if client_id not in created]
+        if raced:
+            existing.update(
+                db.session.query(ActivityInvite.client_id, ActivityInvite.id)
+                .filter(ActivityInvite.activity_id == activity_id, ActivityInvite.client_id.in_(raced))
+                .all()
+            )
+        if created:
+            deltas = CounterDeltas()
+            deltas.add(current_user_id, 'invites_pending', len(created))
+            deltas.apply()
+            bump_users(current_user_id, *created)
+    db.session.commit()
+    for client_id, invite_id in created.items():
+        publish_invite('invite.created', invite_id, activity_id, client_id, current_user_id, 'pending')
+
+    results = []
+    counts = {'created': 0, 'skipped': 0, 'not_found': 0}
+    for key in requested:
+        result = {'client_email' if by_email else 'client_id': key}
+        client_id = clients.get(key)
+        if client_id is None:
+            result['status'] = 'not_found'
+        elif client_id in created:
+            result.update(client_id=client_id, status='created', invite_id=created[client_id])
+        else:
+            result.update(client_id=client_id, status='skipped', invite_id=existing[client_id])
+        counts[result['status']] += 1
+        results.append(result)
+
+    return jsonify({
+        'message': f"{counts['created']} client(s) invited to activity",
+        'activity_id': activity_id,
+        **counts,
+        'results': results
+    }), 200
+
 @activity_bp.route('/respond', methods=['POST'])
 @jwt_required()
 def respond_invite():
@@ -81,13 +215,15 @@ def respond_invite():
     if not invite_id or not action:
         return jsonify({'message': 'Missing required fields'}), 400
         
-    invite = ActivityInvite.query.get(invite_id)
+    # Locked on Postgres so the counters move from the status we read
+    invite = db.session.get(ActivityInvite, invite_id, with_for_update=True)
     if not invite:
         return jsonify({'message': 'Invite not found'}), 404
         
     if str(invite.client_id) != str(current_user_id):
         return jsonify({'message': 'Unauthorized'}), 403
         
+    old_status = invite.status
     if action == 'accept':
         invite.status = 'accepted'
     elif action == 'decline':
@@ -95,27 +231,112 @@ def respond_invite():
     else:
         return jsonify({'message': 'Invalid action'}), 400
         
+    deltas = CounterDeltas()
+    deltas.invite(invite.activity.created_by, old_status, invite.status)
+    deltas.apply()
+    bump_users(invite.client_id)
     db.session.commit()
+    publish_invite(f'invite.{invite.status}', invite.id, invite.activity_id,
+                   invite.client_id, invite.activity.created_by, invite.status)
     
+    from app.schemas.activity_schema import invite_schema
     return jsonify({
         'message': f'Invite {action}ed',
         'invite': invite_schema.dump(invite)
     }), 200
 
+def activities_query(user_id, role):
+    """Return (query, serializer) for the caller's activity list."""
+    from app.schemas.activity_schema import activity_serializer, invite_serializer
+    # Eager-load everything the schemas nest so the list is a single
+    # statement rather than one lazy load per row and relationship.
+    if role == 'professional':
+        query = GroupActivity.query.options(
+            joinedload(GroupActivity.creator).load_only(User.id, User.name, User.email)
+        ).filter_by(created_by=user_id)
+        return query, activity_serializer
+    # Client sees activities they are invited to
+    query = ActivityInvite.query.options(
+        joinedload(ActivityInvite.activity)
+        .joinedload(GroupActivity.creator)
+        .load_only(User.id, User.name, User.email),
+        joinedload(ActivityInvite.client).load_only(User.id, User.name, User.email),
+    ).filter_by(client_id=user_id)
+    return query, invite_serializer
+
+# Invite status set by each batch action
+BATCH_ACTIONS = {'accept': 'accepted', 'decline': 'declined'}
+
+@activity_bp.route('/respond/batch', methods=['POST'])
+@jwt_required()
+def batch_respond_invites():
+    current_user_id = get_jwt_identity()
+    try:
+        items = parse_batch_items(request.get_json(), 'invite_id')
+    except BatchError as e:
+        return jsonify({'message': str(e)}), 400
+
+    # Authorize the whole set with one query
+    ids = [invite_id for invite_id, _ in items]
+    invites = {
+        row.id: row for row in db.session.query(
+            ActivityInvite.id, ActivityInvite.activity_id, ActivityInvite.client_id, ActivityInvite.status,
+            GroupActivity.created_by
+        ).join(GroupActivity, ActivityInvite.activity_id == GroupActivity.id)
+        .filter(ActivityInvite.id.in_(ids))
+        .with_for_update(of=ActivityInvite)
+    }
+
+    results = []
+    by_action = {action: [] for action in BATCH_ACTIONS}
+    applied = []
+    deltas = CounterDeltas()
+    for invite_id, action in items:
+        row = invites.get(invite_id)
+        if row is None:
+            result = 'not_found'
+        elif str(row.client_id) != str(current_user_id):
+            result = 'unauthorized'
+        elif action not in BATCH_ACTIONS:
+            result = 'invalid_action'
+        else:
+            result = BATCH_ACTIONS[action]
+            by_action[action].append(invite_id)
+            deltas.invite(row.created_by, row.status, result)
+            applied.append((row, result))
+        results.append({'invite_id': invite_id, 'action': action, 'result': result})
+
+    # One UPDATE per action, all in a single transaction
+    for action, invite_ids in by_action.items():
+        if invite_ids:
+            db.session.execute(
+                update(ActivityInvite)
+                .where(ActivityInvite.id.in_(invite_ids))
+                .values(status=BATCH_ACTIONS[action]),
+                execution_options={'synchronize_session': False})
+    deltas.apply()
+    if applied:
+        bump_users(current_user_id)
+    db.session.commit()
+
+    for row, result in applied:
+        publish_invite(f'invite.{result}', row.id, row.activity_id, row.client_id, row.created_by, result)
+
+    return jsonify({
+        'message': f'{len(applied)} of {len(items)} invite(s) updated',
+        'results': results
+    }), 200
+
 @activity_bp.route('/list', methods=['GET'])
 @jwt_required()
+@versioned(lambda: [user_key(get_jwt_identity())])
 def list_activities():
     current_user_id = get_jwt_identity()
     claims = get_jwt()
     role = claims.get('role')
     
-    if role == 'professional':
-        activities = GroupActivity.query.filter_by(created_by=current_user_id).all()
-        return jsonify(activities_schema.dump(activities)), 200
-    else:
-        # Client sees activities they are invited to
-        invites = ActivityInvite.query.filter_by(client_id=current_user_id).all()
-        return jsonify(invites_schema.dump(invites)), 200
+    query, serializer = activities_query(current_user_id, role)
+    return jsonify(serializer.dump_many(query.all())), 200
 
 
 @activity_bp.route('/<int:activity_id>', methods=['DELETE'])
@@ -126,16 +347,29 @@ def delete_activity(activity_id):
     if claims.get('role') != 'professional':
         return jsonify({'message': 'Only professionals can delete activities'}), 403
 
-    activity = GroupActivity.query.get(activity_id)
+    activity = db.session.get(GroupActivity, activity_id, with_for_update=True)
     if not activity:
         return jsonify({'message': 'Activity not found'}), 404
 
     if str(activity.created_by) != str(current_user_id):
         return jsonify({'message': 'Unauthorized'}), 403
 
-    # Remove any invites for this activity first
-    ActivityInvite.query.filter_by(activity_id=activity_id).delete()
+    # Remove any invites for this activity first, noting who was invited
+    invited = db.session.execute(
+        delete(ActivityInvite)
+        .where(ActivityInvite.activity_id == activity_id)
+        .returning(ActivityInvite.id, ActivityInvite.client_id, ActivityInvite.status),
+        execution_options={'synchronize_session': False}
+    ).all()
     db.session.delete(activity)
+    deltas = CounterDeltas()
+    deltas.add(current_user_id, 'activities', -1)
+    for _, _, status in invited:
+        deltas.invite(current_user_id, old_status=status)
+    deltas.apply()
+    bump_users(current_user_id, *(client_id for _, client_id, _ in invited))
     db.session.commit()
+    for invite_id, client_id, _ in invited:
+        publish_invite('invite.removed', invite_id, activity_id, client_id, current_user_id, 'removed')
 
     return jsonify({'message': 'Activity deleted'}), 200
@@ -1,13 +1,38 @@
 from flask import Blueprint, request, jsonify
-from app.models import User
-from app.extensions import db, jwt
-from app.schemas.user_schema import user_schema
-from werkzeug.security import generate_password_hash, check_password_hash
-from flask_jwt_extended import create_access_token
+from app.models import User, RefreshSession
+from app.extensions import db, jwt, password_hasher
+from app.hashing import HashPoolBusy
+from app.sessions import prune_sessions
+from app.versions import bump, role_key
+from flask_jwt_extended import create_access_token, create_refresh_token, jwt_required, get_jwt
+from sqlalchemy import update
 import datetime
 
+# Schemas are imported in the views that use them (see app/schemas/__init__.py)
+
 auth_bp = Blueprint('auth', __name__)
 
+@auth_bp.errorhandler(HashPoolBusy)
+def hash_pool_busy(e):
+    # Shed load instead of queueing behind the KDF pool
+    return jsonify({'message': 'Server busy, please retry shortly'}), 503, {'Retry-After': str(e.retry_after)}
+
+def issue_tokens(user_id, role, session_id, generation):
+    access_token = create_access_token(identity=str(user_id), additional_claims={'role': role})
+    # The refresh token names its session row and generation; /refresh only
+    # accepts it while that generation is current.
+    refresh_token = create_refresh_token(
+        identity=str(user_id),
+        additional_claims={'role': role, 'sid': session_id, 'gen': generation}
+    )
+    return access_token, refresh_token
+
+def start_session(user_id):
+    session = RefreshSession(user_id=user_id, generation=0)
+    db.session.add(session)
+    db.session.flush()
+    return session.id
+
 @auth_bp.route('/signup', methods=['POST'])
 def signup():
     data = request.get_json()
@@ -18,7 +43,7 @@ def signup():
     if User.query.filter_by(email=data['email']).first():
         return jsonify({'message': 'User already exists'}), 400
     
-    hashed_password = generate_password_hash(data['password'])
+    hashed_password = password_hasher.generate(data['password'])
     new_user = User(
         name=data.get('name', ''),
         email=data['email'],
@@ -27,15 +52,20 @@ def signup():
     )
     
     db.session.add(new_user)
+    db.session.flush()
+    session_id = start_session(new_user.id)
+    bump(role_key(new_user.role), role_key(None))
     db.session.commit()
     
     # Create token immediately or ask to login? Requirements say "On login/signup, receive and store the JWT token"
-    access_token = create_access_token(identity=str(new_user.id), additional_claims={'role': new_user.role})
+    access_token, refresh_token = issue_tokens(new_user.id, new_user.role, session_id, 0)
     
+    from app.schemas.user_schema import user_schema
     return jsonify({
         'message': 'User created successfully',
         'user': user_schema.dump(new_user),
-        'token': access_token
+        'token': access_token,
+        'refresh_token': refresh_token
     }), 201
 
 @auth_bp.route('/login', methods=['POST'])
@@ -47,13 +77,64 @@ def login():
     
     user = User.query.filter_by(email=data['email']).first()
     
-    if not user or not check_password_hash(user.password_hash, data['password']):
+    if not user or not password_hasher.check(user.password_hash, data['password']):
         return jsonify({'message': 'Invalid credentials'}), 401
     
-    access_token = create_access_token(identity=str(user.id), additional_claims={'role': user.role})
+    # Keeps the table from growing with every login (see app/sessions.py)
+    prune_sessions(user.id)
+    session_id = start_session(user.id)
+    db.session.commit()
+    access_token, refresh_token = issue_tokens(user.id, user.role, session_id, 0)
     
+    from app.schemas.user_schema import user_schema
     return jsonify({
         'message': 'Login successful',
         'user': user_schema.dump(user),
-        'token': access_token
+        'token': access_token,
+        'refresh_token': refresh_token
     }), 200
+
+@auth_bp.route('/refresh', methods=['POST'])
+@jwt_required(refresh=True)
+def refresh():
+    # No password check here: renewing a session costs one UPDATE instead of a KDF run
+    claims = get_jwt()
+    session_id = claims.get('sid')
+    generation = claims.get('gen')
+    if session_id is None or generation is None:
+        return jsonify({'message': 'Invalid refresh token'}), 401
+
+    # Rotate atomically: succeeds only for the current, unrevoked generation
+    rotated = db.session.execute(
+        update(RefreshSession)
+        .where(RefreshSession.id == session_id,
+               RefreshSession.generation == generation,
+               RefreshSession.revoked.is_(False))
+        .values(generation=generation + 1, refreshed_at=datetime.datetime.utcnow())
+    ).rowcount
+    if not rotated:
+        # An already-rotated token being replayed means it may have leaked,
+        # so revoke the whole session rather than just this token.
+        db.session.execute(
+            update(RefreshSession).where(RefreshSession.id == session_id).values(revoked=True)
+        )
+        db.session.commit()
+        return jsonify({'message': 'Refresh token revoked'}), 401
+    db.session.commit()
+
+    access_token, refresh_token = issue_tokens(claims['sub'], claims.get('role'), session_id, generation + 1)
+    return jsonify({
+        'token': access_token,
+        'refresh_token': refresh_token
+    }), 200
+
+@auth_bp.route('/logout', methods=['POST'])
+@jwt_required(refresh=True)
+def logout():
+    session_id = get_jwt().get('sid')
+    if session_id is not None:
+        db.session.execute(
+            update(RefreshSession).where(RefreshSession.id == session_id).values(revoked=True)
+        )
+        db.session.commit()
+    return jsonify({'message': 'Logged out'}), 200
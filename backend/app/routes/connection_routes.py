@@ -1,10 +1,32 @@
+import logging
 from flask import Blueprint, request, jsonify
 from app.models import Connection, User
-from app.extensions import db
-from app.schemas.connection_schema import connection_schema, connections_schema
+from app.extensions import db, events, recommendations
+from app.batch import BatchError, parse_batch_items
+from app.versions import bump_users, user_key, versioned
+from app.upsert import insert_unless_exists
+from app.stats import CounterDeltas
 from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
+from sqlalchemy import delete, update
+from sqlalchemy.orm import joinedload
+
+# Schemas are imported in the views that use them (see app/schemas/__init__.py)
 
 connection_bp = Blueprint('connection', __name__)
+logger = logging.getLogger(__name__)
+
+def publish_connection(event_type, connection_id, client_id, professional_id, status):
+    # Both parties get the event; call only after the change is committed
+    if status != 'pending':
+        # Accepted adds the edge to this worker's recommendation graph,
+        # anything else takes it out
+        recommendations.set_edge(client_id, professional_id, status == 'accepted')
+    events.publish([client_id, professional_id], event_type, {
+        'connection_id': connection_id,
+        'client_id': int(client_id),
+        'professional_id': int(professional_id),
+        'status': status
+    })
 
 @connection_bp.route('/request-pro', methods=['POST'])
 @jwt_required()
@@ -20,21 +42,24 @@ def request_pro():
     if not professional_id:
         return jsonify({'message': 'Professional ID is required'}), 400
     
-    # Check if connection already exists
-    existing = Connection.query.filter_by(client_id=current_user_id, professional_id=professional_id).first()
-    if existing:
-        return jsonify({'message': 'Connection request already exists'}), 400
-        
-    connection = Connection(
+    connection = insert_unless_exists(
+        Connection, [Connection.client_id, Connection.professional_id],
         client_id=current_user_id,
         professional_id=professional_id,
         status='pending',
         initiated_by=current_user_id
     )
-    
-    db.session.add(connection)
+    if connection is None:
+        return jsonify({'message': 'Connection request already exists'}), 400
+
+    deltas = CounterDeltas()
+    deltas.connection(connection.professional_id, connection.initiated_by, new_status='pending')
+    deltas.apply()
+    bump_users(current_user_id, professional_id)
     db.session.commit()
+    publish_connection('connection.created', connection.id, current_user_id, professional_id, 'pending')
     
+    from app.schemas.connection_schema import connection_schema
     return jsonify({
         'message': 'Connection request sent',
         'connection': connection_schema.dump(connection)
@@ -45,41 +70,45 @@ def request_pro():
 def invite_client():
     current_user_id = get_jwt_identity()
     claims = get_jwt()
-    print(f"DEBUG: invite_client called by user {current_user_id}, role={claims.get('role')}")
+    logger.debug('invite_client called', extra={'user_id': current_user_id, 'role': claims.get('role')})
     
     if claims.get('role') != 'professional':
-        print("DEBUG: User is not a professional")
+        logger.debug('invite_client rejected: not a professional', extra={'user_id': current_user_id})
         return jsonify({'message': 'Only professionals can invite clients'}), 403
     
     data = request.get_json()
     client_email = data.get('client_email')
-    print(f"DEBUG: Inviting email: {client_email}")
+    logger.debug('inviting client', extra={'client_email': client_email})
     
     if not client_email:
-        print("DEBUG: Client email is missing")
+        logger.debug('invite_client rejected: client email missing')
         return jsonify({'message': 'Client email is required'}), 400
         
     client = User.query.filter_by(email=client_email, role='client').first()
     if not client:
-        print(f"DEBUG: Client with email {client_email} not found")
+        logger.debug('invite_client rejected: client not found', extra={'client_email': client_email})
         return jsonify({'message': 'Client not found'}), 404
         
-    # Check if connection already exists
-    existing = Connection.query.filter_by(client_id=client.id, professional_id=current_user_id).first()
-    if existing:
-        print(f"DEBUG: Connection already exists between pro {current_user_id} and client {client.id}. Status: {existing.status}")
-        return jsonify({'message': 'Connection already exists'}), 400
-        
-    connection = Connection(
+    connection = insert_unless_exists(
+        Connection, [Connection.client_id, Connection.professional_id],
         client_id=client.id,
         professional_id=current_user_id,
         status='pending',
         initiated_by=current_user_id
     )
-    
-    db.session.add(connection)
+    if connection is None:
+        logger.debug('invite_client rejected: connection exists', extra={
+            'professional_id': current_user_id, 'client_id': client.id})
+        return jsonify({'message': 'Connection already exists'}), 400
+
+    deltas = CounterDeltas()
+    deltas.connection(connection.professional_id, connection.initiated_by, new_status='pending')
+    deltas.apply()
+    bump_users(client.id, current_user_id)
     db.session.commit()
+    publish_connection('connection.created', connection.id, client.id, current_user_id, 'pending')
     
+    from app.schemas.connection_schema import connection_schema
     return jsonify({
         'message': 'Invitation sent',
         'connection': connection_schema.dump(connection)
@@ -96,7 +125,8 @@ def respond_connection():
     if not connection_id or not action:
         return jsonify({'message': 'Missing required fields'}), 400
         
-    connection = Connection.query.get(connection_id)
+    # Locked on Postgres so the counters move from the status we read
+    connection = db.session.get(Connection, connection_id, with_for_update=True)
     if not connection:
         return jsonify({'message': 'Connection not found'}), 404
         
@@ -104,6 +134,7 @@ def respond_connection():
     if str(connection.client_id) != str(current_user_id) and str(connection.professional_id) != str(current_user_id):
         return jsonify({'message': 'Unauthorized'}), 403
         
+    old_status = connection.status
     if action == 'accept':
         connection.status = 'accepted'
     elif action == 'reject':
@@ -111,45 +142,134 @@ def respond_connection():
     else:
         return jsonify({'message': 'Invalid action'}), 400
         
+    deltas = CounterDeltas()
+    deltas.connection(connection.professional_id, connection.initiated_by, old_status, connection.status)
+    deltas.apply()
+    bump_users(connection.client_id, connection.professional_id)
     db.session.commit()
+    publish_connection(f'connection.{connection.status}', connection.id,
+                       connection.client_id, connection.professional_id, connection.status)
     
+    from app.schemas.connection_schema import connection_schema
     return jsonify({
         'message': f'Connection {action}ed',
         'connection': connection_schema.dump(connection)
     }), 200
 
+def connections_query(user_id):
+    # Get all connections where user is either client or pro
+    # Load both nested users in the same statement, limited to the columns
+    # ConnectionSchema serializes, instead of two lazy loads per row.
+    return Connection.query.options(
+        joinedload(Connection.professional).load_only(User.id, User.name, User.email),
+        joinedload(Connection.client).load_only(User.id, User.name, User.email),
+    ).filter(
+        (Connection.client_id == user_id) | (Connection.professional_id == user_id)
+    )
+
+# Result reported for each action that is applied in a batch
+BATCH_ACTIONS = {'accept': 'accepted', 'reject': 'rejected', 'remove': 'removed'}
+
+@connection_bp.route('/batch', methods=['POST'])
+@jwt_required()
+def batch_connections():
+    current_user_id = get_jwt_identity()
+    try:
+        items = parse_batch_items(request.get_json(), 'connection_id')
+    except BatchError as e:
+        return jsonify({'message': str(e)}), 400
+
+    # Authorize the whole set with one query
+    ids = [connection_id for connection_id, _ in items]
+    parties = {
+        row.id: row for row in db.session.query(
+            Connection.id, Connection.client_id, Connection.professional_id,
+            Connection.initiated_by, Connection.status
+        ).filter(Connection.id.in_(ids)).with_for_update()
+    }
+
+    results = []
+    by_action = {action: [] for action in BATCH_ACTIONS}
+    touched_users = set()
+    applied = []
+    deltas = CounterDeltas()
+    for connection_id, action in items:
+        row = parties.get(connection_id)
+        if row is None:
+            result = 'not_found'
+        elif str(row.client_id) != str(current_user_id) and str(row.professional_id) != str(current_user_id):
+            result = 'unauthorized'
+        elif action not in BATCH_ACTIONS:
+            result = 'invalid_action'
+        else:
+            result = BATCH_ACTIONS[action]
+            by_action[action].append(connection_id)
+            touched_users.update((row.client_id, row.professional_id))
+            deltas.connection(row.professional_id, row.initiated_by, row.status,
+                              None if action == 'remove' else result)
+            applied.append((row, result))
+        results.append({'connection_id': connection_id, 'action': action, 'result': result})
+
+    # One set-based statement per action, all in a single transaction
+    for action, connection_ids in by_action.items():
+        if not connection_ids:
+            continue
+        if action == 'remove':
+            stmt = delete(Connection).where(Connection.id.in_(connection_ids))
+        else:
+            stmt = (update(Connection)
+                    .where(Connection.id.in_(connection_ids))
+                    .values(status=BATCH_ACTIONS[action]))
+        db.session.execute(stmt, execution_options={'synchronize_session': False})
+    deltas.apply()
+    bump_users(*touched_users)
+    db.session.commit()
+
+    for row, result in applied:
+        publish_connection(f'connection.{result}', row.id, row.client_id, row.professional_id, result)
+
+    return jsonify({
+        'message': f'{len(applied)} of {len(items)} connection(s) updated',
+        'results': results
+    }), 200
+
 @connection_bp.route('/list', methods=['GET'])
 @jwt_required()
+@versioned(lambda: [user_key(get_jwt_identity())])
 def list_connections():
     current_user_id = get_jwt_identity()
+    connections = connections_query(current_user_id).all()
     
-    # Get all connections where user is either client or pro
-    connections = Connection.query.filter(
-        (Connection.client_id == current_user_id) | (Connection.professional_id == current_user_id)
-    ).all()
-    
-    return jsonify(connections_schema.dump(connections)), 200
+    from app.schemas.connection_schema import connection_serializer
+    return jsonify(connection_serializer.dump_many(connections)), 200
 
 
 @connection_bp.route('/<int:connection_id>', methods=['DELETE'])
 @jwt_required()
 def remove_connection(connection_id):
     current_user_id = get_jwt_identity()
-    print(f"DEBUG: Attempting to remove connection {connection_id} by user {current_user_id}")
+    logger.debug('removing connection', extra={'connection_id': connection_id, 'user_id': current_user_id})
 
-    connection = Connection.query.get(connection_id)
+    connection = db.session.get(Connection, connection_id, with_for_update=True)
     if not connection:
-        print(f"DEBUG: Connection {connection_id} not found in DB")
+        logger.debug('remove_connection: not found', extra={'connection_id': connection_id})
         return jsonify({'message': 'Connection not found'}), 404
 
     # Only allow the client or professional involved to remove the connection
-    print(f"DEBUG: Checking auth: client={connection.client_id}, pro={connection.professional_id}, current={current_user_id}")
     if str(connection.client_id) != str(current_user_id) and str(connection.professional_id) != str(current_user_id):
-        print("DEBUG: Unauthorized")
+        logger.debug('remove_connection rejected: not a party', extra={
+            'connection_id': connection_id, 'client_id': connection.client_id,
+            'professional_id': connection.professional_id, 'user_id': current_user_id})
         return jsonify({'message': 'Unauthorized'}), 403
 
+    client_id, professional_id = connection.client_id, connection.professional_id
+    deltas = CounterDeltas()
+    deltas.connection(professional_id, connection.initiated_by, old_status=connection.status)
     db.session.delete(connection)
+    deltas.apply()
+    bump_users(client_id, professional_id)
     db.session.commit()
-    print(f"DEBUG: Connection {connection_id} removed successfully")
+    publish_connection('connection.removed', connection_id, client_id, professional_id, 'removed')
+    logger.debug('connection removed', extra={'connection_id': connection_id})
 
     return jsonify({'message': 'Connection removed'}), 200
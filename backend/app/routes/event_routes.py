@@ -0,0 +1,64 @@
+import json
+
+from flask import Blueprint, Response, current_app, request, stream_with_context
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from app.extensions import events
+
+event_bp = Blueprint('events', __name__)
+
+
+def format_event(event):
+    return f'id: {event.id}\nevent: {event.type}\ndata: {json.dumps(event.data)}\n\n'
+
+
+# Tells the client its view may be stale (missed events) and to refetch the lists
+RESET = 'event: reset\ndata: {}\n\n'
+
+
+@event_bp.route('', methods=['GET'])
+@event_bp.route('/', methods=['GET'])
+# EventSource cannot set an Authorization header, so the token may also
+# come from ?token= on this endpoint only.
+@jwt_required(locations=['headers', 'query_string'])
+def stream_events():
+    current_user_id = get_jwt_identity()
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    try:
+        last_event_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        last_event_id = None
+    heartbeat = current_app.config['EVENTS_HEARTBEAT_SECONDS']
+
+    def generate():
+        # Subscribe here rather than in the view, so a response that is never
+        # iterated (HEAD, a client gone before the first chunk) can't leak
+        # one. Subscribe before replaying so nothing published in between is
+        # lost; anything seen in both is skipped by id.
+        subscription = events.subscribe(current_user_id)
+        try:
+            last_sent = 0
+            yield 'retry: 3000\n\n'
+            if last_event_id is not None:
+                replayed, complete = events.replay(current_user_id, last_event_id)
+                if not complete:
+                    yield RESET
+                for event in replayed:
+                    yield format_event(event)
+                    last_sent = event.id
+            while True:
+                event = subscription.get(timeout=heartbeat)
+                if subscription.overflowed:
+                    subscription.overflowed = False
+                    yield RESET
+                if event is None:
+                    yield ': keep-alive\n\n'
+                elif event.id > last_sent:
+                    yield format_event(event)
+                    last_sent = event.id
+        finally:
+            subscription.close()
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',
+    })
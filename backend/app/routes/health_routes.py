@@ -1,11 +1,44 @@
-from flask import Blueprint, request, jsonify
+import logging
+from flask import Blueprint, current_app, request, jsonify
+from app.extensions import db, engine_profile, logs, password_hasher, rate_limiter, recommendations
 
 health_bp = Blueprint('health', __name__)
+logger = logging.getLogger(__name__)
 
 
 @health_bp.route('/', methods=['GET'])
 def health_check():
     # Simple health endpoint to help debug network/CORS issues from the frontend
     origin = request.headers.get('Origin')
-    print(f"[health_check] origin={origin} remote_addr={request.remote_addr}")
+    logger.debug('health_check', extra={'origin': origin, 'remote_addr': request.remote_addr})
     return jsonify({'status': 'ok', 'origin': origin}), 200
+
+
+@health_bp.route('/hashing', methods=['GET'])
+def hashing_stats():
+    # Per-phase timings (queue wait vs. KDF time) and rejections for the password hashing pool
+    return jsonify(password_hasher.stats()), 200
+
+
+@health_bp.route('/db', methods=['GET'])
+def db_stats():
+    # Engine profile, pool utilization and checkout wait for this worker
+    return jsonify(engine_profile.stats(current_app, db.engine)), 200
+
+
+@health_bp.route('/logging', methods=['GET'])
+def logging_stats():
+    # Log queue depth and records dropped, sampled out or rate limited in this worker
+    return jsonify(logs.stats()), 200
+
+
+@health_bp.route('/recommendations', methods=['GET'])
+def recommendation_stats():
+    # Size and age of this worker's in-memory connection graph
+    return jsonify(recommendations.stats()), 200
+
+
+@health_bp.route('/ratelimit', methods=['GET'])
+def ratelimit_stats():
+    # Admitted and throttled requests per rule in this worker
+    return jsonify(rate_limiter.stats()), 200
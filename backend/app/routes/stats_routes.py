@@ -0,0 +1,27 @@
+from flask import Blueprint, jsonify
+from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
+from app.extensions import db, replica_router
+from app.models import ProfessionalStats
+from app.stats import as_dict
+
+stats_bp = Blueprint('stats', __name__)
+
+
+@stats_bp.route('', methods=['GET'])
+@stats_bp.route('/', methods=['GET'])
+@jwt_required()
+def get_stats():
+    # One primary-key read of the maintained counters, however many
+    # connections and invites the professional has
+    current_user_id = get_jwt_identity()
+    claims = get_jwt()
+    if claims.get('role') != 'professional':
+        return jsonify({'message': 'Only professionals have dashboard stats'}), 403
+
+    # Always from the primary: a professional checks these right after
+    # accepting or inviting, and not every write that moves them bumps the
+    # professional's change version (a client answering an invite bumps
+    # only the client's), so the versioned() replica check can't vouch for them
+    replica_router.use_primary(db.session)
+    stats = db.session.get(ProfessionalStats, int(current_user_id))
+    return jsonify(as_dict(stats, current_user_id)), 200
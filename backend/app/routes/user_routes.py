@@ -1,21 +1,118 @@
+import logging
 from flask import Blueprint, request, jsonify
-from app.models import User
-from app.schemas.user_schema import users_schema
+from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
+from app.extensions import db, recommendations
+from app.models import Connection, User
+from app.versions import role_key, versioned
+from app.pagination import (
+    InvalidCursor, keyset_page, parse_limit, stream_ndjson, wants_ndjson
+)
+from app.search import search_query
+
+# Schemas are imported in the views that use them (see app/schemas/__init__.py)
+
+SEARCH_PAGE_SIZE = 20
+SEARCH_MAX_PAGE_SIZE = 100
+SEARCH_MAX_LENGTH = 100
+RECOMMENDATION_PAGE_SIZE = 10
+RECOMMENDATION_MAX_PAGE_SIZE = 50
 
 # Accept both '/api/users' and '/api/users/' without Flask issuing a redirect
 # which can trigger CORS/preflight failures in the browser.
 user_bp = Blueprint('users', __name__)
+logger = logging.getLogger(__name__)
+
+
+def directory_query(role):
+    query = User.query
+    if role:
+        query = query.filter_by(role=role)
+    # Select plain row tuples and dump them with the compiled serializer;
+    # no ORM objects are built for the directory.
+    from app.schemas.user_schema import user_serializer
+    return user_serializer.select_from(query)
 
 
 @user_bp.route('', methods=['GET'])
 @user_bp.route('/', methods=['GET'])
+@versioned(lambda: [role_key(request.args.get('role'))])
 def list_users():
+    from app.schemas.user_schema import user_serializer
     role = request.args.get('role')
+    cursor = request.args.get('cursor')
     # Debug: log origin to help diagnose CORS/network issues during local dev
-    origin = request.headers.get('Origin')
-    print(f"[users.list_users] origin={origin} remote_addr={request.remote_addr} role={role}")
-    query = User.query
-    if role:
-        query = query.filter_by(role=role)
-    users = query.all()
-    return jsonify(users_schema.dump(users)), 200
+    logger.debug('list_users', extra={
+        'origin': request.headers.get('Origin'), 'remote_addr': request.remote_addr, 'role': role})
+    query = directory_query(role)
+
+    streaming = wants_ndjson(request)
+    try:
+        # Streaming mode has no default limit: the whole directory is sent
+        # in batches from a server-side cursor.
+        if streaming:
+            limit = parse_limit(request.args.get('limit'), default=None, maximum=None)
+        else:
+            limit = parse_limit(request.args.get('limit'))
+    except ValueError:
+        return jsonify({'message': 'Invalid limit'}), 400
+
+    try:
+        if streaming:
+            return stream_ndjson(query, User.id, cursor, user_serializer.dump_row, limit=limit)
+        users, next_cursor = keyset_page(query, User.id, cursor, limit)
+    except InvalidCursor:
+        return jsonify({'message': 'Invalid cursor'}), 400
+
+    return jsonify({
+        'users': user_serializer.dump_rows(users),
+        'next_cursor': next_cursor
+    }), 200
+
+
+@user_bp.route('/search', methods=['GET'])
+@versioned(lambda: [role_key(request.args.get('role'))])
+def search_users():
+    term = (request.args.get('q') or '').strip()
+    if not term:
+        return jsonify({'message': 'Search query is required'}), 400
+    if len(term) > SEARCH_MAX_LENGTH:
+        return jsonify({'message': 'Search query is too long'}), 400
+    try:
+        limit = parse_limit(request.args.get('limit'), default=SEARCH_PAGE_SIZE, maximum=SEARCH_MAX_PAGE_SIZE)
+    except ValueError:
+        return jsonify({'message': 'Invalid limit'}), 400
+
+    query = search_query(directory_query(None), term, request.args.get('role'), limit)
+    from app.schemas.user_schema import user_serializer
+    return jsonify({'users': user_serializer.dump_rows(query.all())}), 200
+
+
+@user_bp.route('/recommendations', methods=['GET'])
+@jwt_required()
+def recommend_professionals():
+    if get_jwt().get('role') != 'client':
+        return jsonify({'message': 'Only clients get professional recommendations'}), 403
+    try:
+        limit = parse_limit(request.args.get('limit'), default=RECOMMENDATION_PAGE_SIZE,
+                            maximum=RECOMMENDATION_MAX_PAGE_SIZE)
+    except ValueError:
+        return jsonify({'message': 'Invalid limit'}), 400
+
+    client_id = int(get_jwt_identity())
+    # The graph only has accepted connections; pending and rejected ones
+    # shouldn't be suggested either
+    connected = [row.professional_id for row in
+                 db.session.query(Connection.professional_id).filter_by(client_id=client_id)]
+    ranked = recommendations.recommend(client_id, limit, exclude=connected)
+    if not ranked:
+        return jsonify({'users': []}), 200
+
+    ids = [professional_id for professional_id, _ in ranked]
+    rows = {row.id: row for row in directory_query('professional').filter(User.id.in_(ids))}
+    from app.schemas.user_schema import user_serializer
+    users = [
+        {**user_serializer.dump_row(rows[professional_id]), 'shared_clients': shared}
+        for professional_id, shared in ranked
+        if professional_id in rows
+    ]
+    return jsonify({'users': users}), 200
@@ -1,3 +1,16 @@
-from flask import Blueprint
+"""Marshmallow schemas, and the compiled serializers built from them.
 
-# Init file for schemas
+Importing a schema module imports marshmallow and reflects the models into
+schema fields, about 120 ms, so nothing imports this package at startup.
+The route modules import schemas inside the views that dump them, and
+gunicorn.conf.py loads them when a worker starts. Processes that never
+dump a model, like the flask CLI commands, skip the cost entirely.
+"""
+from flask_marshmallow import Marshmallow
+
+from app.extensions import db
+
+ma = Marshmallow()
+# What ma.init_app() does with Flask-SQLAlchemy: load_instance schemas use
+# the app's scoped session. It doesn't depend on the app, so no app is needed
+ma.SQLAlchemyAutoSchema.OPTIONS_CLASS.session = db.session
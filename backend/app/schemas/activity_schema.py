@@ -1,5 +1,6 @@
-from app.extensions import ma
+from app.schemas import ma
 from app.models import GroupActivity, ActivityInvite
+from app.schemas.fast_serializer import compile_serializer
 from app.schemas.user_schema import UserSchema
 
 class GroupActivitySchema(ma.SQLAlchemyAutoSchema):
@@ -21,3 +22,6 @@ activity_schema = GroupActivitySchema()
 activities_schema = GroupActivitySchema(many=True)
 invite_schema = ActivityInviteSchema()
 invites_schema = ActivityInviteSchema(many=True)
+
+activity_serializer = compile_serializer(activity_schema)
+invite_serializer = compile_serializer(invite_schema)
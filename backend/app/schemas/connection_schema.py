@@ -1,5 +1,6 @@
-from app.extensions import ma
+from app.schemas import ma
 from app.models import Connection
+from app.schemas.fast_serializer import compile_serializer
 from app.schemas.user_schema import UserSchema
 
 class ConnectionSchema(ma.SQLAlchemyAutoSchema):
@@ -15,3 +16,5 @@ class ConnectionSchema(ma.SQLAlchemyAutoSchema):
 
 connection_schema = ConnectionSchema()
 connections_schema = ConnectionSchema(many=True)
+
+connection_serializer = compile_serializer(connection_schema)
@@ -1,5 +1,6 @@
-from app.extensions import ma
+from app.schemas import ma
 from app.models import User
+from app.schemas.fast_serializer import compile_serializer
 
 class UserSchema(ma.SQLAlchemyAutoSchema):
     class Meta:
@@ -9,3 +10,5 @@ class UserSchema(ma.SQLAlchemyAutoSchema):
 
 user_schema = UserSchema()
 users_schema = UserSchema(many=True)
+
+user_serializer = compile_serializer(user_schema)
@@ -0,0 +1,128 @@
+"""Indexed user search: prefix and substring matches on name and email.
+
+Two indexes back every search:
+
+* ``ix_user_name_lower`` and ``ix_user_role_name_lower`` (b-trees on
+  lower(name) and (role, lower(name)), in the model) find names starting
+  with the query in index order.
+* A trigram index finds the query anywhere in the name or email. On
+  SQLite that is the FTS5 table ``user_search`` (tokenize='trigram'),
+  an external-content index over ``user`` kept in sync by triggers. On
+  Postgres it is a pg_trgm GIN index on lower(name) and one on
+  lower(email).
+
+Both are created with the ``user`` table (create_all or the migration),
+and the database maintains them on every insert, update and delete, so
+signups and bulk imports show up in search immediately.
+
+Results are ranked: name starts with the query, then a later word of the
+name does, then the email starts with it, then any other substring match;
+ties go alphabetically. A very common substring can match most of the
+table, so only the first SEARCH_CANDIDATES substring matches are ranked.
+Name-prefix matches are always fetched separately, so the best tier is
+never cut off. Trigrams need three characters; shorter queries only match
+name prefixes.
+"""
+from sqlalchemy import DDL, case, column, event, func, literal_column, or_, select, table, union
+
+from .extensions import db
+from .models import User
+
+SEARCH_CANDIDATES = 200
+
+SQLITE_DDL = [
+    "CREATE VIRTUAL TABLE user_search USING fts5("
+    "name, email, role UNINDEXED, content='user', content_rowid='id', tokenize='trigram')",
+    'CREATE TRIGGER user_search_insert AFTER INSERT ON "user" BEGIN '
+    'INSERT INTO user_search(rowid, name, email, role) VALUES (new.id, new.name, new.email, new.role); END',
+    'CREATE TRIGGER user_search_delete AFTER DELETE ON "user" BEGIN '
+    "INSERT INTO user_search(user_search, rowid, name, email, role) "
+    "VALUES ('delete', old.id, old.name, old.email, old.role); END",
+    'CREATE TRIGGER user_search_update AFTER UPDATE ON "user" BEGIN '
+    "INSERT INTO user_search(user_search, rowid, name, email, role) "
+    "VALUES ('delete', old.id, old.name, old.email, old.role); "
+    'INSERT INTO user_search(rowid, name, email, role) VALUES (new.id, new.name, new.email, new.role); END',
+]
+POSTGRES_DDL = [
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    'CREATE INDEX ix_user_name_trgm ON "user" USING gin (lower(name) gin_trgm_ops)',
+    'CREATE INDEX ix_user_email_trgm ON "user" USING gin (lower(email) gin_trgm_ops)',
+]
+
+for statement in SQLITE_DDL:
+    event.listen(User.__table__, 'after_create', DDL(statement).execute_if(dialect='sqlite'))
+for statement in POSTGRES_DDL:
+    event.listen(User.__table__, 'after_create', DDL(statement).execute_if(dialect='postgresql'))
+# The triggers go with the user table; the FTS table has to be dropped too
+event.listen(User.__table__, 'before_drop', DDL('DROP TABLE IF EXISTS user_search').execute_if(dialect='sqlite'))
+
+# Not part of the metadata, so create_all never makes a plain table of it
+user_search = table('user_search', column('rowid'), column('role'))
+
+
+def include_name(name, type_, parent_names):
+    """Alembic filter: the FTS table and its shadow tables aren't models."""
+    return not (type_ == 'table' and (name == 'user_search' or name.startswith('user_search_')))
+
+
+def escape_like(value):
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def fts_phrase(value):
+    # One quoted phrase: the query is matched literally, never as FTS syntax
+    return '"' + value.replace('"', '""') + '"'
+
+
+def candidate_ids(term, role, limit):
+    name = func.lower(User.name)
+    dialect = db.session.get_bind().dialect.name
+
+    prefix = select(User.id).order_by(name).limit(limit)
+    if dialect == 'sqlite':
+        # A range on the expression index; SQLite only uses an index for
+        # LIKE under case_sensitive_like
+        prefix = prefix.where(name >= term, name < term + '\U0010ffff')
+    else:
+        # text_pattern_ops lets Postgres use the index for a prefix LIKE
+        prefix = prefix.where(name.like(escape_like(term) + '%', escape='\\'))
+    if role:
+        prefix = prefix.where(User.role == role)
+
+    if dialect == 'sqlite':
+        substring = (
+            select(user_search.c.rowid.label('id'))
+            .where(literal_column('user_search').op('MATCH')(fts_phrase(term)))
+        )
+        if role:
+            substring = substring.where(user_search.c.role == role)
+    else:
+        pattern = '%' + escape_like(term) + '%'
+        substring = select(User.id).where(or_(
+            name.like(pattern, escape='\\'),
+            func.lower(User.email).like(pattern, escape='\\'),
+        ))
+        if role:
+            substring = substring.where(User.role == role)
+    substring = substring.limit(SEARCH_CANDIDATES)
+
+    prefix, substring = prefix.subquery(), substring.subquery()
+    return union(select(prefix.c.id), select(substring.c.id))
+
+
+def search_query(query, term, role, limit):
+    """Narrow ``query`` (over User) to the ranked matches for ``term``."""
+    term = term.lower()
+    name = func.lower(User.name)
+    escaped = escape_like(term)
+    rank = case(
+        (name.like(escaped + '%', escape='\\'), 0),
+        (name.like('% ' + escaped + '%', escape='\\'), 1),
+        (func.lower(User.email).like(escaped + '%', escape='\\'), 2),
+        else_=3,
+    )
+    return (
+        query.filter(User.id.in_(candidate_ids(term, role, limit)))
+        .order_by(rank, name, User.id)
+        .limit(limit)
+    )
@@ -0,0 +1,25 @@
+"""Pruning of refresh sessions nothing can use any more.
+
+Every signup and login adds a RefreshSession row. A row is dead once it is
+revoked (logout, or a replayed refresh token) or its current refresh token
+has expired, JWT_REFRESH_TOKEN_EXPIRES after ``refreshed_at``: /refresh
+rejects every token it could be asked about. Login deletes the user's dead
+sessions before starting a new one, so an active user's rows stay few.
+``flask sessions prune`` deletes everyone's, for users who stopped logging in.
+"""
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import delete, or_
+
+from .extensions import db
+from .models import RefreshSession
+
+
+def prune_sessions(user_id=None, now=None):
+    """Delete dead sessions (only ``user_id``'s if given); returns how many."""
+    cutoff = (now or datetime.utcnow()) - current_app.config['JWT_REFRESH_TOKEN_EXPIRES']
+    stmt = delete(RefreshSession).where(or_(RefreshSession.revoked.is_(True), RefreshSession.refreshed_at < cutoff))
+    if user_id is not None:
+        stmt = stmt.where(RefreshSession.user_id == user_id)
+    return db.session.execute(stmt).rowcount
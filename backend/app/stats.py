@@ -0,0 +1,163 @@
+"""Per-professional dashboard counters.
+
+ProfessionalStats holds one row of counters per professional: pending
+requests (incoming from clients and outgoing invitations), accepted
+clients, activities, and activity invites by status. Every write path that
+changes one of them collects the changes in a CounterDeltas and applies
+them before its commit, as one upsert:
+
+    deltas = CounterDeltas()
+    deltas.connection(professional_id, initiated_by, old_status, new_status)
+    deltas.apply()
+
+Deltas are computed from the row's status as the transaction sees it: the
+row is read FOR UPDATE on Postgres, and on SQLite the write lock already
+serializes writers. A concurrent change can't be counted twice.
+
+counts_query() recomputes every counter from the data tables with GROUP BY.
+``flask stats rebuild`` uses it to reset the table, for example after a
+bulk import, and ``flask stats check`` compares it with the stored rows.
+"""
+from collections import Counter, defaultdict
+
+from sqlalchemy import case, delete, func, insert, select, text, union
+
+from .extensions import db
+from .models import Connection, GroupActivity, ActivityInvite, ProfessionalStats
+from .upsert import dialect_insert
+
+COUNTERS = (
+    'pending_incoming', 'pending_outgoing', 'accepted_clients', 'activities',
+    'invites_pending', 'invites_accepted', 'invites_declined',
+)
+INVITE_COUNTERS = {'pending': 'invites_pending', 'accepted': 'invites_accepted', 'declined': 'invites_declined'}
+
+
+def connection_counter(professional_id, initiated_by, status):
+    if status == 'pending':
+        return 'pending_outgoing' if str(initiated_by) == str(professional_id) else 'pending_incoming'
+    if status == 'accepted':
+        return 'accepted_clients'
+    return None
+
+
+class CounterDeltas:
+
+    def __init__(self):
+        self.deltas = defaultdict(Counter)
+
+    def add(self, professional_id, counter, amount=1):
+        if counter is not None:
+            self.deltas[int(professional_id)][counter] += amount
+
+    def connection(self, professional_id, initiated_by, old_status=None, new_status=None):
+        """Count a connection created (no old_status), deleted (no
+        new_status) or moved from one status to another."""
+        self.add(professional_id, connection_counter(professional_id, initiated_by, old_status), -1)
+        self.add(professional_id, connection_counter(professional_id, initiated_by, new_status))
+
+    def invite(self, professional_id, old_status=None, new_status=None):
+        self.add(professional_id, INVITE_COUNTERS.get(old_status), -1)
+        self.add(professional_id, INVITE_COUNTERS.get(new_status))
+
+    def apply(self):
+        """Add the collected deltas to the stored counters (one statement)."""
+        rows = [
+            {'professional_id': professional_id, **{counter: counts[counter] for counter in COUNTERS}}
+            for professional_id, counts in sorted(self.deltas.items())  # fixed order: no deadlocks
+            if any(counts.values())
+        ]
+        self.deltas.clear()
+        if not rows:
+            return
+        stmt = dialect_insert(ProfessionalStats).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[ProfessionalStats.professional_id],
+            set_={counter: getattr(ProfessionalStats, counter) + getattr(stmt.excluded, counter)
+                  for counter in COUNTERS},
+        )
+        db.session.execute(stmt)
+
+
+def as_dict(stats, professional_id):
+    counts = {counter: getattr(stats, counter) if stats is not None else 0 for counter in COUNTERS}
+    answered = counts['invites_accepted'] + counts['invites_declined']
+    return {
+        'professional_id': int(professional_id),
+        **counts,
+        'invite_acceptance_rate': round(counts['invites_accepted'] / answered, 4) if answered else None,
+    }
+
+
+def counts_query():
+    """Every professional's counters, computed from the data tables."""
+    def tally(condition):
+        return func.sum(case((condition, 1), else_=0))
+
+    connections = (
+        select(
+            Connection.professional_id.label('professional_id'),
+            tally((Connection.status == 'pending') & (Connection.initiated_by != Connection.professional_id))
+            .label('pending_incoming'),
+            tally((Connection.status == 'pending') & (Connection.initiated_by == Connection.professional_id))
+            .label('pending_outgoing'),
+            tally(Connection.status == 'accepted').label('accepted_clients'),
+        )
+        .group_by(Connection.professional_id)
+        .subquery()
+    )
+    activities = (
+        select(GroupActivity.created_by.label('professional_id'), func.count().label('activities'))
+        .group_by(GroupActivity.created_by)
+        .subquery()
+    )
+    invites = (
+        select(
+            GroupActivity.created_by.label('professional_id'),
+            *(tally(ActivityInvite.status == status).label(counter) for status, counter in INVITE_COUNTERS.items()),
+        )
+        .join_from(ActivityInvite, GroupActivity, ActivityInvite.activity_id == GroupActivity.id)
+        .group_by(GroupActivity.created_by)
+        .subquery()
+    )
+    # Invites always belong to an activity, so these two cover everyone
+    ids = union(select(connections.c.professional_id), select(activities.c.professional_id)).subquery()
+    columns = {counter: subquery.c[counter] for subquery in (connections, activities, invites)
+               for counter in COUNTERS if counter in subquery.c}
+    return (
+        select(ids.c.professional_id,
+               *(func.coalesce(columns[counter], 0).label(counter) for counter in COUNTERS))
+        .select_from(ids)
+        .outerjoin(connections, connections.c.professional_id == ids.c.professional_id)
+        .outerjoin(activities, activities.c.professional_id == ids.c.professional_id)
+        .outerjoin(invites, invites.c.professional_id == ids.c.professional_id)
+    )
+
+
+def rebuild_counters():
+    """Replace every stored counter with a fresh count, in the current
+    transaction. Returns the number of professionals."""
+    if db.session.get_bind().dialect.name == 'postgresql':
+        # Writers update the counters before they commit, so they wait here
+        # and apply their delta on top of the rebuilt row afterwards
+        db.session.execute(text('LOCK TABLE professional_stats IN EXCLUSIVE MODE'))
+    db.session.execute(delete(ProfessionalStats))
+    result = db.session.execute(
+        insert(ProfessionalStats).from_select(['professional_id', *COUNTERS], counts_query()))
+    return result.rowcount
+
+
+def check_counters():
+    """Yield (professional_id, counter, stored, actual) for every mismatch."""
+    stored = {stats.professional_id: stats for stats in db.session.scalars(select(ProfessionalStats))}
+    for row in db.session.execute(counts_query().execution_options(yield_per=5000)):
+        saved = stored.pop(row.professional_id, None)
+        for counter in COUNTERS:
+            value = getattr(saved, counter) if saved is not None else 0
+            if value != getattr(row, counter):
+                yield row.professional_id, counter, value, getattr(row, counter)
+    # Rows left over have nothing behind them and should be all zeros
+    for professional_id, saved in stored.items():
+        for counter in COUNTERS:
+            if getattr(saved, counter):
+                yield professional_id, counter, getattr(saved, counter), 0
@@ -0,0 +1,35 @@
+from sqlalchemy.dialects import postgresql, sqlite
+
+from .extensions import db
+
+
+def dialect_insert(model, bind=None):
+    """Return an INSERT construct with ON CONFLICT support for ``bind``
+    (default: the session's database).
+
+    Both SQLite and Postgres spell upserts as INSERT ... ON CONFLICT, but
+    SQLAlchemy exposes on_conflict_do_* only on the dialect-specific insert().
+    """
+    name = (bind or db.session.get_bind()).dialect.name
+    if name == 'postgresql':
+        return postgresql.insert(model)
+    if name == 'sqlite':
+        return sqlite.insert(model)
+    raise NotImplementedError(f'ON CONFLICT is not supported on {name}')
+
+
+def insert_unless_exists(model, conflict_columns, **values):
+    """Insert one row in a single round trip, unless it would conflict.
+
+    Runs INSERT ... ON CONFLICT (conflict_columns) DO NOTHING RETURNING and
+    returns the new ``model`` instance, or None if a row with the same
+    ``conflict_columns`` already exists. Unlike a SELECT followed by an
+    INSERT, concurrent callers can't both get past the check.
+    """
+    stmt = (
+        dialect_insert(model)
+        .values(**values)
+        .on_conflict_do_nothing(index_elements=conflict_columns)
+        .returning(model)
+    )
+    return db.session.scalars(stmt).one_or_none()
@@ -0,0 +1,36 @@
+import os
+
+# Threaded workers: a change feed subscriber (GET /api/events) holds one
+# thread for as long as its page is open, rather than a whole sync worker,
+# and the worker's timeout no longer kills open streams
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+threads = int(os.environ.get('GUNICORN_THREADS', 32))
+
+
+def when_ready(server):
+    # The default events backend only reaches streams in the same worker
+    backend = os.environ.get('EVENTS_BACKEND', 'app.events:LocalEventBackend')
+    if server.cfg.workers > 1 and backend == 'app.events:LocalEventBackend':
+        server.log.warning('%d workers with EVENTS_BACKEND=%s: change feed streams only get events from '
+                           'their own worker; set EVENTS_BACKEND=app.events:SQLEventBackend',
+                           server.cfg.workers, backend)
+
+
+def child_exit(server, worker):
+    # With PROMETHEUS_MULTIPROC_DIR set, drop the dead worker's live gauges
+    # from the aggregated /metrics output (see app/metrics.py)
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
+
+
+def post_worker_init(worker):
+    # Load the recommendation graph (app/recommend.py) and the schemas
+    # (app/schemas/__init__.py) before the worker takes requests rather
+    # than in the first request that needs them
+    app = worker.wsgi
+    if 'recommendations' not in getattr(app, 'extensions', {}):
+        return  # not the Flask app (e.g. an ASGI worker)
+    from app.schemas import activity_schema, connection_schema, user_schema  # noqa: F401
+    with app.app_context():
+        app.extensions['recommendations'].load()
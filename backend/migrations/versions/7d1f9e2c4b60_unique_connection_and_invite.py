@@ -0,0 +1,51 @@
+"""unique connection and invite pairs
+
+Revision ID: 7d1f9e2c4b60
+Revises: e4a7c3b9d218
+Create Date: 2026-10-18 18:22:07.914352
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7d1f9e2c4b60'
+down_revision = 'e4a7c3b9d218'
+branch_labels = None
+depends_on = None
+
+
+def dedupe(table, pair):
+    op.execute(
+        f'DELETE FROM {table} WHERE id IN ('
+        f'SELECT id FROM (SELECT id, ROW_NUMBER() OVER ('
+        f"PARTITION BY {pair} ORDER BY CASE WHEN status = 'accepted' THEN 0 ELSE 1 END, id DESC"
+        f') AS position FROM {table}) ranked WHERE position > 1)'
+    )
+
+
+def upgrade():
+    # Duplicates let through by the old check-then-insert would block the
+    # unique indexes. Keep the accepted row of each pair if there is one,
+    # otherwise the newest, so no live connection or invite is dropped.
+    dedupe('connection', 'client_id, professional_id')
+    dedupe('activity_invite', 'activity_id, client_id')
+
+    with op.batch_alter_table('connection', schema=None) as batch_op:
+        batch_op.drop_index('ix_connection_client_professional')
+        batch_op.create_index('ix_connection_client_professional', ['client_id', 'professional_id'], unique=True)
+
+    with op.batch_alter_table('activity_invite', schema=None) as batch_op:
+        batch_op.drop_index('ix_activity_invite_activity_client')
+        batch_op.create_index('ix_activity_invite_activity_client', ['activity_id', 'client_id'], unique=True)
+
+
+def downgrade():
+    with op.batch_alter_table('activity_invite', schema=None) as batch_op:
+        batch_op.drop_index('ix_activity_invite_activity_client')
+        batch_op.create_index('ix_activity_invite_activity_client', ['activity_id', 'client_id'], unique=False)
+
+    with op.batch_alter_table('connection', schema=None) as batch_op:
+        batch_op.drop_index('ix_connection_client_professional')
+        batch_op.create_index('ix_connection_client_professional', ['client_id', 'professional_id'], unique=False)
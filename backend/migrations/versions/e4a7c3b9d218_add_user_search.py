@@ -0,0 +1,65 @@
+"""add user search indexes
+
+Revision ID: e4a7c3b9d218
+Revises: 0c7e4b9a5d12
+Create Date: 2026-10-18 16:40:12.583104
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e4a7c3b9d218'
+down_revision = '0c7e4b9a5d12'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.execute('CREATE INDEX ix_user_name_lower ON "user" (lower(name) text_pattern_ops)')
+        op.execute('CREATE INDEX ix_user_role_name_lower ON "user" (role, lower(name) text_pattern_ops)')
+        op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        op.execute('CREATE INDEX ix_user_name_trgm ON "user" USING gin (lower(name) gin_trgm_ops)')
+        op.execute('CREATE INDEX ix_user_email_trgm ON "user" USING gin (lower(email) gin_trgm_ops)')
+    else:
+        op.create_index('ix_user_name_lower', 'user', [sa.text('lower(name)')], unique=False)
+        op.create_index('ix_user_role_name_lower', 'user', ['role', sa.text('lower(name)')], unique=False)
+    if dialect == 'sqlite':
+        op.execute(
+            "CREATE VIRTUAL TABLE user_search USING fts5("
+            "name, email, role UNINDEXED, content='user', content_rowid='id', tokenize='trigram')"
+        )
+        op.execute(
+            'CREATE TRIGGER user_search_insert AFTER INSERT ON "user" BEGIN '
+            'INSERT INTO user_search(rowid, name, email, role) VALUES (new.id, new.name, new.email, new.role); END'
+        )
+        op.execute(
+            'CREATE TRIGGER user_search_delete AFTER DELETE ON "user" BEGIN '
+            "INSERT INTO user_search(user_search, rowid, name, email, role) "
+            "VALUES ('delete', old.id, old.name, old.email, old.role); END"
+        )
+        op.execute(
+            'CREATE TRIGGER user_search_update AFTER UPDATE ON "user" BEGIN '
+            "INSERT INTO user_search(user_search, rowid, name, email, role) "
+            "VALUES ('delete', old.id, old.name, old.email, old.role); "
+            'INSERT INTO user_search(rowid, name, email, role) VALUES (new.id, new.name, new.email, new.role); END'
+        )
+        # Index the users that already exist
+        op.execute("INSERT INTO user_search(user_search) VALUES ('rebuild')")
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        op.execute('DROP TRIGGER user_search_update')
+        op.execute('DROP TRIGGER user_search_delete')
+        op.execute('DROP TRIGGER user_search_insert')
+        op.execute('DROP TABLE user_search')
+    if dialect == 'postgresql':
+        op.drop_index('ix_user_email_trgm', table_name='user')
+        op.drop_index('ix_user_name_trgm', table_name='user')
+    op.drop_index('ix_user_role_name_lower', table_name='user')
+    op.drop_index('ix_user_name_lower', table_name='user')
@@ -0,0 +1,81 @@
+"""Helpers shared by the check and benchmark scripts.
+
+* ``check(name, ok, detail)`` prints an ok/FAIL line and counts failures;
+  ``exit_on_failures()`` then exits non-zero if any check failed
+* ``scratch_app(name, **settings)`` is an app on an empty SQLite file in a
+  temporary directory, with the tables created and everything removed
+  afterwards; ``scratch_db`` and ``scratch_config`` are its two halves, for
+  scripts that need the file itself (other processes, several apps)
+* ``access_token(user_id, role)`` is a token like the one login returns
+* ``percentile(sorted_values, pct)``
+
+The synthetic dataset comes from synthetic_data.generate().
+"""
+import os
+import shutil
+import sys
+import tempfile
+from contextlib import contextmanager
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from flask_jwt_extended import create_access_token
+
+from app import create_app
+from app.config import Config
+from app.extensions import db
+
+failures = 0
+
+
+def check(name, ok, detail=''):
+    global failures
+    failures += not ok
+    print(f'{"ok  " if ok else "FAIL"} {name}{"" if ok else "  " + detail}')
+
+
+def exit_on_failures():
+    if failures:
+        sys.exit(1)
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(len(sorted_values) * pct / 100))
+    return sorted_values[index]
+
+
+def access_token(user_id, role):
+    """An access token for ``user_id``, as login issues it. Needs an app context."""
+    return create_access_token(identity=str(user_id), additional_claims={'role': role})
+
+
+def scratch_config(path, **settings):
+    """Config for an app on the SQLite file ``path``, with ``settings`` on top."""
+    return type('ScratchConfig', (Config,), {'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + path, **settings})
+
+
+@contextmanager
+def scratch_db(name='scratch'):
+    """Path of a new SQLite file in a temporary directory, removed afterwards."""
+    workdir = tempfile.mkdtemp()
+    try:
+        yield os.path.join(workdir, f'{name}.db')
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+@contextmanager
+def scratch_app(name='scratch', **settings):
+    """An app on a scratch database, with the tables created."""
+    with scratch_db(name) as path:
+        app = create_app(scratch_config(path, **settings))
+        try:
+            with app.app_context():
+                db.create_all()
+            yield app
+        finally:
+            with app.app_context():
+                for engine in db.engines.values():
+                    engine.dispose()
@@ -0,0 +1,184 @@
+"""Benchmark professional recommendations on a large connection graph.
+
+Builds a scratch SQLite database with CLIENTS clients and PROFESSIONALS
+professionals (default 100k x 10k). Each client connects to one to eight
+professionals, with a Zipf-like skew so a few professionals are very
+popular. Most connections are accepted. Then it reports:
+
+* the time to load the in-memory graph and its size in bytes
+* recommend() latency, p50/p95/p99 over sampled clients
+* GET /api/users/recommendations latency through the test client
+* set_edge() latency for accepted and removed connections
+* the same co-connection ranking as one SQL query, for comparison
+
+The ranking is checked against the SQL query for every sampled client
+whose professionals are small enough that nothing was sampled away. Run
+from the backend directory:
+
+    python scripts/bench_recommendations.py
+    python scripts/bench_recommendations.py --clients 20000 --professionals 2000 --samples 200
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from bisect import bisect_left
+from itertools import accumulate
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from sqlalchemy import text
+from werkzeug.security import generate_password_hash
+
+from app import create_app
+from app.extensions import db, recommendations
+from app.models import User, Connection
+from app.recommend import MAX_NEIGHBORS
+
+from _common import access_token, percentile, scratch_config, scratch_db
+from synthetic_data import insert_chunked
+
+LIMIT = 10
+SQL_RANKING = text("""
+    SELECT other.professional_id, COUNT(*) AS shared
+    FROM connection AS mine
+    JOIN connection AS peer
+      ON peer.professional_id = mine.professional_id AND peer.client_id != mine.client_id
+         AND peer.status = 'accepted'
+    JOIN connection AS other
+      ON other.client_id = peer.client_id AND other.status = 'accepted'
+    WHERE mine.client_id = :client_id AND mine.status = 'accepted'
+      AND other.professional_id NOT IN (
+          SELECT professional_id FROM connection WHERE client_id = :client_id)
+    GROUP BY other.professional_id
+    ORDER BY shared DESC, other.professional_id
+    LIMIT :limit
+""")
+
+
+def report(name, seconds):
+    seconds = sorted(seconds)
+    print(f'{name:<32} p50 {percentile(seconds, 50) * 1000:8.3f} ms   '
+          f'p95 {percentile(seconds, 95) * 1000:8.3f} ms   p99 {percentile(seconds, 99) * 1000:8.3f} ms   '
+          f'({len(seconds)} calls)')
+
+
+def generate(n_clients, n_pros, seed):
+    """Insert the users and a skewed set of connections; return the count."""
+    rng = random.Random(seed)
+    password_hash = generate_password_hash('password123')
+    insert_chunked(User, (
+        {'id': i, 'name': f'{"Pro" if i <= n_pros else "Client"} {i}',
+         'email': f'{"pro" if i <= n_pros else "client"}{i}@example.com',
+         'password_hash': password_hash,
+         'role': 'professional' if i <= n_pros else 'client'}
+        for i in range(1, n_pros + n_clients + 1)
+    ), 10_000)
+    cumulative = list(accumulate(1 / (rank + 1) ** 0.8 for rank in range(n_pros)))
+
+    def connections():
+        for client_id in range(n_pros + 1, n_pros + n_clients + 1):
+            picked = set()
+            for _ in range(rng.randint(1, 8)):
+                picked.add(bisect_left(cumulative, rng.random() * cumulative[-1]) + 1)
+            for professional_id in sorted(picked):
+                status = 'accepted' if rng.random() < 0.85 else 'pending'
+                yield {'client_id': client_id, 'professional_id': professional_id, 'status': status,
+                       'initiated_by': client_id}
+
+    return insert_chunked(Connection, connections(), 10_000)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clients', type=int, default=100_000)
+    parser.add_argument('--professionals', type=int, default=10_000)
+    parser.add_argument('--samples', type=int, default=1000, help='clients to recommend for')
+    parser.add_argument('--sql-samples', type=int, default=50, help='clients to run the SQL ranking for')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    with scratch_db('recommend') as path:
+        mismatched = run(path, args)
+    if mismatched:
+        sys.exit(1)
+
+
+def run(path, args):
+    app = create_app(scratch_config(path, RECOMMENDATIONS_REFRESH_SECONDS=0))
+    with app.app_context():
+        db.create_all()
+        t0 = time.perf_counter()
+        edges = generate(args.clients, args.professionals, args.seed)
+        db.session.commit()
+        print(f'{args.clients:,} clients x {args.professionals:,} professionals, '
+              f'{edges:,} connections generated in {time.perf_counter() - t0:.1f}s')
+
+        t0 = time.perf_counter()
+        recommendations.load()
+        load_seconds = time.perf_counter() - t0
+        stats = recommendations.stats()
+        print(f'graph loaded in {load_seconds:.2f}s: {stats["connections"]:,} accepted edges in '
+              f'{stats["bytes"] / 2**20:.1f} MiB of arrays')
+
+        rng = random.Random(args.seed)
+        first_client = args.professionals + 1
+        clients = [rng.randrange(first_client, first_client + args.clients) for _ in range(args.samples)]
+        excluded = {}
+        for client_id in clients:
+            excluded[client_id] = [row.professional_id for row in
+                                   db.session.query(Connection.professional_id).filter_by(client_id=client_id)]
+        snapshot, _ = recommendations.graph()
+
+        timings, results = [], {}
+        for client_id in clients:
+            t0 = time.perf_counter()
+            results[client_id] = recommendations.recommend(client_id, LIMIT, excluded[client_id])
+            timings.append(time.perf_counter() - t0)
+        print()
+        report('recommend()', timings)
+
+        timings, checked, mismatched = [], 0, []
+        for client_id in clients[:args.sql_samples]:
+            t0 = time.perf_counter()
+            rows = db.session.execute(SQL_RANKING, {'client_id': client_id, 'limit': LIMIT}).all()
+            timings.append(time.perf_counter() - t0)
+            mine = snapshot.professionals(client_id)
+            share = MAX_NEIGHBORS // len(mine) if mine else 0
+            if any(len(snapshot.clients(professional_id)) > share for professional_id in mine):
+                continue  # neighbours were sampled; scores are estimates
+            checked += 1
+            expected = [(row.professional_id, row.shared) for row in rows]
+            if results[client_id][:len(expected)] != expected:
+                mismatched.append(client_id)
+        report('SQL co-connection query', timings)
+
+        tokens = {client_id: access_token(client_id, 'client') for client_id in clients[:200]}
+        client = app.test_client()
+        timings = []
+        for client_id, token in tokens.items():
+            t0 = time.perf_counter()
+            response = client.get('/api/users/recommendations',
+                                  headers={'Authorization': 'Bearer ' + token})
+            timings.append(time.perf_counter() - t0)
+            assert response.status_code == 200, response.get_data(as_text=True)
+        report('GET /api/users/recommendations', timings)
+
+        timings = []
+        for i, client_id in enumerate(clients):
+            professional_id = rng.randrange(1, args.professionals + 1)
+            t0 = time.perf_counter()
+            recommendations.set_edge(client_id, professional_id, i % 2 == 0)
+            timings.append(time.perf_counter() - t0)
+        report('set_edge()', timings)
+
+        print()
+        print(f'ranking matches SQL for {checked - len(mismatched)} of {checked} fully counted clients'
+              + (f'; mismatches: {mismatched[:5]}' if mismatched else ''))
+        db.engine.dispose()
+    return mismatched
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+"""Benchmark bytes on the wire and CPU per response, by JSON provider and
+encoding.
+
+Builds a scratch SQLite database with the synthetic dataset (default 20k
+users) and requests four payloads through the test client:
+
+* ``directory``: GET /api/users?limit=500
+* ``connections``: GET /api/connection/list for the busiest professional
+* ``activities``: GET /api/activities/list for the same professional
+* ``export``: GET /api/users?role=client&format=ndjson, streamed
+
+Each payload is requested with every JSON provider available (stdlib, and
+orjson if installed) and every encoding (identity, gzip, br if brotli is
+installed). For each combination it reports the body size, the median
+process CPU time and the median wall time of a whole request. A second
+table times only the JSON encoding and only the compression of each
+payload, without the database and routing around them. Run from the
+backend directory:
+
+    python scripts/bench_responses.py
+    python scripts/bench_responses.py --users 5000 --requests 20
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from sqlalchemy import func
+
+from app import create_app
+from app.compression import ENCODINGS, compress
+from app.extensions import db
+from app.json_provider import PROVIDERS, orjson
+from app.models import Connection
+
+from _common import access_token, scratch_config, scratch_db
+from synthetic_data import generate
+
+PAYLOADS = {
+    'directory': '/api/users?limit=500',
+    'connections': '/api/connection/list',
+    'activities': '/api/activities/list',
+    'export': '/api/users?role=client&format=ndjson',
+}
+
+
+def median(values):
+    values = sorted(values)
+    return values[len(values) // 2]
+
+
+def measure(call, repeat):
+    """Median (process CPU, wall) seconds of ``call``, and its last result."""
+    call()  # warm up caches and the connection pool
+    cpu, wall = [], []
+    for _ in range(repeat):
+        c0, w0 = time.process_time(), time.perf_counter()
+        result = call()
+        wall.append(time.perf_counter() - w0)
+        cpu.append(time.process_time() - c0)
+    return median(cpu), median(wall), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=20_000)
+    parser.add_argument('--requests', type=int, default=30, help='requests per combination')
+    args = parser.parse_args()
+
+    providers = [name for name in PROVIDERS if name != 'orjson' or orjson is not None]
+    encodings = ('identity',) + tuple(reversed(ENCODINGS))
+
+    with scratch_db('responses') as path:
+        config = scratch_config(path, RATELIMIT_ENABLED=False)
+        app = create_app(config)
+        with app.app_context():
+            db.create_all()
+            counts = generate(args.users)
+            busiest = db.session.query(Connection.professional_id).group_by(Connection.professional_id) \
+                .order_by(func.count().desc(), Connection.professional_id).limit(1).scalar()
+            token = access_token(busiest, 'professional')
+            db.engine.dispose()
+        print(', '.join(f'{count:,} {name}' for name, count in counts.items()),
+              f'; busiest professional is {busiest}')
+        headers = {'Authorization': 'Bearer ' + token}
+
+        print(f'\n{"payload":<12} {"provider":<8} {"encoding":<9} {"bytes":>11} {"ratio":>6} '
+              f'{"cpu/resp":>11} {"wall/resp":>11}')
+        bodies = {}
+        for provider in providers:
+            config.JSON_PROVIDER = provider
+            app = create_app(config)
+            client = app.test_client()
+            for payload, url in PAYLOADS.items():
+                identity_size = None
+                for encoding in encodings:
+                    request_headers = dict(headers, **{'Accept-Encoding': encoding})
+
+                    def call():
+                        response = client.get(url, headers=request_headers)
+                        data = response.get_data()  # drains a streamed body
+                        assert response.status_code == 200, response.status
+                        return response.headers.get('Content-Encoding', 'identity'), data
+
+                    cpu, wall, (sent, data) = measure(call, args.requests)
+                    identity_size = identity_size or len(data)
+                    if encoding == 'identity':
+                        bodies.setdefault(payload, data)
+                    # Bodies under COMPRESS_MIN_SIZE go out as they are
+                    print(f'{payload:<12} {provider:<8} {sent:<9} {len(data):>11,} '
+                          f'{identity_size / len(data):>5.1f}x {cpu * 1000:>8.2f} ms {wall * 1000:>8.2f} ms')
+            with app.app_context():
+                db.engine.dispose()
+
+        print(f'\n{"payload":<12} {"step":<16} {"cpu":>11}')
+        for payload, data in bodies.items():
+            if payload == 'export':
+                continue  # NDJSON isn't one document; its rows are encoded one by one
+            for provider in providers:
+                config.JSON_PROVIDER = provider
+                app = create_app(config)
+                with app.app_context():
+                    obj = app.json.loads(data)
+                    cpu, _, _ = measure(lambda: app.json.response(obj), args.requests)
+                    db.engine.dispose()
+                print(f'{payload:<12} {"encode " + provider:<16} {cpu * 1000:>8.2f} ms')
+            for encoding in reversed(ENCODINGS):
+                cpu, _, _ = measure(lambda: compress(data, encoding), args.requests)
+                print(f'{payload:<12} {"compress " + encoding:<16} {cpu * 1000:>8.2f} ms')
+
+
+if __name__ == '__main__':
+    main()
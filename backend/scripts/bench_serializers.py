@@ -0,0 +1,105 @@
+"""Micro-benchmark: marshmallow list dumps vs the compiled serializers.
+
+Seeds a scratch SQLite database with the synthetic dataset, loads each list once and times only the
+serialization step. Also checks that the compiled output is identical to
+marshmallow's (same JSON bytes, same key order), exiting non-zero if not.
+Run from the backend directory:
+
+    python scripts/bench_serializers.py            # 10k and 100k users
+    python scripts/bench_serializers.py 5000       # custom sizes
+"""
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from sqlalchemy.orm import joinedload
+
+from app.extensions import db
+from app.models import User, Connection, GroupActivity, ActivityInvite
+from app.schemas.user_schema import users_schema, user_serializer
+from app.schemas.connection_schema import connections_schema, connection_serializer
+from app.schemas.activity_schema import (
+    activities_schema, invites_schema, activity_serializer, invite_serializer
+)
+
+from _common import scratch_app
+from synthetic_data import generate
+
+
+def best_of(func, repeat=3):
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def same_bytes(a, b):
+    return json.dumps(a) == json.dumps(b)
+
+
+def bench():
+    cases = {
+        'users': (
+            lambda: User.query.all(),
+            users_schema, user_serializer,
+            lambda: user_serializer.select_from(User.query).all(),
+        ),
+        'connections': (
+            lambda: Connection.query.options(
+                joinedload(Connection.professional), joinedload(Connection.client)).all(),
+            connections_schema, connection_serializer,
+            lambda: connection_serializer.select_from(Connection.query).all(),
+        ),
+        'activities': (
+            lambda: GroupActivity.query.options(joinedload(GroupActivity.creator)).all(),
+            activities_schema, activity_serializer,
+            lambda: activity_serializer.select_from(GroupActivity.query).all(),
+        ),
+        'invites': (
+            lambda: ActivityInvite.query.options(
+                joinedload(ActivityInvite.activity).joinedload(GroupActivity.creator),
+                joinedload(ActivityInvite.client)).all(),
+            invites_schema, invite_serializer,
+            lambda: invite_serializer.select_from(ActivityInvite.query).all(),
+        ),
+    }
+    mismatches = 0
+    for name, (load_objs, schema, serializer, load_rows) in cases.items():
+        objs = load_objs()
+        rows = load_rows()
+        t_ma, expected = best_of(lambda: schema.dump(objs))
+        t_obj, from_objs = best_of(lambda: serializer.dump_many(objs))
+        t_row, from_rows = best_of(lambda: serializer.dump_rows(rows))
+        identical = same_bytes(expected, from_objs) and same_bytes(expected, from_rows)
+        mismatches += not identical
+        n = len(objs)
+        print(f'{name:<12} {n:>7} rows  '
+              f'marshmallow {n / t_ma:>10,.0f}/s  '
+              f'compiled(obj) {n / t_obj:>10,.0f}/s ({t_ma / t_obj:4.1f}x)  '
+              f'compiled(row) {n / t_row:>10,.0f}/s ({t_ma / t_row:4.1f}x)  '
+              f'{"identical" if identical else "MISMATCH"}')
+        db.session.expunge_all()
+    return mismatches
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10_000, 100_000]
+    mismatches = 0
+    for n in sizes:
+        with scratch_app('serializers') as app:
+            with app.app_context():
+                generate(n)
+                mismatches += bench()
+                db.session.remove()
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
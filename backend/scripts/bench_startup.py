@@ -0,0 +1,177 @@
+"""Benchmark cold start: import time, app creation and the first requests.
+
+Every measurement runs in a fresh interpreter against a scratch SQLite
+database with a small synthetic dataset, and reports the median of --runs
+runs (after one discarded run that writes the .pyc files):
+
+* ``import_ms``: ``import app``
+* ``create_app_ms``: create_app()
+* ``first_health_ms``: the first GET /api/health/ through the test client
+* ``first_list_ms``: then the first GET /api/users, which builds the schemas
+* ``process_ms``: the whole process, interpreter start to first list
+* ``cli_stats_check_ms`` and ``cli_db_current_ms``: ``flask stats check``
+  and ``flask db current``, as wall time of the whole command
+
+It also checks that create_app leaves Alembic and marshmallow unimported
+(they load in ``flask db`` and on first use). Results are written as JSON.
+With --compare it exits non-zero if any timing grew by more than
+--tolerance (a fraction) and by more than --min-delta-ms over an earlier
+run. The second bound keeps timer noise on fast steps from failing it.
+Run from the backend directory:
+
+    python scripts/bench_startup.py --out before.json
+    # ...change something...
+    python scripts/bench_startup.py --out after.json --compare before.json
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+BACKEND = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+# Modules create_app must not import; they load on first use
+DEFERRED = ('alembic', 'flask_migrate', 'marshmallow', 'flask_marshmallow')
+
+CHILD = """
+import json, sys, time
+t0 = time.perf_counter()
+import app
+t1 = time.perf_counter()
+flask_app = app.create_app()
+t2 = time.perf_counter()
+loaded = [name for name in {deferred!r} if name in sys.modules]
+client = flask_app.test_client()
+assert client.get('/api/health/').status_code == 200
+t3 = time.perf_counter()
+assert client.get('/api/users').status_code == 200
+t4 = time.perf_counter()
+print(json.dumps({{
+    'import_ms': (t1 - t0) * 1000, 'create_app_ms': (t2 - t1) * 1000,
+    'first_health_ms': (t3 - t2) * 1000, 'first_list_ms': (t4 - t3) * 1000,
+    'deferred_loaded': loaded,
+}}))
+"""
+
+
+def run(command, env):
+    started = time.perf_counter()
+    result = subprocess.run(command, cwd=BACKEND, env=env, capture_output=True, text=True)
+    elapsed = (time.perf_counter() - started) * 1000
+    if result.returncode:
+        sys.exit(f'{" ".join(command)} failed:\n{result.stderr[-2000:]}')
+    return elapsed, result.stdout
+
+
+def seed(path, users):
+    from app import create_app
+    from app.extensions import db
+    from _common import scratch_config
+    from synthetic_data import generate
+
+    app = create_app(scratch_config(path))
+    with app.app_context():
+        db.create_all()
+        generate(users)
+        db.engine.dispose()
+
+
+def measure(runs, env):
+    child = [sys.executable, '-c', CHILD.format(deferred=DEFERRED)]
+    flask = [sys.executable, '-m', 'flask', '--app', 'app']
+    samples = {}
+    loaded = set()
+    for i in range(runs + 1):
+        elapsed, stdout = run(child, env)
+        timings = json.loads(stdout.strip().splitlines()[-1])
+        loaded.update(timings.pop('deferred_loaded'))
+        timings['process_ms'] = elapsed
+        timings['cli_stats_check_ms'] = run(flask + ['stats', 'check'], env)[0]
+        timings['cli_db_current_ms'] = run(flask + ['db', 'current'], env)[0]
+        if i == 0:
+            continue  # compiles the .pyc files
+        for name, value in timings.items():
+            samples.setdefault(name, []).append(value)
+    return {name: round(statistics.median(values), 1) for name, values in samples.items()}, sorted(loaded)
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=BACKEND, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(timings, baseline_path, tolerance, min_delta_ms):
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    print(f'\nchange vs {baseline_path} ({baseline["meta"].get("commit")}):')
+    regressions = 0
+    for name, value in timings.items():
+        before = baseline['timings'].get(name)
+        if before is None:
+            print(f'{name:<22} {"new":>9}')
+            continue
+        regressed = value > before * (1 + tolerance) and value - before > min_delta_ms
+        regressions += regressed
+        print(f'{name:<22} {before:>9.1f} -> {value:<9.1f} {(value - before) / before * 100:>+6.0f}%'
+              f'{"  REGRESSION" if regressed else ""}')
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--users', type=int, default=1000, help='synthetic dataset size')
+    parser.add_argument('--out', default='startup_results.json')
+    parser.add_argument('--compare', help='earlier results file to diff against')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed slowdown, as a fraction')
+    parser.add_argument('--min-delta-ms', type=float, default=20, help='ignore slowdowns smaller than this')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    path = os.path.join(workdir, 'startup.db')
+    try:
+        seed(path, args.users)
+        env = dict(os.environ, DATABASE_URL='sqlite:///' + path)
+        # Stray settings from the shell would skew the comparison
+        env.pop('PROMETHEUS_MULTIPROC_DIR', None)
+        timings, loaded = measure(args.runs, env)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    results = {
+        'meta': {
+            'commit': git_commit(),
+            'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'args': vars(args),
+        },
+        'timings': timings,
+        'deferred_loaded': loaded,
+    }
+    with open(args.out, 'w') as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+
+    for name, value in timings.items():
+        print(f'{name:<22} {value:>9.1f} ms')
+    print(f'\nresults written to {args.out}')
+    if loaded:
+        print(f'create_app imported {", ".join(loaded)}, which should load on first use')
+
+    regressions = compare(timings, args.compare, args.tolerance, args.min_delta_ms) if args.compare else 0
+    if loaded or regressions:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,421 @@
+"""Benchmark every API route in-process against a synthetic dataset.
+
+Builds a scratch SQLite database with scripts/synthetic_data.py at the
+requested scale (or copies one generated earlier with --db), then drives
+the app through the Flask test client with a set of traffic mixes:
+
+* login_burst        concurrent logins, then token refresh and logout
+* dashboard_polling  clients and professionals polling their lists, with
+                     If-None-Match after the first poll
+* directory_paging   walking the user directory by cursor, plus one NDJSON
+                     export
+* user_search        typeahead searches by email prefix and substring, with
+                     and without a role filter
+* recommendations    clients asking for recommended professionals (the
+                     first request loads the connection graph)
+* signup_and_connect new users signing up, requesting/inviting connections,
+                     responding singly and in batches, disconnecting
+* bulk_invites       activities created, bulk and single invites, responses,
+                     deletes
+* health             the health and stats endpoints
+
+Per route it reports p50/p95/p99 latency, throughput and SQL statements
+per request. Results are written as JSON, and --compare prints the
+change against an earlier run, so regressions can be diffed between
+commits. The server-sent events stream is the only route left out,
+because it never finishes. Run from the backend directory:
+
+    python scripts/bench_suite.py                            # 1k users
+    python scripts/bench_suite.py --users 100000 --out after.json --compare before.json
+    python scripts/synthetic_data.py 1000000 big.db && python scripts/bench_suite.py --db big.db
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from sqlalchemy import event, func
+
+from app import create_app
+from app.extensions import db
+from app.models import User, Connection, ActivityInvite
+
+from _common import access_token, percentile, scratch_config, scratch_db
+from synthetic_data import PASSWORD, generate
+
+
+class Recorder:
+    """Times requests and counts the SQL statements each one runs."""
+
+    def __init__(self, app):
+        self.app = app
+        self.adapter = app.url_map.bind('localhost')
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.samples = defaultdict(list)
+        self.unexpected = defaultdict(list)
+        with app.app_context():
+            for engine in db.engines.values():
+                event.listen(engine, 'before_cursor_execute', self.count_statement)
+
+    def count_statement(self, conn, cursor, statement, parameters, context, executemany):
+        self.local.statements = getattr(self.local, 'statements', 0) + 1
+
+    def client(self):
+        if not hasattr(self.local, 'client'):
+            self.local.client = self.app.test_client()
+        return self.local.client
+
+    def route(self, method, path):
+        endpoint, _ = self.adapter.match(path.split('?')[0], method)
+        return f'{method} {endpoint}'
+
+    def call(self, scenario, method, path, token=None, expect=(200,), headers=None, **kwargs):
+        headers = dict(headers or {})
+        if token:
+            headers['Authorization'] = 'Bearer ' + token
+        self.local.statements = 0
+        t0 = time.perf_counter()
+        response = self.client().open(path, method=method, headers=headers, **kwargs)
+        body = response.get_data()  # drains streamed responses too
+        elapsed = time.perf_counter() - t0
+        key = self.route(method, path)
+        with self.lock:
+            self.samples[key].append((scenario, elapsed, self.local.statements, response.status_code))
+            if response.status_code not in expect:
+                self.unexpected[key].append(f'{response.status_code} {body[:200]!r}')
+        return response
+
+
+def summarize(samples):
+    latencies = sorted(elapsed for _, elapsed, _, _ in samples)
+    statements = [count for _, _, count, _ in samples]
+    statuses = defaultdict(int)
+    for _, _, _, status in samples:
+        statuses[str(status)] += 1
+    total = sum(latencies)
+    return {
+        'requests': len(samples),
+        'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 3),
+        'mean_ms': round(total * 1000 / len(latencies), 3),
+        # Requests per second of time spent in this route
+        'throughput_rps': round(len(latencies) / total, 1) if total else None,
+        'statements_avg': round(sum(statements) / len(statements), 2),
+        'statements_max': max(statements),
+        'statuses': dict(statuses),
+    }
+
+
+# Scenarios. Each gets the recorder, a seeded Random and the dataset
+# fixture built by load_fixture(), and issues its requests through rec.call.
+
+def login_burst(rec, rng, fx, args):
+    emails = [rng.choice(fx['pro_emails'] + fx['client_emails']) for _ in range(args.burst)]
+
+    def login(email):
+        # 503 is the hashing pool shedding load, which is expected in a burst
+        response = rec.call('login_burst', 'POST', '/api/auth/login',
+                            json={'email': email, 'password': PASSWORD}, expect=(200, 503))
+        return response.get_json().get('refresh_token') if response.status_code == 200 else None
+
+    with ThreadPoolExecutor(max_workers=args.threads) as pool:
+        refresh_tokens = [token for token in pool.map(login, emails) if token]
+    for i, refresh_token in enumerate(refresh_tokens):
+        response = rec.call('login_burst', 'POST', '/api/auth/refresh', token=refresh_token)
+        if i % 2 == 0:
+            rec.call('login_burst', 'POST', '/api/auth/logout', token=response.get_json()['refresh_token'])
+
+
+def dashboard_polling(rec, rng, fx, args):
+    users = rng.sample(fx['users'], min(args.pollers, len(fx['users'])))
+    paths = ['/api/connection/list', '/api/activities/list', '/api/users?limit=50']
+    etags = {}
+    for _ in range(args.polls):
+        for user in users:
+            for path in paths:
+                cached = etags.get((user['id'], path))
+                response = rec.call('dashboard_polling', 'GET', path, token=user['token'], expect=(200, 304),
+                                    headers={'If-None-Match': cached} if cached else None)
+                etags[(user['id'], path)] = response.headers.get('ETag')
+
+
+def directory_paging(rec, rng, fx, args):
+    cursor = None
+    for _ in range(args.pages):
+        path = '/api/users?role=client&limit=500' + (f'&cursor={cursor}' if cursor else '')
+        cursor = rec.call('directory_paging', 'GET', path).get_json()['next_cursor']
+        if cursor is None:
+            break
+    rec.call('directory_paging', 'GET', '/api/users?role=professional&format=ndjson')
+
+
+def user_search(rec, rng, fx, args):
+    for _ in range(20):
+        email = rng.choice(fx['pro_emails'] + fx['client_emails'])
+        local = email.split('@')[0]
+        # Typeahead: one request per keystroke, then a substring from the middle
+        for length in range(1, min(len(local), 6) + 1):
+            rec.call('user_search', 'GET', f'/api/users/search?q={local[:length]}')
+        rec.call('user_search', 'GET', f'/api/users/search?q={local[2:5]}&role=professional')
+
+
+def recommendations(rec, rng, fx, args):
+    for client in rng.sample(fx['clients'], min(100, len(fx['clients']))):
+        rec.call('recommendations', 'GET', '/api/users/recommendations', token=client['token'])
+
+
+def signup_and_connect(rec, rng, fx, args):
+    tag = f'{time.time_ns()}'
+    new_clients = []
+    for i in range(args.signups):
+        response = rec.call('signup_and_connect', 'POST', '/api/auth/signup', expect=(201,), json={
+            'name': f'Bench client {i}', 'email': f'bench{tag}-{i}@example.com',
+            'password': PASSWORD, 'role': 'client'})
+        body = response.get_json()
+        new_clients.append({'id': body['user']['id'], 'email': body['user']['email'], 'token': body['token']})
+
+    pro = rng.choice(fx['pros'])
+    half = len(new_clients) // 2
+    # First half asks the professional; they answer one by one
+    requested = []
+    for client in new_clients[:half]:
+        response = rec.call('signup_and_connect', 'POST', '/api/connection/request-pro', token=client['token'],
+                            expect=(201,), json={'professional_id': pro['id']})
+        requested.append(response.get_json()['connection']['id'])
+    for connection_id in requested:
+        rec.call('signup_and_connect', 'POST', '/api/connection/respond', token=pro['token'],
+                 json={'connection_id': connection_id, 'action': rng.choice(('accept', 'reject'))})
+    # Second half is invited by the professional and accepts in one batch each
+    for client in new_clients[half:]:
+        response = rec.call('signup_and_connect', 'POST', '/api/connection/invite-client', token=pro['token'],
+                            expect=(201,), json={'client_email': client['email']})
+        connection_id = response.get_json()['connection']['id']
+        rec.call('signup_and_connect', 'POST', '/api/connection/batch', token=client['token'],
+                 json={'items': [{'connection_id': connection_id, 'action': 'accept'}]})
+    # Clean up: some single disconnects, the rest in one batch
+    for connection_id in requested[:2]:
+        rec.call('signup_and_connect', 'DELETE', f'/api/connection/{connection_id}', token=pro['token'])
+    if requested[2:]:
+        rec.call('signup_and_connect', 'POST', '/api/connection/batch', token=pro['token'],
+                 json={'items': [{'connection_id': connection_id, 'action': 'remove'}
+                                 for connection_id in requested[2:]]})
+
+
+def bulk_invites(rec, rng, fx, args):
+    for pro in rng.sample(fx['pros'], min(args.activities, len(fx['pros']))):
+        response = rec.call('bulk_invites', 'POST', '/api/activities/', token=pro['token'], expect=(201,),
+                            json={'title': 'Benchmark session', 'description': 'Synthetic load'})
+        activity_id = response.get_json()['activity']['id']
+        clients = fx['clients_of'].get(pro['id'], [])
+        if not clients:
+            continue
+        bulk, single = clients[:args.bulk_size], clients[args.bulk_size:args.bulk_size + 1]
+        response = rec.call('bulk_invites', 'POST', '/api/activities/invite/bulk', token=pro['token'],
+                            json={'activity_id': activity_id, 'client_ids': [c['id'] for c in bulk]})
+        invites = {result['client_id']: result['invite_id'] for result in response.get_json()['results']}
+        for client in single:
+            rec.call('bulk_invites', 'POST', '/api/activities/invite', token=pro['token'], expect=(201,),
+                     json={'activity_id': activity_id, 'client_id': client['id']})
+        for client in bulk[:5]:
+            rec.call('bulk_invites', 'POST', '/api/activities/respond', token=client['token'],
+                     json={'invite_id': invites[client['id']], 'action': rng.choice(('accept', 'decline'))})
+        for client in bulk[5:10]:
+            rec.call('bulk_invites', 'POST', '/api/activities/respond/batch', token=client['token'],
+                     json={'items': [{'invite_id': invites[client['id']], 'action': 'accept'}]})
+        rec.call('bulk_invites', 'DELETE', f'/api/activities/{activity_id}', token=pro['token'])
+
+
+def health(rec, rng, fx, args):
+    for _ in range(10):
+        for path in ('/api/health/', '/api/health/hashing', '/api/health/db'):
+            rec.call('health', 'GET', path)
+
+
+SCENARIOS = {
+    'login_burst': login_burst,
+    'dashboard_polling': dashboard_polling,
+    'directory_paging': directory_paging,
+    'user_search': user_search,
+    'recommendations': recommendations,
+    'signup_and_connect': signup_and_connect,
+    'bulk_invites': bulk_invites,
+    'health': health,
+}
+
+
+def load_fixture(app, rng, sample_size=200):
+    """Pick the users the scenarios act as and mint their tokens."""
+    def with_token(user_id, role):
+        return {'id': user_id, 'token': access_token(user_id, role)}
+
+    with app.app_context():
+        n_users = db.session.query(func.max(User.id)).scalar()
+        pro_ids = [user_id for user_id, in db.session.query(User.id).filter_by(role='professional')
+                   .order_by(User.id).limit(sample_size)]
+        client_ids = [user_id for user_id, in db.session.query(User.id).filter_by(role='client')
+                      .order_by(func.random()).limit(sample_size)]
+        clients_of = defaultdict(list)
+        rows = (db.session.query(Connection.professional_id, Connection.client_id)
+                .filter(Connection.professional_id.in_(pro_ids), Connection.status == 'accepted')
+                .order_by(Connection.id))
+        for pro_id, client_id in rows:
+            clients_of[pro_id].append(with_token(client_id, 'client'))
+        pros = [with_token(pro_id, 'professional') for pro_id in pro_ids]
+        clients = [with_token(client_id, 'client') for client_id in client_ids]
+        emails = dict(db.session.query(User.id, User.email).filter(User.id.in_(pro_ids + client_ids)))
+        invites = db.session.query(func.count(ActivityInvite.id)).scalar()
+    rng.shuffle(pros)
+    return {
+        'n_users': n_users,
+        'n_invites': invites,
+        'pros': pros,
+        'clients': clients,
+        'users': pros[:len(pros) // 4] + clients,
+        'clients_of': clients_of,
+        'pro_emails': [emails[pro['id']] for pro in pros],
+        'client_emails': [emails[client['id']] for client in clients],
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(__file__), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_routes(routes):
+    print(f'{"route":<52} {"n":>6} {"p50 ms":>8} {"p95 ms":>8} {"p99 ms":>8} {"req/s":>8} {"stmts":>6}')
+    for key, stats in sorted(routes.items()):
+        print(f'{key:<52} {stats["requests"]:>6} {stats["p50_ms"]:>8.2f} {stats["p95_ms"]:>8.2f} '
+              f'{stats["p99_ms"]:>8.2f} {stats["throughput_rps"] or 0:>8.0f} {stats["statements_avg"]:>6.1f}')
+
+
+def compare(routes, baseline_path):
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    print(f'\nchange vs {baseline_path} ({baseline["meta"].get("commit")}, '
+          f'{baseline["meta"]["users"]:,} users):')
+    print(f'{"route":<52} {"p50":>9} {"p95":>9} {"stmts":>13}')
+    regressions = 0
+    for key, stats in sorted(routes.items()):
+        before = baseline['routes'].get(key)
+        if before is None:
+            print(f'{key:<52} {"new":>9}')
+            continue
+
+        def change(field):
+            return (stats[field] - before[field]) / before[field] * 100 if before[field] else 0.0
+
+        more_statements = stats['statements_max'] > before['statements_max']
+        regressions += more_statements
+        print(f'{key:<52} {change("p50_ms"):>+8.0f}% {change("p95_ms"):>+8.0f}% '
+              f'{before["statements_avg"]:>5.1f} -> {stats["statements_avg"]:<5.1f}'
+              f'{"  MORE STATEMENTS" if more_statements else ""}')
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=1000, help='synthetic dataset size')
+    parser.add_argument('--db', help='copy this generated database instead of generating one')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS), help='comma-separated subset')
+    parser.add_argument('--out', default='bench_results.json')
+    parser.add_argument('--compare', help='earlier results file to diff against')
+    parser.add_argument('--burst', type=int, default=32, help='logins per burst')
+    parser.add_argument('--threads', type=int, default=8, help='concurrent logins')
+    parser.add_argument('--pollers', type=int, default=50)
+    parser.add_argument('--polls', type=int, default=5)
+    parser.add_argument('--pages', type=int, default=20)
+    parser.add_argument('--signups', type=int, default=10)
+    parser.add_argument('--activities', type=int, default=10)
+    parser.add_argument('--bulk-size', type=int, default=200)
+    args = parser.parse_args()
+    names = [name.strip() for name in args.scenarios.split(',') if name.strip()]
+    unknown = set(names) - set(SCENARIOS)
+    if unknown:
+        parser.error(f'unknown scenarios: {", ".join(sorted(unknown))}')
+
+    with scratch_db('bench') as path:
+        t0 = time.perf_counter()
+        if args.db:
+            shutil.copyfile(args.db, path)
+        # The login bursts all come from one address
+        app = create_app(scratch_config(path, RATELIMIT_ENABLED=False))
+        with app.app_context():
+            if not args.db:
+                db.create_all()
+                generate(args.users, seed=args.seed)
+            db.session.remove()
+        setup_seconds = time.perf_counter() - t0
+
+        rng = random.Random(args.seed)
+        fixture = load_fixture(app, rng)
+        rec = Recorder(app)
+        scenarios = {}
+        # The routes' debug prints would dominate the timings in a terminal
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            for name in names:
+                t0 = time.perf_counter()
+                before = sum(len(samples) for samples in rec.samples.values())
+                SCENARIOS[name](rec, rng, fixture, args)
+                elapsed = time.perf_counter() - t0
+                requests = sum(len(samples) for samples in rec.samples.values()) - before
+                scenarios[name] = {'requests': requests, 'seconds': round(elapsed, 3),
+                                   'throughput_rps': round(requests / elapsed, 1)}
+        with app.app_context():
+            db.engine.dispose()
+
+    routes = {key: summarize(samples) for key, samples in rec.samples.items()}
+    results = {
+        'meta': {
+            'commit': git_commit(),
+            'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'users': fixture['n_users'],
+            'invites': fixture['n_invites'],
+            'setup_seconds': round(setup_seconds, 1),
+            'args': vars(args),
+        },
+        'scenarios': scenarios,
+        'routes': routes,
+        'unexpected': {key: values[:5] for key, values in rec.unexpected.items()},
+    }
+    with open(args.out, 'w') as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+
+    print(f'{fixture["n_users"]:,} users, setup {setup_seconds:.1f}s')
+    for name, stats in scenarios.items():
+        print(f'{name:<20} {stats["requests"]:>6} requests in {stats["seconds"]:>7.2f}s '
+              f'({stats["throughput_rps"]:,.0f} req/s)')
+    print()
+    print_routes(routes)
+    print(f'\nresults written to {args.out}')
+
+    regressions = compare(routes, args.compare) if args.compare else 0
+    for key, values in rec.unexpected.items():
+        print(f'UNEXPECTED {key}: {len(values)} response(s), e.g. {values[0]}')
+    if rec.unexpected or regressions:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,196 @@
+"""Check that the ASGI mode's native list handlers behave like the Flask views.
+
+Calls the ASGI app in-process (no server) on a scratch SQLite primary and
+two replicas (see check_replica_routing.py for how they lag), and checks
+that the native GET /api/users, /api/connection/list and
+/api/activities/list:
+
+* return the same status and body as the Flask views
+* count in the Prometheus request and SQL metrics under the Flask labels
+* echo a valid X-Request-ID, or assign one, and log with it
+* read from a replica, and from the primary while the replica lags
+  behind a write that affects the caller
+
+Exits non-zero if any check fails. Run from the backend directory:
+
+    python scripts/check_asgi_native.py
+"""
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import sys
+from collections import Counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from prometheus_client import REGISTRY
+from sqlalchemy import event
+
+from app.asgi import create_asgi_app
+from app.extensions import db
+from app.models import GroupActivity, User
+
+from _common import access_token, check, exit_on_failures, scratch_config, scratch_db
+
+
+class RecordCollector(logging.Handler):
+
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+def replicate(primary, replicas):
+    source = sqlite3.connect(primary)
+    for replica in replicas:
+        target = sqlite3.connect(replica)
+        source.backup(target)
+        target.close()
+    source.close()
+
+
+async def call(app, path, token=None, headers=None):
+    """GET ``path`` from the ASGI app; returns (status, headers, body)."""
+    headers = dict(headers or {})
+    if token:
+        headers['Authorization'] = 'Bearer ' + token
+    path, _, query = path.partition('?')
+    scope = {
+        'type': 'http', 'method': 'GET', 'scheme': 'http', 'http_version': '1.1', 'root_path': '',
+        'path': path, 'raw_path': path.encode(), 'query_string': query.encode(),
+        'headers': [(key.lower().encode('latin-1'), value.encode('latin-1')) for key, value in headers.items()],
+        'client': ('127.0.0.1', 50000), 'server': ('127.0.0.1', 8000),
+    }
+    messages = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        messages.append(message)
+
+    await app(scope, receive, send)
+    start = messages[0]
+    response_headers = {key.decode('latin-1').lower(): value.decode('latin-1') for key, value in start['headers']}
+    return start['status'], response_headers, b''.join(message.get('body', b'') for message in messages[1:])
+
+
+def sample(name, endpoint, **labels):
+    return REGISTRY.get_sample_value(name, dict(blueprint=endpoint.split('.')[0], endpoint=endpoint, **labels)) or 0
+
+
+def main():
+    with scratch_db('primary') as primary, scratch_db('replica1') as replica1, scratch_db('replica2') as replica2:
+        asyncio.run(run(primary, [replica1, replica2]))
+    exit_on_failures()
+
+
+async def run(primary, replicas):
+    config = scratch_config(primary, SQLALCHEMY_REPLICA_URIS=['sqlite:///' + path for path in replicas],
+                            RATELIMIT_ENABLED=False, COMPRESS_ENABLED=False,
+                            LOG_LEVELS={'app.routes.user_routes': 'DEBUG'})
+    app = create_asgi_app(config)
+    flask_app = app.flask_app
+    try:
+        with flask_app.app_context():
+            db.create_all()
+            pro = User(name='Pro', email='pro@example.com', password_hash='x', role='professional')
+            client = User(name='Client', email='client@example.com', password_hash='x', role='client')
+            db.session.add_all([pro, client])
+            db.session.flush()
+            db.session.add(GroupActivity(title='Group walk', description='', created_by=pro.id))
+            db.session.commit()
+            pro_token = access_token(pro.id, 'professional')
+            client_token = access_token(client.id, 'client')
+            for engine in db.engines.values():
+                engine.dispose()
+        replicate(primary, replicas)
+        http = flask_app.test_client()
+
+        paths = [('/api/users?limit=1', None), ('/api/connection/list', pro_token),
+                 ('/api/activities/list', pro_token), ('/api/activities/list', client_token)]
+        for path, token in paths:
+            status, _, body = await call(app, path, token)
+            expected = http.get(path, headers={'Authorization': 'Bearer ' + token} if token else {})
+            check(f'{path} matches the Flask view', (status, body) == (expected.status_code, expected.data),
+                  f'{status} {body[:200]!r} vs {expected.status_code} {expected.data[:200]!r}')
+
+        endpoint = 'connection.list_connections'
+        counted = {
+            'http_requests_total': {'method': 'GET', 'status': '200'},
+            'http_request_duration_seconds_count': {'method': 'GET'},
+            'http_response_size_bytes_count': {},
+            'db_statements_per_request_count': {},
+            'db_statements_per_request_sum': {},
+        }
+        before = {name: sample(name, endpoint, **labels) for name, labels in counted.items()}
+        await call(app, '/api/connection/list', pro_token)
+        grew = {name: sample(name, endpoint, **labels) - before[name] for name, labels in counted.items()}
+        statements = grew.pop('db_statements_per_request_sum')
+        check('a native request counts in the request metrics', set(grew.values()) == {1}, str(grew))
+        check('  and its SQL statements are counted', statements >= 2, str(statements))
+
+        collector = RecordCollector()
+        logging.getLogger('app').addHandler(collector)
+        try:
+            _, headers, _ = await call(app, '/api/users', headers={'X-Request-ID': 'check-asgi-1'})
+            check('an incoming X-Request-ID is echoed', headers.get('x-request-id') == 'check-asgi-1', str(headers))
+            lines = [record for record in collector.records if record.getMessage() == 'list_users']
+            check('  and the handler logs with it',
+                  [record.request_id for record in lines] == ['check-asgi-1'],
+                  str([vars(record) for record in lines]))
+            _, headers, _ = await call(app, '/api/users', headers={'X-Request-ID': 'not valid!'})
+            check('an invalid one is replaced', len(headers.get('x-request-id', '')) == 32, str(headers))
+        finally:
+            logging.getLogger('app').removeHandler(collector)
+
+        used = Counter()
+        names = {engine.sync_engine: key or 'primary' for key, engine in app.engines.items()}
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            used[names[conn.engine]] += 1
+
+        for engine in names:
+            event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+
+        async def routed(path, token):
+            used.clear()
+            status, _, body = await call(app, path, token)
+            return status, json.loads(body), dict(used)
+
+        _, _, first = await routed('/api/users', pro_token)
+        _, _, second = await routed('/api/users', pro_token)
+        check('native GETs read from the replicas, round-robin',
+              first.get('primary') == 1 and set(first) - {'primary'} != set(second) - {'primary'}
+              and all(len(engines) == 2 for engines in (first, second)), f'{first} {second}')
+
+        response = http.post('/api/connection/invite-client', json={'client_email': 'client@example.com'},
+                             headers={'Authorization': 'Bearer ' + pro_token})
+        assert response.status_code == 201, response.get_data(as_text=True)
+        for _ in replicas:
+            status, body, engines = await routed('/api/connection/list', client_token)
+            check('lagging replica: the invited client still sees the request',
+                  status == 200 and len(body) == 1, str(body))
+            check('  and the list itself came from the primary', engines.get('primary', 0) >= 2, str(engines))
+
+        replicate(primary, replicas)
+        status, body, engines = await routed('/api/connection/list', client_token)
+        check('caught-up replica serves the list again',
+              status == 200 and len(body) == 1 and engines.get('primary') == 1
+              and sum(engines.values()) == 3, str(engines))
+    finally:
+        for engine in app.engines.values():
+            await engine.dispose()
+        app.wsgi.executor.shutdown()
+        with flask_app.app_context():
+            for engine in db.engines.values():
+                engine.dispose()
+
+
+if __name__ == '__main__':
+    main()
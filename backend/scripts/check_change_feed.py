@@ -0,0 +1,170 @@
+"""Check that the change feed reaches streams in other worker processes.
+
+Against a scratch SQLite database, using the ``local`` (default) or the
+``sql`` events backend, a professional's GET /api/events stream:
+
+* gets the event for a request made in the same process
+* gets the event for a request made by another worker process (with the
+  local backend it can't, and doesn't)
+* after a reconnect with Last-Event-ID, replays what it missed, the other
+  process's event included with the sql backend
+* leaves no subscriber behind once closed, and the sql backend's poller
+  stops when the last one goes
+
+Exits non-zero if any check fails. Run from the backend directory:
+
+    python scripts/check_change_feed.py
+    python scripts/check_change_feed.py sql
+"""
+import argparse
+import multiprocessing
+import os
+import queue
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app import create_app
+from app.extensions import db, events
+from app.models import User
+
+from _common import access_token, check, exit_on_failures, scratch_config, scratch_db
+
+
+BACKENDS = {
+    'local': 'app.events:LocalEventBackend',
+    'sql': 'app.events:SQLEventBackend',
+}
+
+POLL_SECONDS = 0.2
+
+
+class Stream:
+    """GET /api/events in a thread, like a server's, parsing events into a queue."""
+
+    def __init__(self, app, token, last_event_id=None):
+        self.headers = {'Authorization': 'Bearer ' + token}
+        if last_event_id is not None:
+            self.headers['Last-Event-ID'] = str(last_event_id)
+        self.app = app
+        self.events = queue.Queue()
+        self.stopping = False
+        self.thread = threading.Thread(target=self.read, daemon=True)
+        self.thread.start()
+
+    def read(self):
+        # The request and the reads run in this thread, since the stream's
+        # request context lives in the thread that started it
+        response = self.app.test_client().get('/api/events', headers=self.headers, buffered=False)
+        pending = ''
+        try:
+            # Keep-alives arrive every EVENTS_HEARTBEAT_SECONDS, so this
+            # gets to check self.stopping
+            for chunk in response.iter_encoded():
+                pending += chunk.decode()
+                while '\n\n' in pending:
+                    block, pending = pending.split('\n\n', 1)
+                    fields = dict(line.split(': ', 1) for line in block.split('\n')
+                                  if ': ' in line and not line.startswith(':'))
+                    if 'event' in fields:
+                        self.events.put(fields)
+                if self.stopping:
+                    break
+        finally:
+            response.close()
+
+    def next(self, timeout):
+        try:
+            return self.events.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self.stopping = True
+        self.thread.join()
+
+
+def config(path, backend):
+    return scratch_config(path, EVENTS_BACKEND=BACKENDS[backend], EVENTS_POLL_SECONDS=POLL_SECONDS,
+                          EVENTS_HEARTBEAT_SECONDS=0.1, RATELIMIT_ENABLED=False)
+
+
+def request_pro(app, client_id, professional_id):
+    with app.app_context():
+        token = access_token(client_id, 'client')
+    response = app.test_client().post('/api/connection/request-pro', json={'professional_id': professional_id},
+                                      headers={'Authorization': 'Bearer ' + token})
+    assert response.status_code == 201, response.get_data(as_text=True)
+
+
+def other_worker(path, backend, client_id, professional_id):
+    """Another 'worker process' on the same database makes a request."""
+    request_pro(create_app(config(path, backend)), client_id, professional_id)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('backend', nargs='?', choices=list(BACKENDS), default='local')
+    args = parser.parse_args()
+    with scratch_db('events') as path:
+        run(path, args.backend)
+    exit_on_failures()
+
+
+def run(path, backend):
+    app = create_app(config(path, backend))
+    try:
+        with app.app_context():
+            db.create_all()
+            pro = User(name='Pro', email='pro@example.com', password_hash='x', role='professional')
+            clients = [User(name=f'Client {i}', email=f'client{i}@example.com', password_hash='x', role='client')
+                       for i in range(2)]
+            db.session.add_all([pro, *clients])
+            db.session.commit()
+            pro_id, client_ids = pro.id, [client.id for client in clients]
+            pro_token = access_token(pro_id, 'professional')
+        stream = Stream(app, pro_token)
+        # The stream subscribes when it starts; wait for that, since a
+        # request published before it is only replayable
+        deadline = time.monotonic() + 5
+        while not events.backend.subscribers and time.monotonic() < deadline:
+            time.sleep(0.01)
+        request_pro(app, client_ids[0], pro_id)
+        first = stream.next(timeout=5)
+        check('an event from this process reaches the stream',
+              first is not None and first['event'] == 'connection.created', str(first))
+
+        with multiprocessing.get_context('spawn').Pool(1) as pool:
+            pool.apply(other_worker, (path, backend, client_ids[1], pro_id))
+        second = stream.next(timeout=5)
+        if backend == 'sql':
+            check('an event from another worker process reaches the stream',
+                  second is not None and second['event'] == 'connection.created'
+                  and int(second['id']) > int(first['id']), str(second))
+        else:
+            check('an event from another worker process does not reach a local backend stream',
+                  second is None, str(second))
+        stream.close()
+        check('a closed stream leaves no subscriber', events.backend.subscribers == {},
+              str(events.backend.subscribers))
+        if backend == 'sql':
+            time.sleep(POLL_SECONDS * 3)
+            check('  and the poller stops with the last one', events.backend.poller is None)
+
+        stream = Stream(app, pro_token, last_event_id=int(first['id']) - 1)
+        replayed = []
+        while (event := stream.next(timeout=1)) is not None:
+            replayed.append(event)
+        stream.close()
+        expected = [first['id'], second['id']] if backend == 'sql' else [first['id']]
+        check('a reconnect with Last-Event-ID replays the missed events',
+              [event['id'] for event in replayed] == expected, str(replayed))
+    finally:
+        with app.app_context():
+            db.engine.dispose()
+
+
+if __name__ == '__main__':
+    main()
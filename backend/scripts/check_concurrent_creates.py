@@ -0,0 +1,126 @@
+"""Fire parallel duplicate create requests and check exactly one wins.
+
+For each create endpoint (request-pro, invite-client, activity invite and
+bulk activity invite), THREADS threads wait on a barrier and then send
+the same request at once. That is repeated for ROUNDS fresh pairs.
+Every round must produce exactly one created row. The single-create
+endpoints must answer one 201 and a 400 for every other request, and no
+request may fail with a 500. Afterwards the dashboard counters must
+still match the rows. The database is a scratch SQLite file, so the
+threads really do contend for the write lock.
+
+Exits non-zero on the first failed check. Run from the backend directory:
+
+    python scripts/check_concurrent_creates.py [threads] [rounds]
+"""
+import os
+import sys
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from sqlalchemy import func
+
+from app.extensions import db
+from app.models import User, Connection, GroupActivity, ActivityInvite
+from app.stats import check_counters, rebuild_counters
+
+from _common import access_token, check, exit_on_failures, scratch_app
+
+
+def token(user):
+    return access_token(user.id, user.role)
+
+
+def fire(app, threads, path, auth, body):
+    """Send the same POST from every thread at once; return the statuses."""
+    barrier = threading.Barrier(threads)
+
+    def send(_):
+        client = app.test_client()
+        barrier.wait()
+        response = client.post(path, json=body, headers={'Authorization': 'Bearer ' + auth})
+        return response.status_code, response.get_json()
+
+    with ThreadPoolExecutor(threads) as pool:
+        return list(pool.map(send, range(threads)))
+
+
+def main():
+    threads = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    with scratch_app('concurrency') as app:
+        with app.app_context():
+            pros = [User(name=f'Pro {i}', email=f'pro{i}@example.com', password_hash='x', role='professional')
+                    for i in range(rounds)]
+            clients = [User(name=f'Client {i}', email=f'client{i}@example.com', password_hash='x', role='client')
+                       for i in range(rounds * 2)]
+            db.session.add_all(pros + clients)
+            db.session.flush()
+            activities = [GroupActivity(title='Group walk', description='', created_by=pro.id) for pro in pros]
+            db.session.add_all(activities)
+            rebuild_counters()
+            db.session.commit()
+            cases = []
+            for i, pro in enumerate(pros):
+                first, second = clients[2 * i], clients[2 * i + 1]
+                activity = activities[i]
+                cases.append((
+                    'request-pro', '/api/connection/request-pro', token(first),
+                    {'professional_id': pro.id}, True,
+                    lambda c=first, p=pro: Connection.query.filter_by(client_id=c.id, professional_id=p.id).count(),
+                ))
+                cases.append((
+                    'invite-client', '/api/connection/invite-client', token(pro),
+                    {'client_email': second.email}, True,
+                    lambda c=second, p=pro: Connection.query.filter_by(client_id=c.id, professional_id=p.id).count(),
+                ))
+                cases.append((
+                    'activity invite', '/api/activities/invite', token(pro),
+                    {'activity_id': activity.id, 'client_id': first.id}, True,
+                    lambda c=first, a=activity: ActivityInvite.query.filter_by(
+                        activity_id=a.id, client_id=c.id).count(),
+                ))
+                cases.append((
+                    'bulk activity invite', '/api/activities/invite/bulk', token(pro),
+                    {'activity_id': activity.id, 'client_ids': [second.id]}, False,
+                    lambda c=second, a=activity: ActivityInvite.query.filter_by(
+                        activity_id=a.id, client_id=c.id).count(),
+                ))
+
+        results = {}
+        for name, url, auth, body, single, count_rows in cases:
+            responses = fire(app, threads, url, auth, body)
+            statuses = Counter(status for status, _ in responses)
+            with app.app_context():
+                rows = count_rows()
+            if single:
+                ok = statuses == Counter({201: 1, 400: threads - 1}) and rows == 1
+            else:
+                created = sum(body['created'] for status, body in responses if status == 200)
+                ok = statuses == Counter({200: threads}) and created == 1 and rows == 1
+            results.setdefault(name, []).append((ok, f'statuses={dict(statuses)} rows={rows}'))
+
+        for name, outcomes in results.items():
+            bad = [detail for ok, detail in outcomes if not ok]
+            check(f'{name}: one row from {threads} parallel duplicates x{len(outcomes)}', not bad,
+                  '; '.join(bad[:3]))
+
+        with app.app_context():
+            duplicates = db.session.query(func.count()).select_from(
+                db.session.query(Connection.client_id, Connection.professional_id)
+                .group_by(Connection.client_id, Connection.professional_id)
+                .having(func.count() > 1).subquery()
+            ).scalar()
+        check('no duplicate connection pairs in the table', duplicates == 0, f'{duplicates} duplicated pairs')
+
+        with app.app_context():
+            drift = list(check_counters())
+        check('dashboard counters match the rows', not drift, f'{len(drift)} mismatches, e.g. {drift[:3]}')
+    exit_on_failures()
+
+
+if __name__ == '__main__':
+    main()
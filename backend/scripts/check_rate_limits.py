@@ -0,0 +1,201 @@
+"""Check that the rate limits hold and that throttled requests are cheap.
+
+Against a scratch SQLite database with the default RATELIMIT_RULES, using
+the ``local`` (default) or the ``sql`` backend:
+
+* repeated failed logins from one address get 10 answers, then 429 with
+  Retry-After; another address is unaffected
+* a concurrent burst of logins from one address admits no more than the
+  bucket holds
+* behind a proxy (PROXY_FIX_X_FOR=1), clients are told apart by the
+  address the proxy appends to X-Forwarded-For, and can't dodge the limit
+  by sending their own
+* a request turned away by one limit takes no token from the others
+* per-user limits on writes count each user separately, and a forged token
+  falls back to the caller's address
+* every write endpoint, the activity ones included, falls under a rule
+* a 429 runs no password hash and no SQL besides the sql backend's own
+* /api/health/ratelimit and /metrics report admitted and throttled counts
+* two worker processes share the sql backend's buckets (with the local
+  backend each counts separately)
+
+It also prints how long an admitted login and a 429 take. Exits non-zero
+if any check fails. Run from the backend directory:
+
+    python scripts/check_rate_limits.py
+    python scripts/check_rate_limits.py sql
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from sqlalchemy import event
+from werkzeug.security import generate_password_hash
+
+from app import create_app
+from app.extensions import db, password_hasher, rate_limiter
+from app.logs import lookup
+from app.models import User
+from app.ratelimit import LIMITED_METHODS
+
+from _common import access_token, check, exit_on_failures, scratch_config, scratch_db
+
+
+BACKENDS = {
+    'local': 'app.ratelimit:LocalRateLimitBackend',
+    'sql': 'app.ratelimit:SQLRateLimitBackend',
+}
+
+
+class StatementCounter:
+    """Counts statements, except the rate limit backend's own."""
+
+    def __init__(self, engine):
+        self.count = 0
+        self.lock = threading.Lock()
+        event.listen(engine, 'before_cursor_execute', self.before_cursor_execute)
+
+    def before_cursor_execute(self, conn, cursor, statement, *args):
+        if 'rate_limit_bucket' not in statement:
+            with self.lock:
+                self.count += 1
+
+
+def config(path, backend):
+    return scratch_config(path, RATELIMIT_ENABLED=True, RATELIMIT_BACKEND=BACKENDS[backend], PROXY_FIX_X_FOR=1)
+
+
+def worker_logins(path, backend):
+    """One 'worker process': 10 failed logins from the same address."""
+    client = create_app(config(path, backend)).test_client()
+    return Counter(client.post('/api/auth/login', json={'email': 'client0@example.com', 'password': 'wrong'},
+                               environ_base={'REMOTE_ADDR': '10.0.0.9'}).status_code for _ in range(10))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('backend', nargs='?', choices=list(BACKENDS), default='local')
+    args = parser.parse_args()
+    with scratch_db('ratelimit') as path:
+        run(path, args.backend)
+    exit_on_failures()
+
+
+def run(path, backend):
+    app = create_app(config(path, backend))
+    try:
+        with app.app_context():
+            db.create_all()
+            users = [User(name=f'Client {i}', email=f'client{i}@example.com', role='client',
+                          password_hash=generate_password_hash('password123')) for i in range(2)]
+            db.session.add_all(users)
+            db.session.commit()
+            tokens = [access_token(user.id, 'client') for user in users]
+            statements = StatementCounter(db.engine)
+        client = app.test_client()
+        login = {'email': 'client0@example.com', 'password': 'wrong'}
+
+        def post(path, body, address='10.0.0.1', token=None, forwarded_for=None):
+            headers = {'Authorization': 'Bearer ' + token} if token else {}
+            if forwarded_for:
+                headers['X-Forwarded-For'] = forwarded_for
+            started = time.perf_counter()
+            response = client.post(path, json=body, headers=headers, environ_base={'REMOTE_ADDR': address})
+            return response, time.perf_counter() - started
+
+        admitted, throttled = [], []
+        statuses = Counter()
+        for _ in range(25):
+            hashes = sum(phase['count'] for phase in password_hasher.stats()['phases'].values())
+            before = statements.count
+            response, elapsed = post('/api/auth/login', login)
+            statuses[response.status_code] += 1
+            if response.status_code == 429:
+                hashed = sum(phase['count'] for phase in password_hasher.stats()['phases'].values()) - hashes
+                throttled.append((elapsed, statements.count - before, hashed, response.headers.get('Retry-After')))
+            else:
+                admitted.append(elapsed)
+        check('10 logins per minute from one address, then 429', statuses == Counter({401: 10, 429: 15}),
+              str(dict(statuses)))
+        check('429 runs no password hash and no SQL besides the limiter', all(sql == 0 and hashed == 0 for _, sql, hashed, _ in throttled),
+              str([(sql, hashed) for _, sql, hashed, _ in throttled[:3]]))
+        check('429 says when to retry', all(retry and int(retry) >= 1 for _, _, _, retry in throttled),
+              str([retry for _, _, _, retry in throttled[:3]]))
+        response, _ = post('/api/auth/login', login, address='10.0.0.2')
+        check('another address is not throttled', response.status_code == 401, str(response.status_code))
+
+        def burst(_):
+            return post('/api/auth/login', login, address='10.0.0.3')[0].status_code
+
+        with ThreadPoolExecutor(16) as pool:
+            burst_statuses = Counter(pool.map(burst, range(64)))
+        check('a concurrent burst gets at most the bucket', burst_statuses[401] in (10, 11)
+              and burst_statuses[401] + burst_statuses[429] == 64, str(dict(burst_statuses)))
+
+        proxied = Counter(post('/api/auth/login', login, address='10.0.0.5', forwarded_for='203.0.113.1')[0]
+                          .status_code for _ in range(11))
+        other = post('/api/auth/login', login, address='10.0.0.5', forwarded_for='203.0.113.2')[0]
+        spoofed = Counter(post('/api/auth/login', login, address='10.0.0.5',
+                               forwarded_for=f'198.51.100.{i}, 203.0.113.1')[0].status_code for i in range(5))
+        check('clients behind a proxy get their own buckets', proxied == Counter({401: 10, 429: 1})
+              and other.status_code == 401, f'{dict(proxied)} {other.status_code}')
+        check('a client-sent X-Forwarded-For is ignored', spoofed == Counter({429: 5}), str(dict(spoofed)))
+
+        with app.app_context():
+            limiter = rate_limiter.backend
+            # Rates low enough that nothing refills during the check
+            wide, narrow = ('check|wide', 1e-6, 5), ('check|narrow', 1e-6, 1)
+            first, second = limiter.take([wide, narrow]), limiter.take([wide, narrow])
+            rest = [limiter.take([wide]) for _ in range(5)]
+        check('a request turned away by one limit keeps the others\' tokens',
+              first == 0 and second > 0 and rest[:4] == [0] * 4 and rest[4] > 0, f'{first} {second} {rest}')
+
+        body = {'professional_id': 999}
+        first = Counter(post('/api/connection/request-pro', body, token=tokens[0])[0].status_code for _ in range(70))
+        second = Counter(post('/api/connection/request-pro', body, token=tokens[1])[0].status_code for _ in range(5))
+        check('per-user write limit', first[429] == 10 and second[429] == 0,
+              f'first={dict(first)} second={dict(second)}')
+        forged = tokens[1][:-4] + ('AAAA' if not tokens[1].endswith('AAAA') else 'BBBB')
+        forged_statuses = Counter(post('/api/connection/request-pro', body, address='10.0.0.4', token=forged)[0]
+                                  .status_code for _ in range(65))
+        check('a forged token is limited by address', forged_statuses[429] == 5, str(dict(forged_statuses)))
+
+        bulk = {'activity_id': 999, 'client_ids': [1]}
+        activity = Counter(post('/api/activities/invite/bulk', bulk, token=tokens[1])[0].status_code for _ in range(65))
+        check('activity writes have the per-user limit', activity[429] == 5, str(dict(activity)))
+        unlimited = [rule.endpoint for rule in app.url_map.iter_rules()
+                     if rule.methods & LIMITED_METHODS and lookup(rate_limiter.rules, rule.endpoint)[0] is None]
+        check('every write endpoint has a rule', not unlimited, str(unlimited))
+
+        stats = client.get('/api/health/ratelimit').get_json()['rules']
+        check('stats count admitted and throttled', stats['auth.login']['admitted'] >= 21
+              and stats['auth.login']['throttled'] >= 15 + 53, str(stats['auth.login']))
+        metrics = client.get('/metrics').get_data(as_text=True)
+        check('/metrics has the decision counter',
+              'rate_limit_requests_total{decision="throttled",rule="auth.login"}' in metrics)
+
+        def ms(values):
+            values = sorted(values)
+            return f'{values[len(values) // 2] * 1000:.2f} ms'
+
+        print(f'\nadmitted login (bad password) p50 {ms(admitted)}, 429 p50 {ms([t for t, *_ in throttled])}')
+
+        with multiprocessing.get_context('spawn').Pool(2) as pool:
+            workers = sum(pool.starmap(worker_logins, [(path, backend)] * 2), Counter())
+        expected = Counter({401: 10, 429: 10}) if backend == 'sql' else Counter({401: 20})
+        check(f'two worker processes, {backend} backend: {workers[401]} of 20 logins admitted',
+              workers == expected, str(dict(workers)))
+    finally:
+        with app.app_context():
+            db.engine.dispose()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+"""Check that dead refresh sessions are pruned and live ones are kept.
+
+Against a scratch SQLite database:
+
+* a login deletes the user's revoked and expired sessions, and no one
+  else's, so logging in and out repeatedly keeps one row per user
+* a session created long ago but refreshed recently is kept, and its
+  refresh token still works
+* /refresh moves ``refreshed_at`` forward
+* ``flask sessions prune`` deletes every user's dead sessions
+
+Exits non-zero if any check fails. Run from the backend directory:
+
+    python scripts/check_refresh_sessions.py
+"""
+import os
+import sys
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from flask_jwt_extended import decode_token
+from sqlalchemy import func, select, update
+from werkzeug.security import generate_password_hash
+
+from app.extensions import db
+from app.models import RefreshSession, User
+
+from _common import check, exit_on_failures, scratch_app
+
+
+def main():
+    with scratch_app('sessions', RATELIMIT_ENABLED=False) as app:
+        with app.app_context():
+            users = [User(name=f'Client {i}', email=f'client{i}@example.com', role='client',
+                          password_hash=generate_password_hash('password123')) for i in range(2)]
+            db.session.add_all(users)
+            db.session.commit()
+            alice, bob = (user.id for user in users)
+        client = app.test_client()
+        expires = app.config['JWT_REFRESH_TOKEN_EXPIRES']
+
+        def login(i):
+            response = client.post('/api/auth/login', json={'email': f'client{i}@example.com', 'password': 'password123'})
+            assert response.status_code == 200, response.status
+            return response.get_json()['refresh_token']
+
+        def refresh(token):
+            return client.post('/api/auth/refresh', headers={'Authorization': 'Bearer ' + token})
+
+        def rows(user_id=None):
+            with app.app_context():
+                query = select(func.count()).select_from(RefreshSession)
+                if user_id is not None:
+                    query = query.where(RefreshSession.user_id == user_id)
+                return db.session.scalar(query)
+
+        def session_id(token):
+            with app.app_context():
+                return decode_token(token)['sid']
+
+        def backdate(sid, **columns):
+            with app.app_context():
+                db.session.execute(update(RefreshSession).where(RefreshSession.id == sid).values(**columns))
+                db.session.commit()
+
+        # Bob's revoked session has to survive Alice's logins
+        client.post('/api/auth/logout', headers={'Authorization': 'Bearer ' + login(1)})
+        for _ in range(20):
+            client.post('/api/auth/logout', headers={'Authorization': 'Bearer ' + login(0)})
+        check('logging in and out 20 times leaves one row', rows(alice) == 1, str(rows(alice)))
+        check('  and leaves other users\' sessions alone', rows(bob) == 1, str(rows(bob)))
+
+        long_ago = datetime.utcnow() - expires - timedelta(days=1)
+        expired, kept = login(0), login(0)
+        backdate(session_id(expired), created_at=long_ago, refreshed_at=long_ago)
+        backdate(session_id(kept), created_at=long_ago)
+        login(0)
+        with app.app_context():
+            alive = set(db.session.scalars(select(RefreshSession.id).where(RefreshSession.user_id == alice)))
+        check('login deletes the expired session', session_id(expired) not in alive, str(alive))
+        check('  and keeps one refreshed recently, however old', session_id(kept) in alive, str(alive))
+
+        with app.app_context():
+            before = db.session.get(RefreshSession, session_id(kept)).refreshed_at
+        response = refresh(kept)
+        with app.app_context():
+            after = db.session.get(RefreshSession, session_id(kept)).refreshed_at
+        check('its refresh token still works', response.status_code == 200, str(response.status_code))
+        check('/refresh moves refreshed_at forward', after > before, f'{before} -> {after}')
+
+        backdate(session_id(response.get_json()['refresh_token']), refreshed_at=long_ago)
+        dead = rows() - 1  # Alice's newest login is the only live session left
+        result = app.test_cli_runner().invoke(args=['sessions', 'prune'])
+        check('flask sessions prune deletes every user\'s dead sessions',
+              result.exit_code == 0 and rows() == 1 and f'deleted {dead} ' in result.output,
+              f'{result.output.strip()} rows={rows()}')
+    exit_on_failures()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+"""Check read-replica routing with SQLite files standing in for the servers.
+
+One scratch file is the primary and two more are replicas; "replication"
+is an SQLite backup from the primary, so between syncs the replicas lag
+like a real one would. Every statement is attributed to the engine that
+ran it, and the script checks that:
+
+* GET list requests read from the replicas, round-robin
+* writes and non-GET requests never touch a replica
+* after a write, the users it affected see it right away (their lists
+  are served by the primary) until the replica catches up
+* GET /api/stats always reads the primary, so the counters are current
+* once it has caught up, those reads go back to the replica
+
+Exits non-zero on the first failed check. Run from the backend directory:
+python scripts/check_replica_routing.py
+"""
+import os
+import sqlite3
+import sys
+from collections import Counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from sqlalchemy import event
+
+from app import create_app
+from app.extensions import db
+from app.models import User, GroupActivity
+
+from _common import access_token, check, exit_on_failures, scratch_config, scratch_db
+
+
+def replicate(primary, replicas):
+    source = sqlite3.connect(primary)
+    for replica in replicas:
+        target = sqlite3.connect(replica)
+        source.backup(target)
+        target.close()
+    source.close()
+
+
+def main():
+    with scratch_db('primary') as primary, scratch_db('replica1') as replica1, scratch_db('replica2') as replica2:
+        run(primary, [replica1, replica2])
+    exit_on_failures()
+
+
+def run(primary, replicas):
+    app = create_app(scratch_config(primary, SQLALCHEMY_REPLICA_URIS=['sqlite:///' + path for path in replicas]))
+    try:
+        with app.app_context():
+            db.create_all()
+            pro = User(name='Pro', email='pro@example.com', password_hash='x', role='professional')
+            client = User(name='Client', email='client@example.com', password_hash='x', role='client')
+            db.session.add_all([pro, client])
+            db.session.flush()
+            db.session.add(GroupActivity(title='Group walk', description='', created_by=pro.id))
+            db.session.commit()
+            pro_token = access_token(pro.id, 'professional')
+            client_token = access_token(client.id, 'client')
+            engine_names = {engine: key or 'primary' for key, engine in db.engines.items()}
+            for engine in db.engines.values():
+                engine.dispose()
+        replicate(primary, replicas)
+
+        used = Counter()
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            used[engine_names[conn.engine]] += 1
+
+        for engine in engine_names:
+            event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+
+        http = app.test_client()
+
+        def request(method, path, token, **kwargs):
+            used.clear()
+            response = http.open(path, method=method, headers={'Authorization': 'Bearer ' + token}, **kwargs)
+            return response, dict(used)
+
+        response, engines = request('GET', '/api/users', pro_token)
+        first = set(engines) - {'primary'}
+        check('GET /api/users reads from a replica', response.status_code == 200 and len(first) == 1,
+              str(engines))
+        response, engines = request('GET', '/api/users', pro_token)
+        second = set(engines) - {'primary'}
+        check('the next GET uses the other replica', first != second and len(second) == 1, str(engines))
+
+        response, engines = request('POST', '/api/connection/invite-client', pro_token,
+                                    json={'client_email': 'client@example.com'})
+        check('POST writes only to the primary', response.status_code == 201 and set(engines) == {'primary'},
+              f'{response.status_code} {engines}')
+
+        response, engines = request('GET', '/api/stats', pro_token)
+        check('stats after the write come from the primary',
+              response.status_code == 200 and response.get_json()['pending_outgoing'] == 1
+              and set(engines) == {'primary'}, f'{response.get_data(as_text=True)} {engines}')
+
+        for _ in replicas:
+            response, engines = request('GET', '/api/connection/list', client_token)
+            check('lagging replica: the invited client still sees the request',
+                  response.status_code == 200 and len(response.get_json()) == 1,
+                  response.get_data(as_text=True))
+            list_reads = {name for name in engines if name != 'primary'}
+            check('  and the list itself came from the primary', engines.get('primary', 0) >= 2,
+                  f'{engines} replica reads: {list_reads}')
+
+        replicate(primary, replicas)
+        response, engines = request('GET', '/api/connection/list', client_token)
+        check('caught-up replica serves the list again',
+              response.status_code == 200 and len(response.get_json()) == 1
+              and sum(count for name, count in engines.items() if name != 'primary') == 2,
+              str(engines))
+    finally:
+        with app.app_context():
+            for engine in db.engines.values():
+                engine.dispose()
+
+
+if __name__ == '__main__':
+    main()
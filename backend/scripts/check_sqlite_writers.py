@@ -0,0 +1,81 @@
+"""Check that concurrent writer processes don't hit "database is locked".
+
+Starts several processes (like gunicorn workers), each with its own app
+and engine on one scratch SQLite file, and has them all bump the same
+change-version rows as fast as they can. With the engine profile's
+busy_timeout pragma (and WAL in prod-sqlite) every write should succeed;
+the script exits non-zero if any failed. Run from the backend directory:
+
+    python scripts/check_sqlite_writers.py                 # dev-sqlite
+    python scripts/check_sqlite_writers.py prod-sqlite 8 500
+"""
+import multiprocessing
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from sqlalchemy.exc import OperationalError
+
+from app import create_app
+from app.extensions import db
+from app.models import ChangeVersion
+from app.versions import bump
+
+from _common import scratch_config, scratch_db
+
+
+def make_app(path, profile):
+    return create_app(scratch_config(path, DB_PROFILE=profile))
+
+
+def writer(path, profile, writes, results):
+    app = make_app(path, profile)
+    failed = 0
+    with app.app_context():
+        for i in range(writes):
+            try:
+                bump('role:*', f'user:{i % 10}')
+                db.session.commit()
+            except OperationalError:
+                db.session.rollback()
+                failed += 1
+    results.put(failed)
+
+
+def main():
+    profile = sys.argv[1] if len(sys.argv) > 1 else 'dev-sqlite'
+    processes = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    writes = int(sys.argv[3]) if len(sys.argv) > 3 else 200
+
+    with scratch_db('writers') as path:
+        app = make_app(path, profile)
+        with app.app_context():
+            db.create_all()
+            db.engine.dispose()
+
+        results = multiprocessing.Queue()
+        workers = [multiprocessing.Process(target=writer, args=(path, profile, writes, results))
+                   for _ in range(processes)]
+        t0 = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        failed = sum(results.get() for _ in workers)
+        for worker in workers:
+            worker.join()
+        elapsed = time.perf_counter() - t0
+
+        with app.app_context():
+            total = db.session.get(ChangeVersion, 'role:*').version
+            db.engine.dispose()
+
+    expected = processes * writes
+    print(f'{profile}: {processes} processes x {writes} commits in {elapsed:.2f}s '
+          f'({expected / elapsed:,.0f} commits/s), {failed} failed, counter {total}/{expected}')
+    if failed or total != expected:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""Check that the list endpoints run a fixed number of SQL statements.
+
+Seeds a scratch SQLite database with the synthetic dataset at a scale where
+its one professional is connected to every client (and invites them to
+activities), calls the list endpoints through the Flask test client and
+counts the statements each request executes. The count must not grow with
+the number of rows.
+Run from the backend directory: python scripts/count_queries.py
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from sqlalchemy import event
+
+from app.extensions import db
+
+from _common import access_token, check, exit_on_failures, scratch_app
+from synthetic_data import generate
+
+# Statements allowed per list request, independent of the row count:
+# the change-version lookup for the ETag plus the list query itself
+EXPECTED = {
+    'connection.list_connections (professional)': 2,
+    'connection.list_connections (client)': 2,
+    'activity.list_activities (professional)': 2,
+    'activity.list_activities (client)': 2,
+}
+
+
+def count_statements(client, path, token):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        response = client.get(path, headers={'Authorization': 'Bearer ' + token})
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+    assert response.status_code == 200, response.get_data(as_text=True)
+    return len(statements)
+
+
+def run(n_clients):
+    with scratch_app('count') as app:
+        with app.app_context():
+            # Below 40 users the dataset has one professional, user 1
+            generate(n_clients + 1)
+            pro_token, client_token = access_token(1, 'professional'), access_token(2, 'client')
+            db.session.remove()
+            client = app.test_client()
+            counts = {
+                'connection.list_connections (professional)':
+                    count_statements(client, '/api/connection/list', pro_token),
+                'connection.list_connections (client)':
+                    count_statements(client, '/api/connection/list', client_token),
+                'activity.list_activities (professional)':
+                    count_statements(client, '/api/activities/list', pro_token),
+                'activity.list_activities (client)':
+                    count_statements(client, '/api/activities/list', client_token),
+            }
+            db.session.remove()
+    return counts
+
+
+def main():
+    for n_clients in (5, 38):
+        for name, count in run(n_clients).items():
+            check(f'{name} with {n_clients} clients: {count} statement(s)', count <= EXPECTED[name])
+    exit_on_failures()
+
+
+if __name__ == '__main__':
+    main()
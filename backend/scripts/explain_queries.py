@@ -0,0 +1,68 @@
+"""Check that the route lookup queries are served by an index.
+
+Builds each query the way the routes do, runs SQLite's EXPLAIN QUERY PLAN
+against a scratch database and fails if any of them falls back to a full
+table scan. Run from the backend directory: python scripts/explain_queries.py
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.extensions import db
+from app.models import User, Connection, GroupActivity, ActivityInvite
+
+from _common import check, exit_on_failures, scratch_app
+
+
+def route_queries():
+    user_id, pro_id, client_id, activity_id = 1, 2, 3, 4
+    return {
+        'users.list_users (role + cursor)':
+            User.query.filter_by(role='professional').filter(User.id > 50).order_by(User.id).limit(51),
+        'auth.login / signup':
+            User.query.filter_by(email='someone@example.com'),
+        'connection.request_pro / invite_client':
+            Connection.query.filter_by(client_id=client_id, professional_id=pro_id),
+        'connection.list_connections':
+            Connection.query.filter(
+                (Connection.client_id == user_id) | (Connection.professional_id == user_id)
+            ),
+        'activity.invite_to_activity':
+            ActivityInvite.query.filter_by(activity_id=activity_id, client_id=client_id),
+        'activity.list_activities (client)':
+            ActivityInvite.query.filter_by(client_id=client_id),
+        'activity.list_activities (professional)':
+            GroupActivity.query.filter_by(created_by=pro_id),
+        'activity.delete_activity (invites)':
+            ActivityInvite.query.filter_by(activity_id=activity_id),
+    }
+
+
+def explain(query):
+    sql = str(query.statement.compile(db.engine, compile_kwargs={'literal_binds': True}))
+    rows = db.session.execute(db.text('EXPLAIN QUERY PLAN ' + sql)).fetchall()
+    return [row[-1] for row in rows]
+
+
+def is_full_scan(detail):
+    # "SCAN user" is a full table scan; "SCAN user USING INDEX ..." and
+    # "SEARCH ..." are index-driven.
+    return detail.startswith('SCAN ') and 'USING' not in detail
+
+
+def main():
+    with scratch_app('explain') as app:
+        with app.app_context():
+            for name, query in route_queries().items():
+                plan = explain(query)
+                check(name, not any(is_full_scan(detail) for detail in plan), 'full table scan')
+                for detail in plan:
+                    print('      ', detail)
+            db.session.remove()
+    exit_on_failures()
+    print('all queries use an index')
+
+
+if __name__ == '__main__':
+    main()
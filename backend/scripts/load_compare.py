@@ -0,0 +1,177 @@
+"""Load test: gunicorn (sync WSGI) vs uvicorn (ASGI) on the list endpoints.
+
+Seeds a scratch SQLite database with the synthetic dataset, starts each server in turn on a free port
+against it, and drives GET /api/users, /api/connection/list and
+/api/activities/list from a pool of keep-alive client threads. Reports
+throughput, p50/p95/p99 latency and the peak RSS of the server process
+tree (read from /proc, so Linux only). Both servers get the same number of
+worker processes. Run from the backend directory:
+
+    python scripts/load_compare.py                       # 4 workers, 64 clients, 10s
+    python scripts/load_compare.py --workers 2 --clients 200 --seconds 20
+"""
+import argparse
+import http.client
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.extensions import db
+
+from _common import access_token, percentile, scratch_app
+from synthetic_data import generate
+
+BACKEND_DIR = os.path.join(os.path.dirname(__file__), '..')
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def tree_rss_kb(pid):
+    """Resident set size of ``pid`` and all of its descendants."""
+    total = 0
+    pending = [pid]
+    while pending:
+        current = pending.pop()
+        try:
+            with open(f'/proc/{current}/status') as f:
+                for line in f:
+                    if line.startswith('VmRSS:'):
+                        total += int(line.split()[1])
+            for task in os.listdir(f'/proc/{current}/task'):
+                with open(f'/proc/{current}/task/{task}/children') as f:
+                    pending.extend(int(child) for child in f.read().split())
+        except (FileNotFoundError, ProcessLookupError):
+            continue
+    return total
+
+
+def wait_until_up(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            conn.request('GET', '/api/health/')
+            conn.getresponse().read()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f'server on port {port} did not start')
+
+
+def run_clients(port, tokens, clients, seconds):
+    paths = ['/api/users?limit=50', '/api/connection/list', '/api/activities/list']
+    stop = time.monotonic() + seconds
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+
+    def worker(n):
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        local = []
+        failed = 0
+        i = n
+        while time.monotonic() < stop:
+            path = paths[i % len(paths)]
+            headers = {'Authorization': 'Bearer ' + tokens[i % len(tokens)]}
+            i += 1
+            t0 = time.perf_counter()
+            try:
+                conn.request('GET', path, headers=headers)
+                response = conn.getresponse()
+                response.read()
+                if response.status != 200:
+                    failed += 1
+            except (OSError, http.client.HTTPException):
+                failed += 1
+                conn.close()
+                conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+                continue
+            local.append(time.perf_counter() - t0)
+        conn.close()
+        with lock:
+            latencies.extend(local)
+            errors.append(failed)
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        list(pool.map(worker, range(clients)))
+    return latencies, sum(errors), time.perf_counter() - t0
+
+
+def bench_server(name, command, env, port, tokens, args):
+    server = subprocess.Popen(command, cwd=BACKEND_DIR, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    peak = 0
+    sampling = True
+
+    def sample():
+        nonlocal peak
+        while sampling:
+            peak = max(peak, tree_rss_kb(server.pid))
+            time.sleep(0.1)
+
+    try:
+        wait_until_up(port)
+        sampler = threading.Thread(target=sample, daemon=True)
+        sampler.start()
+        latencies, errors, elapsed = run_clients(port, tokens, args.clients, args.seconds)
+        sampling = False
+        sampler.join()
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+    latencies.sort()
+    print(f'{name:<9} {len(latencies) / elapsed:>9,.0f} req/s  '
+          f'p50 {percentile(latencies, 50) * 1000:7.1f}ms  '
+          f'p95 {percentile(latencies, 95) * 1000:7.1f}ms  '
+          f'p99 {percentile(latencies, 99) * 1000:7.1f}ms  '
+          f'errors {errors:>5}  peak RSS {peak / 1024:7.1f} MiB')
+    return errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--threads', type=int, default=1, help='gunicorn threads per worker')
+    parser.add_argument('--clients', type=int, default=64)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--rows', type=int, default=2000, help='users to generate')
+    args = parser.parse_args()
+
+    with scratch_app('load') as app:
+        with app.app_context():
+            counts = generate(args.rows)
+            # One professional and one client token to spread requests over
+            tokens = [access_token(1, 'professional'), access_token(counts['professionals'] + 1, 'client')]
+            db.session.remove()
+            db.engine.dispose()
+
+        env = dict(os.environ, DATABASE_URL=app.config['SQLALCHEMY_DATABASE_URI'])
+        errors = 0
+        port = free_port()
+        errors += bench_server('gunicorn', [
+            sys.executable, '-m', 'gunicorn', '--workers', str(args.workers),
+            '--threads', str(args.threads), '--bind', f'127.0.0.1:{port}', 'run:app',
+        ], env, port, tokens, args)
+        port = free_port()
+        errors += bench_server('uvicorn', [
+            sys.executable, '-m', 'uvicorn', '--workers', str(args.workers),
+            '--host', '127.0.0.1', '--port', str(port), '--log-level', 'warning', 'asgi:app',
+        ], env, port, tokens, args)
+    if errors:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+"""Generate a synthetic, reproducible dataset at a chosen scale.
+
+Users are 5% professionals and 95% clients. Each client is connected to one
+to three professionals (mostly accepted, some pending or rejected). Each
+professional runs a few group activities with up to ten of their accepted
+clients invited. The same seed always produces the same rows, so benchmark
+runs at the same scale are comparable across commits.
+
+Every user's password is PASSWORD. The hash is computed once and shared,
+because hashing a million passwords would take hours.
+
+Rows are inserted with executemany in chunks, so 1M users (about 1.7M
+connections and 1.5M invites) fit comfortably in memory. Run from the
+backend directory:
+
+    python scripts/synthetic_data.py 100000 bench.db     # 100k users into bench.db
+"""
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from sqlalchemy import insert
+from werkzeug.security import generate_password_hash
+
+from app import create_app
+from app.config import Config
+from app.extensions import db
+from app.models import User, Connection, GroupActivity, ActivityInvite
+from app.stats import rebuild_counters
+
+PASSWORD = 'password123'
+PROFESSIONAL_SHARE = 0.05
+ACTIVITIES_PER_PROFESSIONAL = 3
+INVITES_PER_ACTIVITY = 10
+CONNECTION_STATUSES = ['accepted'] * 7 + ['pending'] * 2 + ['rejected']
+INVITE_STATUSES = ['pending'] * 2 + ['accepted', 'declined']
+START = datetime(2026, 1, 1)
+
+
+def insert_chunked(model, rows, chunk_size):
+    chunk = []
+    count = 0
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == chunk_size:
+            db.session.execute(insert(model), chunk)
+            count += len(chunk)
+            chunk = []
+    if chunk:
+        db.session.execute(insert(model), chunk)
+        count += len(chunk)
+    return count
+
+
+def generate(n_users, seed=0, chunk_size=10_000):
+    """Insert the dataset into the current app's database (which should be
+    empty) and return the row counts. Needs an app context."""
+    rng = random.Random(seed)
+    n_pros = max(1, int(n_users * PROFESSIONAL_SHARE))
+    password_hash = generate_password_hash(PASSWORD)
+    counts = {}
+
+    counts['users'] = insert_chunked(User, (
+        {'id': i, 'name': f'{"Pro" if i <= n_pros else "Client"} {i}',
+         'email': f'{"pro" if i <= n_pros else "client"}{i}@example.com',
+         'password_hash': password_hash,
+         'role': 'professional' if i <= n_pros else 'client',
+         'created_at': START + timedelta(seconds=i)}
+        for i in range(1, n_users + 1)
+    ), chunk_size)
+
+    # Accepted clients per professional, for the activity invites below
+    clients_of = [[] for _ in range(n_pros + 1)]
+
+    def connections():
+        for client_id in range(n_pros + 1, n_users + 1):
+            for pro_id in rng.sample(range(1, n_pros + 1), min(n_pros, rng.choice((1, 1, 2, 3)))):
+                status = rng.choice(CONNECTION_STATUSES)
+                if status == 'accepted':
+                    clients_of[pro_id].append(client_id)
+                yield {'professional_id': pro_id, 'client_id': client_id, 'status': status,
+                       'initiated_by': rng.choice((pro_id, client_id)),
+                       'created_at': START + timedelta(seconds=client_id)}
+
+    counts['connections'] = insert_chunked(Connection, connections(), chunk_size)
+
+    def activities():
+        for pro_id in range(1, n_pros + 1):
+            for n in range(ACTIVITIES_PER_PROFESSIONAL):
+                yield {'id': (pro_id - 1) * ACTIVITIES_PER_PROFESSIONAL + n + 1,
+                       'title': f'Activity {n + 1} by {pro_id}', 'description': 'Weekly group session', 'created_by': pro_id,
+                       'created_at': START + timedelta(seconds=pro_id * 10 + n)}
+
+    counts['activities'] = insert_chunked(GroupActivity, activities(), chunk_size)
+
+    def invites():
+        activity_id = 0
+        for pro_id in range(1, n_pros + 1):
+            clients = clients_of[pro_id]
+            for _ in range(ACTIVITIES_PER_PROFESSIONAL):
+                activity_id += 1
+                for client_id in rng.sample(clients, min(len(clients), INVITES_PER_ACTIVITY)):
+                    yield {'activity_id': activity_id, 'client_id': client_id,
+                           'status': rng.choice(INVITE_STATUSES)}
+
+    counts['invites'] = insert_chunked(ActivityInvite, invites(), chunk_size)
+    rebuild_counters()
+    db.session.commit()
+    counts['professionals'] = n_pros
+    return counts
+
+
+def main():
+    if len(sys.argv) != 3:
+        sys.exit('usage: python scripts/synthetic_data.py <users> <database file>')
+    n_users = int(sys.argv[1])
+    path = os.path.abspath(sys.argv[2])
+    if os.path.exists(path):
+        sys.exit(f'{path} already exists')
+
+    class DataConfig(Config):
+        SQLALCHEMY_DATABASE_URI = 'sqlite:///' + path
+
+    app = create_app(DataConfig)
+    with app.app_context():
+        db.create_all()
+        t0 = time.perf_counter()
+        counts = generate(n_users)
+        print(', '.join(f'{count:,} {name}' for name, count in counts.items()),
+              f'in {time.perf_counter() - t0:.1f}s')
+
+
+if __name__ == '__main__':
+    main()
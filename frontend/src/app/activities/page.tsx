@@ -1,6 +1,7 @@
 'use client';
 
 import { useAuth } from '@/hooks/useAuth';
+import { useChangeFeed } from '@/hooks/useChangeFeed';
 import Navbar from '@/components/Navbar';
 import ProtectedRoute from '@/components/ProtectedRoute';
 import { useEffect, useState } from 'react';
@@ -66,6 +67,9 @@ export default function ActivitiesPage() {
         // eslint-disable-next-line react-hooks/exhaustive-deps
     }, [user]);
 
+    // Refetch when the server pushes a change instead of polling
+    useChangeFeed(['invite', 'connection'], () => fetchData(), !!user);
+
     const onCreateActivity = async (data: Record<string, unknown>) => {
         try {
             await api.post('/activities/', data);
@@ -1,6 +1,7 @@
 'use client';
 
 import { useAuth } from '@/hooks/useAuth';
+import { useChangeFeed } from '@/hooks/useChangeFeed';
 import Navbar from '@/components/Navbar';
 import ProtectedRoute from '@/components/ProtectedRoute';
 import { useEffect, useState } from 'react';
@@ -28,6 +29,9 @@ export default function RequestsPage() {
         }
     }, [user]);
 
+    // Refetch when the server pushes a change instead of polling
+    useChangeFeed(['connection'], () => fetchConnections(), !!user);
+
     const fetchConnections = async () => {
         try {
             const response = await api.get('/connection/list');
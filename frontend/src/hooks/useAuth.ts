@@ -27,6 +27,7 @@ export function useAuth() {
                     console.error('Failed to parse user cookie', e);
                     Cookies.remove('user');
                     Cookies.remove('token');
+                    Cookies.remove('refresh_token');
                 }
             }
             setLoading(false);
@@ -37,8 +38,9 @@ export function useAuth() {
     const login = async (data: Record<string, unknown>) => {
         try {
             const response = await api.post('/auth/login', data);
-            const { token, user } = response.data;
+            const { token, refresh_token, user } = response.data;
             Cookies.set('token', token, { expires: 7 });
+            Cookies.set('refresh_token', refresh_token, { expires: 30 });
             Cookies.set('user', JSON.stringify(user), { expires: 7 });
             setUser(user);
             return response.data;
@@ -50,8 +52,9 @@ export function useAuth() {
     const signup = async (data: Record<string, unknown>) => {
         try {
             const response = await api.post('/auth/signup', data);
-            const { token, user } = response.data;
+            const { token, refresh_token, user } = response.data;
             Cookies.set('token', token, { expires: 7 });
+            Cookies.set('refresh_token', refresh_token, { expires: 30 });
             Cookies.set('user', JSON.stringify(user), { expires: 7 });
             setUser(user);
             return response.data;
@@ -61,7 +64,13 @@ export function useAuth() {
     };
 
     const logout = () => {
+        const refreshToken = Cookies.get('refresh_token');
+        if (refreshToken) {
+            // Revoke the server-side session; logging out locally doesn't wait on it
+            api.post('/auth/logout', null, { headers: { Authorization: `Bearer ${refreshToken}` } }).catch(() => {});
+        }
         Cookies.remove('token');
+        Cookies.remove('refresh_token');
         Cookies.remove('user');
         setUser(null);
         router.push('/login');
@@ -0,0 +1,85 @@
+import { useEffect, useRef } from 'react';
+import Cookies from 'js-cookie';
+import { refreshAccessToken } from '@/lib/api';
+
+const baseURL = process.env.NEXT_PUBLIC_API_URL || 'http://127.0.0.1:5000/api';
+
+const EVENT_TYPES = {
+    connection: ['connection.created', 'connection.accepted', 'connection.rejected', 'connection.removed'],
+    invite: ['invite.created', 'invite.accepted', 'invite.declined', 'invite.removed'],
+};
+
+type Topic = keyof typeof EVENT_TYPES;
+
+// Matches the 'retry:' the server sends
+const RECONNECT_MS = 3000;
+
+// Subscribes to the server's /events stream and calls onChange when an event
+// for one of the topics arrives, or when the server says events were missed
+// ('reset'). EventSource reconnects on its own after a network error and sends
+// Last-Event-ID, so the server replays anything published while the connection
+// was down. An HTTP error (a 401 once the access token in the URL has expired)
+// closes it for good instead, so the hook renews the token and opens a new
+// stream from the last event it saw.
+export function useChangeFeed(topics: Topic[], onChange: () => void, enabled = true) {
+    const callback = useRef(onChange);
+    callback.current = onChange;
+    const key = topics.join(',');
+
+    useEffect(() => {
+        if (!enabled || typeof window === 'undefined') {
+            return;
+        }
+        const types = ['reset', ...(key.split(',') as Topic[]).flatMap((topic) => EVENT_TYPES[topic])];
+        let source: EventSource | null = null;
+        let lastEventId = '';
+        let stopped = false;
+        let timer: ReturnType<typeof setTimeout> | undefined;
+
+        const handler = (event: Event) => {
+            lastEventId = (event as MessageEvent).lastEventId || lastEventId;
+            callback.current();
+        };
+
+        const connect = (token: string) => {
+            const params = new URLSearchParams({ token });
+            if (lastEventId) {
+                params.set('last_event_id', lastEventId);
+            }
+            const current = new EventSource(`${baseURL}/events?${params}`);
+            source = current;
+            types.forEach((type) => current.addEventListener(type, handler));
+            current.onerror = () => {
+                if (stopped || current.readyState !== EventSource.CLOSED) {
+                    return;
+                }
+                // Another request may have renewed the token already; otherwise renew it here
+                const latest = Cookies.get('token');
+                const renewed = latest && latest !== token ? Promise.resolve(latest) : refreshAccessToken();
+                renewed.then((next) => {
+                    if (stopped) {
+                        return;
+                    }
+                    if (next) {
+                        timer = setTimeout(() => connect(next), RECONNECT_MS);
+                    } else {
+                        console.error('Change feed closed: the session could not be renewed');
+                    }
+                });
+            };
+        };
+
+        const token = Cookies.get('token');
+        if (token) {
+            connect(token);
+        }
+        return () => {
+            stopped = true;
+            clearTimeout(timer);
+            if (source) {
+                types.forEach((type) => source?.removeEventListener(type, handler));
+                source.close();
+            }
+        };
+    }, [key, enabled]);
+}
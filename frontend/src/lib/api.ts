@@ -1,8 +1,10 @@
-import axios from 'axios';
+import axios, { AxiosError, InternalAxiosRequestConfig } from 'axios';
 import Cookies from 'js-cookie';
 
+const baseURL = process.env.NEXT_PUBLIC_API_URL || 'http://127.0.0.1:5000/api';
+
 const api = axios.create({
-    baseURL: process.env.NEXT_PUBLIC_API_URL || 'http://127.0.0.1:5000/api',
+    baseURL,
     headers: {
         'Content-Type': 'application/json',
     },
@@ -12,17 +14,61 @@ const api = axios.create({
 
 api.interceptors.request.use((config) => {
     const token = Cookies.get('token');
-    if (token) {
+    // Leave an explicit Authorization header alone (e.g. logout sends the refresh token)
+    if (token && !config.headers.Authorization) {
         config.headers.Authorization = `Bearer ${token}`;
     }
     return config;
 });
 
+// A single in-flight refresh shared by every request that hit a 401, so a
+// burst of expired requests rotates the refresh token only once.
+let refreshing: Promise<string | null> | null = null;
+
+export const refreshAccessToken = (): Promise<string | null> => {
+    const refreshToken = Cookies.get('refresh_token');
+    if (!refreshToken) {
+        return Promise.resolve(null);
+    }
+    if (!refreshing) {
+        // Plain axios so this call skips the interceptors above
+        refreshing = axios
+            .post(`${baseURL}/auth/refresh`, null, {
+                headers: { Authorization: `Bearer ${refreshToken}` },
+                withCredentials: true,
+            })
+            .then((response) => {
+                const { token, refresh_token } = response.data;
+                Cookies.set('token', token, { expires: 7 });
+                Cookies.set('refresh_token', refresh_token, { expires: 30 });
+                return token as string;
+            })
+            .catch(() => null)
+            .finally(() => {
+                refreshing = null;
+            });
+    }
+    return refreshing;
+};
+
+type RetriableConfig = InternalAxiosRequestConfig & { _retried?: boolean };
+
 api.interceptors.response.use(
     (response) => response,
-    (error) => {
+    async (error: AxiosError) => {
+        const original = error.config as RetriableConfig | undefined;
+        if (error.response?.status === 401 && original && !original._retried && !original.url?.includes('/auth/')) {
+            // Expired access token: renew it with the refresh token instead of sending the user back through login
+            original._retried = true;
+            const token = await refreshAccessToken();
+            if (token) {
+                original.headers.Authorization = `Bearer ${token}`;
+                return api(original);
+            }
+        }
         if (error.response?.status === 401) {
             Cookies.remove('token');
+            Cookies.remove('refresh_token');
             Cookies.remove('user');
             if (typeof window !== 'undefined' && !window.location.pathname.includes('/login') && !window.location.pathname.includes('/signup')) {
                 window.location.href = '/login';